@@ -1,8 +1,6 @@
 import asyncio
 from logging.config import fileConfig
-from sqlalchemy import pool
 from alembic import context
-from sqlalchemy.ext.asyncio import create_async_engine
 
 import os
 import sys
@@ -15,6 +13,7 @@ db_url = DATABASE_URL or context.config.get_main_option("sqlalchemy.url")
 if not db_url:
     raise RuntimeError("DATABASE_URL is not set. Set the DATABASE_URL environment variable or configure sqlalchemy.url in alembic.ini")
 import app.models
+from app.core.engine import create_engine_for
 from sqlmodel import SQLModel as _SQLModel
 target_metadata = _SQLModel.metadata
 
@@ -34,7 +33,7 @@ def do_run_migrations(connection):
 
 
 async def run_async_migrations():
-    connectable = create_async_engine(db_url, poolclass=pool.NullPool)
+    connectable = create_engine_for("migration", db_url)
     async with connectable.connect() as connection:
         await connection.run_sync(do_run_migrations)
     await connectable.dispose()
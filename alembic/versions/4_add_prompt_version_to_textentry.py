@@ -0,0 +1,28 @@
+"""add prompt_version to textentry
+
+Revision ID: 4_add_prompt_version_to_textentry
+Revises: 3_convert_category_to_varchar
+Create Date: 2026-10-18 10:00:00.000000
+
+Records the content hash of the prompt template used to classify each entry.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '4_add_prompt_version_to_textentry'
+down_revision: Union[str, Sequence[str], None] = '3_convert_category_to_varchar'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('textentry', sa.Column('prompt_version', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('textentry', 'prompt_version')
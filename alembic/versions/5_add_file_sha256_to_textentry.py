@@ -0,0 +1,29 @@
+"""add file_sha256 to textentry
+
+Revision ID: 5_add_file_sha256_to_textentry
+Revises: 4_add_prompt_version_to_textentry
+Create Date: 2026-10-18 11:00:00.000000
+
+Stores the SHA-256 computed while streaming the upload to disk, so uploads
+can be deduplicated later.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '5_add_file_sha256_to_textentry'
+down_revision: Union[str, Sequence[str], None] = '4_add_prompt_version_to_textentry'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('textentry', sa.Column('file_sha256', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('textentry', 'file_sha256')
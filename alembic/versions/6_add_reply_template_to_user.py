@@ -0,0 +1,28 @@
+"""add reply_template to user
+
+Revision ID: 6_add_reply_template_to_user
+Revises: 5_add_file_sha256_to_textentry
+Create Date: 2026-10-18 12:00:00.000000
+
+Per-user override for the templated IMPRODUTIVO reply.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '6_add_reply_template_to_user'
+down_revision: Union[str, Sequence[str], None] = '5_add_file_sha256_to_textentry'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user', sa.Column('reply_template', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user', 'reply_template')
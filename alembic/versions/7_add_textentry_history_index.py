@@ -0,0 +1,28 @@
+"""add (user_id, created_at, id) index to textentry
+
+Revision ID: 7_add_textentry_history_index
+Revises: 6_add_reply_template_to_user
+Create Date: 2026-10-18 13:00:00.000000
+
+Backs the keyset-paginated history listing (GET /texts/), which filters by
+user_id and orders by (created_at, id) descending.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '7_add_textentry_history_index'
+down_revision: Union[str, Sequence[str], None] = '6_add_reply_template_to_user'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_textentry_user_id_created_at_id', 'textentry', ['user_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_textentry_user_id_created_at_id', table_name='textentry')
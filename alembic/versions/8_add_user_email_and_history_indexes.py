@@ -0,0 +1,45 @@
+"""add unique index on user.email and textentry status index
+
+Revision ID: 8_add_user_email_and_history_indexes
+Revises: 7_add_textentry_history_index
+Create Date: 2026-10-18 14:00:00.000000
+
+- ix_user_email (unique): lookup by email on every login and registration.
+- ix_textentry_user_id_status_created_at: history filtered by status.
+
+TextEntry.user_id lookups are served by the leading column of
+ix_textentry_user_id_created_at_id (revision 7).
+
+The unique index fails if duplicated emails already exist; the upgrade
+checks first and reports the duplicates instead of a generic error.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '8_add_user_email_and_history_indexes'
+down_revision: Union[str, Sequence[str], None] = '7_add_textentry_history_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conn = op.get_bind()
+    duplicates = conn.execute(
+        sa.text('SELECT email, COUNT(*) FROM "user" GROUP BY email HAVING COUNT(*) > 1')
+    ).fetchall()
+    if duplicates:
+        emails = ", ".join(row[0] for row in duplicates[:10])
+        raise RuntimeError(f"Cannot create unique index on user.email; duplicated emails: {emails}")
+
+    op.create_index('ix_user_email', 'user', ['email'], unique=True)
+    op.create_index('ix_textentry_user_id_status_created_at', 'textentry', ['user_id', 'status', 'created_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_textentry_user_id_status_created_at', table_name='textentry')
+    op.drop_index('ix_user_email', table_name='user')
@@ -6,11 +6,42 @@ load_dotenv()
 
 #Database
 DATABASE_URL: str =os.getenv("DATABASE_URL")
+# Papel do processo para o perfil de pool: "api", "worker" (o worker do Celery troca sozinho) ou "migration"
+DB_ROLE: str = os.getenv("DB_ROLE", "api").strip().lower()
+_raw_db_echo: str = os.getenv("DB_ECHO", "false").strip()
+DB_ECHO: bool = _raw_db_echo.lower() in ("1", "true", "yes", "y", "on")
+DB_API_POOL_SIZE: int = int(os.getenv("DB_API_POOL_SIZE", "10").strip())
+DB_API_MAX_OVERFLOW: int = int(os.getenv("DB_API_MAX_OVERFLOW", "20").strip())
+DB_WORKER_POOL_SIZE: int = int(os.getenv("DB_WORKER_POOL_SIZE", "2").strip())
+DB_WORKER_MAX_OVERFLOW: int = int(os.getenv("DB_WORKER_MAX_OVERFLOW", "3").strip())
+# NullPool no worker: para execuções com um event loop por task, em que conexões do pool não são reaproveitadas
+_raw_db_worker_nullpool: str = os.getenv("DB_WORKER_NULLPOOL", "false").strip()
+DB_WORKER_NULLPOOL: bool = _raw_db_worker_nullpool.lower() in ("1", "true", "yes", "y", "on")
+DB_POOL_TIMEOUT_SECONDS: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30").strip())
+DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800").strip())
+_raw_db_pre_ping: str = os.getenv("DB_POOL_PRE_PING", "true").strip()
+DB_POOL_PRE_PING: bool = _raw_db_pre_ping.lower() in ("1", "true", "yes", "y", "on")
+# Prepared statements por conexão no asyncpg (0 com PgBouncer em modo transaction) e cache de SQL compilado do SQLAlchemy
+DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100").strip())
+DB_QUERY_CACHE_SIZE: int = int(os.getenv("DB_QUERY_CACHE_SIZE", "500").strip())
 
 #Security
 SECRET_KEY: str = os.getenv("SECRET_KEY", "your_super_secret_key")
 ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60").strip())
+# Cache dos principais autenticados (0 desliga); com Redis, invalidações são compartilhadas entre os nós
+AUTH_CACHE_TTL_SECONDS: int = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60").strip())
+AUTH_CACHE_MAX_ENTRIES: int = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000").strip())
+AUTH_CACHE_REDIS_URL: str = os.getenv("AUTH_CACHE_REDIS_URL", "").strip()
+# Parâmetros do Argon2 para novos hashes (hashes existentes guardam os próprios parâmetros)
+ARGON2_TIME_COST: int = int(os.getenv("ARGON2_TIME_COST", "3").strip())
+ARGON2_MEMORY_COST: int = int(os.getenv("ARGON2_MEMORY_COST", "65536").strip())
+ARGON2_PARALLELISM: int = int(os.getenv("ARGON2_PARALLELISM", "4").strip())
+# Pool dedicado para hash/verificação de senhas: "thread" ou "process"
+HASH_EXECUTOR: str = os.getenv("HASH_EXECUTOR", "thread").strip().lower()
+HASH_WORKERS: int = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)).strip())
+# Operações em execução + na fila; acima disso a API responde 503
+HASH_MAX_PENDING: int = int(os.getenv("HASH_MAX_PENDING", str((os.cpu_count() or 2) * 8)).strip())
 
 #Celery
 _raw_use_celery: str = os.getenv("USE_CELERY", "true").strip()
@@ -33,13 +64,130 @@ CELERY_CONCURRENCY: int = int(os.getenv("CELERY_CONCURRENCY", "2").strip())
 #NLP
 DEFAULT_SPACY_MODEL: str = os.getenv("DEFAULT_SPACY_MODEL", "pt_core_news_sm")
 NLP_WORKERS: int = int(os.getenv("NLP_WORKERS", "2").strip())
+# Arquivo com uma stopword por linha (português); vazio usa a lista embutida
+NLP_STOPWORDS_FILE: str = os.getenv("NLP_STOPWORDS_FILE", "").strip()
+_raw_fold_accents: str = os.getenv("NLP_FOLD_ACCENTS", "false").strip()
+NLP_FOLD_ACCENTS: bool = _raw_fold_accents.lower() in ("1", "true", "yes", "y", "on")
 IA_ASYNC_WORKERS: int = int(os.getenv("IA_ASYNC_WORKERS", "2").strip())
 
+#PDF
+# "auto": pypdfium2 com fallback para pdfplumber; "pdfium" ou "pdfplumber" forçam um backend
+PDF_BACKEND: str = os.getenv("PDF_BACKEND", "auto").strip().lower()
+# Para de extrair páginas quando o texto atinge este número de caracteres (0 = sem limite)
+PDF_MAX_CHARS: int = int(os.getenv("PDF_MAX_CHARS", "100000").strip())
+PDF_WORKERS: int = int(os.getenv("PDF_WORKERS", "2").strip())
+PDF_PARALLEL_MIN_PAGES: int = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32").strip())
+PDF_PAGES_PER_TASK: int = int(os.getenv("PDF_PAGES_PER_TASK", "16").strip())
+# "async": cliente nativo asyncio (client.aio); "thread": chamada bloqueante em ThreadPoolExecutor
+IA_BACKEND: str = os.getenv("IA_BACKEND", "async").strip().lower()
+GENAI_ASYNC_CONCURRENCY: int = int(os.getenv("GENAI_ASYNC_CONCURRENCY", "32").strip())
+
+#LLM input
+# Orçamento de tokens (palavras do texto pré-processado) enviado ao LLM por e-mail (0 = sem limite)
+LLM_INPUT_MAX_TOKENS: int = int(os.getenv("LLM_INPUT_MAX_TOKENS", "1500").strip())
+# Fração do orçamento reservada ao início do e-mail; o restante fica com o final
+LLM_INPUT_HEAD_RATIO: float = float(os.getenv("LLM_INPUT_HEAD_RATIO", "0.7").strip())
+_raw_strip_noise: str = os.getenv("LLM_INPUT_STRIP_NOISE", "true").strip()
+LLM_INPUT_STRIP_NOISE: bool = _raw_strip_noise.lower() in ("1", "true", "yes", "y", "on")
+
+#Local classifier
+# Classificador TF-IDF + regressão logística que responde sem LLM quando está confiante (opt-in)
+_raw_local_classifier: str = os.getenv("LOCAL_CLASSIFIER_ENABLED", "false").strip()
+LOCAL_CLASSIFIER_ENABLED: bool = _raw_local_classifier.lower() in ("1", "true", "yes", "y", "on")
+LOCAL_CLASSIFIER_THRESHOLD: float = float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.92").strip())
+# Categorias que o classificador local pode decidir sozinho (as demais sempre vão ao LLM)
+LOCAL_CLASSIFIER_CATEGORIES: List[str] = [c.strip().upper() for c in os.getenv("LOCAL_CLASSIFIER_CATEGORIES", "IMPRODUTIVO").split(",") if c.strip()]
+# Mínimo de exemplos rotulados (histórico + few-shot) para o atalho local ser usado
+LOCAL_CLASSIFIER_MIN_SAMPLES: int = int(os.getenv("LOCAL_CLASSIFIER_MIN_SAMPLES", "50").strip())
+LOCAL_CLASSIFIER_MAX_SAMPLES: int = int(os.getenv("LOCAL_CLASSIFIER_MAX_SAMPLES", "5000").strip())
+LOCAL_CLASSIFIER_REFRESH_SECONDS: int = int(os.getenv("LOCAL_CLASSIFIER_REFRESH_SECONDS", "3600").strip())
+# Gera resposta por template quando o atalho local decide; desligado, a resposta fica vazia
+_raw_local_reply: str = os.getenv("LOCAL_CLASSIFIER_REPLY", "true").strip()
+LOCAL_CLASSIFIER_REPLY: bool = _raw_local_reply.lower() in ("1", "true", "yes", "y", "on")
+
+#Replies
+# "llm" (padrão): o LLM gera a resposta de todos os e-mails; "template" (opt-in): e-mails IMPRODUTIVO
+# recebem resposta do template local (app/services/replies.py) e o LLM só classifica
+REPLY_MODE: str = os.getenv("REPLY_MODE", "llm").strip().lower()
+
 #GenAI
 GENAI_API_KEY: str = os.getenv("GENAI_API_KEY")
 GENAI_MODEL: str = os.getenv("GENAI_MODEL", "gemma-3-27b-it")
 GENAI_MAX_OUTPUT_TOKENS: int = int(os.getenv("GENAI_MAX_OUTPUT_TOKENS", "2056").strip())
 GENAI_TEMPERATURE: float = float(os.getenv("GENAI_TEMPERATURE", "0.4").strip())
+GENAI_CLIENT_MAX_AGE_SECONDS: int = int(os.getenv("GENAI_CLIENT_MAX_AGE_SECONDS", "3600").strip())
+GENAI_CLIENT_MAX_USES: int = int(os.getenv("GENAI_CLIENT_MAX_USES", "0").strip())
+GENAI_CLIENT_MAX_ERRORS: int = int(os.getenv("GENAI_CLIENT_MAX_ERRORS", "3").strip())
+GENAI_HTTP_MAX_CONNECTIONS: int = int(os.getenv("GENAI_HTTP_MAX_CONNECTIONS", "20").strip())
+GENAI_HTTP_MAX_KEEPALIVE: int = int(os.getenv("GENAI_HTTP_MAX_KEEPALIVE", "10").strip())
+GENAI_HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("GENAI_HTTP_KEEPALIVE_EXPIRY", "30").strip())
+# Cache de contexto no provedor para o prefixo estático do prompt (exige modelo com suporte, ex.: Gemini)
+_raw_context_cache: str = os.getenv("GENAI_CONTEXT_CACHE", "false").strip()
+GENAI_CONTEXT_CACHE: bool = _raw_context_cache.lower() in ("1", "true", "yes", "y", "on")
+GENAI_CONTEXT_CACHE_TTL_SECONDS: int = int(os.getenv("GENAI_CONTEXT_CACHE_TTL_SECONDS", "3600").strip())
+
+#Uploads
+MAX_UPLOAD_BYTES: int = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)).strip())
+MAX_REQUEST_BYTES: int = int(os.getenv("MAX_REQUEST_BYTES", str(100 * 1024 * 1024)).strip())
+UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(256 * 1024)).strip())
+
+#Batch
+BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "100").strip())
+BATCH_PACK_SIZE: int = int(os.getenv("BATCH_PACK_SIZE", "8").strip())
+BATCH_SMALL_TEXT_CHARS: int = int(os.getenv("BATCH_SMALL_TEXT_CHARS", "1500").strip())
+
+#Result cache
+RESULT_CACHE_BACKEND: str = os.getenv("RESULT_CACHE_BACKEND", "memory").strip().lower()
+RESULT_CACHE_TTL_SECONDS: int = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "86400").strip())
+RESULT_CACHE_MAX_ENTRIES: int = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "2048").strip())
+RESULT_CACHE_REDIS_URL: str = os.getenv("RESULT_CACHE_REDIS_URL", CELERY_RESULT_BACKEND).strip()
+
+#Task events
+# Stream de progresso das tasks (SSE em GET /texts/{task_id}/stream) via Redis pub/sub
+_raw_task_events: str = os.getenv("TASK_EVENTS_ENABLED", "true").strip()
+TASK_EVENTS_ENABLED: bool = _raw_task_events.lower() in ("1", "true", "yes", "y", "on")
+TASK_EVENTS_REDIS_URL: str = os.getenv("TASK_EVENTS_REDIS_URL", CELERY_RESULT_BACKEND).strip()
+TASK_EVENTS_TTL_SECONDS: int = int(os.getenv("TASK_EVENTS_TTL_SECONDS", "3600").strip())
+TASK_STREAM_TIMEOUT_SECONDS: int = int(os.getenv("TASK_STREAM_TIMEOUT_SECONDS", "300").strip())
+TASK_STREAM_KEEPALIVE_SECONDS: float = float(os.getenv("TASK_STREAM_KEEPALIVE_SECONDS", "15").strip())
+
+#History
+TEXTS_PAGE_SIZE: int = int(os.getenv("TEXTS_PAGE_SIZE", "50").strip())
+TEXTS_MAX_PAGE_SIZE: int = int(os.getenv("TEXTS_MAX_PAGE_SIZE", "200").strip())
+
+#Result writer
+# Write-behind dos resultados no worker: um UPDATE (executemany) por lote a cada N ms ou M linhas
+_raw_result_writer: str = os.getenv("RESULT_WRITER_ENABLED", "true").strip()
+RESULT_WRITER_ENABLED: bool = _raw_result_writer.lower() in ("1", "true", "yes", "y", "on")
+RESULT_WRITER_FLUSH_MS: int = int(os.getenv("RESULT_WRITER_FLUSH_MS", "200").strip())
+RESULT_WRITER_MAX_BATCH: int = int(os.getenv("RESULT_WRITER_MAX_BATCH", "500").strip())
+RESULT_WRITER_MAX_RETRIES: int = int(os.getenv("RESULT_WRITER_MAX_RETRIES", "5").strip())
+
+#Metrics
+# GET /metrics (Prometheus); no worker do Celery, porta do servidor de métricas (0 desliga) e filas observadas no broker
+_raw_metrics: str = os.getenv("METRICS_ENABLED", "true").strip()
+METRICS_ENABLED: bool = _raw_metrics.lower() in ("1", "true", "yes", "y", "on")
+METRICS_WORKER_PORT: int = int(os.getenv("METRICS_WORKER_PORT", "0").strip())
+METRICS_QUEUES: List[str] = [q.strip() for q in os.getenv("METRICS_QUEUES", "celery").split(",") if q.strip()]
+
+#Tracing
+# Spans por etapa do pipeline: "none" (padrão, sem custo), "file" (JSON por linha) ou "otlp" (OTLP/HTTP JSON)
+TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "none").strip().lower()
+TRACING_FILE: str = os.getenv("TRACING_FILE", "").strip()
+TRACING_OTLP_ENDPOINT: str = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces").strip()
+TRACING_SAMPLE_RATE: float = float(os.getenv("TRACING_SAMPLE_RATE", "1.0").strip())
+TRACING_SERVICE_NAME: str = os.getenv("TRACING_SERVICE_NAME", "autou-email-back").strip()
+
+#Task status
+# Espera máxima do long-polling em GET /texts/tasks/{task_id}?wait=<s> e intervalo entre leituras do result backend
+TASK_STATUS_MAX_WAIT_SECONDS: float = float(os.getenv("TASK_STATUS_MAX_WAIT_SECONDS", "30").strip())
+TASK_STATUS_POLL_INTERVAL: float = float(os.getenv("TASK_STATUS_POLL_INTERVAL", "0.25").strip())
+
+#Account deletion
+# Textos removidos por DELETE (cada bloco na própria transação; 0 = um único DELETE) e, a partir de
+# quantos textos, DELETE /users/me vira uma task do Celery em vez de rodar na requisição
+ACCOUNT_DELETE_CHUNK_SIZE: int = int(os.getenv("ACCOUNT_DELETE_CHUNK_SIZE", "5000").strip())
+ACCOUNT_DELETE_ASYNC_THRESHOLD: int = int(os.getenv("ACCOUNT_DELETE_ASYNC_THRESHOLD", "20000").strip())
 
 #CORS
 ALLOWED_ORIGINS: List[str] = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,http://localhost:5173,http://127.0.0.1:3000,http://127.0.0.1:5173").strip().split(",")
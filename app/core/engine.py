@@ -0,0 +1,105 @@
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import exc, pool
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.constants import (
+    DATABASE_URL,
+    DB_API_MAX_OVERFLOW,
+    DB_API_POOL_SIZE,
+    DB_ECHO,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_TIMEOUT_SECONDS,
+    DB_QUERY_CACHE_SIZE,
+    DB_ROLE,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_WORKER_MAX_OVERFLOW,
+    DB_WORKER_NULLPOOL,
+    DB_WORKER_POOL_SIZE,
+)
+
+
+class PoolMetrics:
+    """Contadores de espera por conexão do pool (inclui o connect quando abre overflow)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": (self.wait_total / self.checkouts * 1000) if self.checkouts else 0.0,
+                "wait_max_ms": self.wait_max * 1000,
+            }
+
+
+class InstrumentedQueuePool(pool.AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool que mede quanto cada checkout esperou por uma conexão."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started)
+        return conn
+
+
+# Perfis por papel do processo: a API atende muitas requisições concorrentes; o
+# worker (um event loop persistente por processo) só precisa de poucas conexões;
+# migrações rodam uma vez e não mantêm pool.
+POOL_PROFILES: Dict[str, Dict[str, Any]] = {
+    "api": {"pool_size": DB_API_POOL_SIZE, "max_overflow": DB_API_MAX_OVERFLOW},
+    "worker": {"pool_size": DB_WORKER_POOL_SIZE, "max_overflow": DB_WORKER_MAX_OVERFLOW, "nullpool": DB_WORKER_NULLPOOL},
+    "migration": {"nullpool": True},
+}
+
+
+def create_engine_for(role: str = DB_ROLE, url: str | None = None) -> AsyncEngine:
+    """Cria o engine assíncrono com o perfil de pool de `role` ("api", "worker" ou "migration")."""
+    url = url or DATABASE_URL
+    if role not in POOL_PROFILES:
+        raise ValueError(f"Papel de banco desconhecido: {role!r} (use {', '.join(POOL_PROFILES)})")
+    profile = POOL_PROFILES[role]
+    kwargs: Dict[str, Any] = {"echo": DB_ECHO, "query_cache_size": DB_QUERY_CACHE_SIZE}
+
+    if url.startswith("postgresql+asyncpg"):
+        # Cache de prepared statements por conexão do asyncpg (0 desliga, necessário atrás do PgBouncer em modo transaction).
+        kwargs["connect_args"] = {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+
+    if profile.get("nullpool"):
+        kwargs["poolclass"] = pool.NullPool
+    elif not url.startswith("sqlite"):
+        kwargs.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=profile["pool_size"],
+            max_overflow=profile["max_overflow"],
+            pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=DB_POOL_RECYCLE_SECONDS,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+    return create_async_engine(url, **kwargs)
@@ -1,5 +1,5 @@
 import warnings
-from app.core.constants import SECRET_KEY, ALGORITHM
+from app.core.constants import ALGORITHM, ARGON2_MEMORY_COST, ARGON2_PARALLELISM, ARGON2_TIME_COST, SECRET_KEY
 
 warnings.filterwarnings(
     "ignore",
@@ -13,7 +13,9 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 
 from app.db import get_session
-from app.crud import get_user_by_id
+from app.crud import get_user_identity
+from app.schemas import CurrentUser
+from app.services.principal_cache import principal_cache
 from sqlalchemy.ext.asyncio import AsyncSession
 
 warnings.filterwarnings(
@@ -22,7 +24,13 @@ warnings.filterwarnings(
     category=DeprecationWarning,
 )
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
 
 def hash_password(password: str) -> str:
     if not password:
@@ -44,7 +52,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-async def get_current_user(session: AsyncSession = Depends(get_session), token: str = Depends(oauth2_scheme)):
+async def get_current_user(session: AsyncSession = Depends(get_session), token: str = Depends(oauth2_scheme)) -> CurrentUser:
     if not SECRET_KEY or not ALGORITHM:
         raise HTTPException(status_code=500, detail="Auth not configured properly")
     try:
@@ -52,9 +60,14 @@ async def get_current_user(session: AsyncSession = Depends(get_session), token:
         user_id: str | None = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-        user = await get_user_by_id(session, int(user_id))
+        generation = principal_cache.generation()
+        user = principal_cache.get(int(user_id))
+        if user is not None:
+            return user
+        user = await get_user_identity(session, int(user_id))
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
+        principal_cache.set(user, generation=generation)
         return user
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
\ No newline at end of file
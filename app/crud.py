@@ -1,13 +1,20 @@
 from calendar import c
+from datetime import datetime
+import inspect
+from typing import Awaitable, Callable
 import enum
+from sqlalchemy import and_, delete, func, or_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlmodel import select
 from app.models import User, TextEntry
+from app.core.constants import ACCOUNT_DELETE_CHUNK_SIZE
 from app.db import async_session
 from sqlmodel import Session
-from app.schemas import TextEntryCreateRequest, UserUpdateRequest
+from app.schemas import CurrentUser, TextEntryCreateRequest, UserUpdateRequest
 from app.models import Status
+from app.services.principal_cache import principal_cache
 
 """
     FUNÇÕES PARA USER
@@ -27,12 +34,21 @@ async def get_user_by_email(db: AsyncSession, email: str) -> User | None:
     result = await db.execute(select(User).where(User.email == email))
     return result.scalars().first()
 
-async def get_user_by_id(db: AsyncSession, user_id: int) -> User | None:
-    result = await db.execute(select(User).options(selectinload(User.texts)).where(User.id == user_id))
+async def get_user_by_id(db: AsyncSession, user_id: int, with_texts: bool = False) -> User | None:
+    stmt = select(User).where(User.id == user_id)
+    if with_texts:
+        stmt = stmt.options(selectinload(User.texts))
+    result = await db.execute(stmt)
     return result.scalars().first()
 
-async def update_current_user(db: AsyncSession, user_update: UserUpdateRequest, current_user: User) -> User | None:
-    result = await db.execute(select(User).where(User.id == current_user.id))
+async def get_user_identity(db: AsyncSession, user_id: int) -> CurrentUser | None:
+    result = await db.execute(select(User.id, User.username, User.email, User.reply_template).where(User.id == user_id))
+    row = result.first()
+    return CurrentUser(id=row.id, username=row.username, email=row.email, reply_template=row.reply_template) if row else None
+
+async def update_current_user(db: AsyncSession, user_update: UserUpdateRequest, current_user: CurrentUser) -> User | None:
+    # UserResponse devolve os textos: carregados aqui, já que o principal da autenticação não os traz.
+    result = await db.execute(select(User).options(selectinload(User.texts)).where(User.id == current_user.id))
     user = result.scalars().first()
     
     if not user:
@@ -45,15 +61,26 @@ async def update_current_user(db: AsyncSession, user_update: UserUpdateRequest,
     if user_update.email:
         update_data["email"] = user_update.email
 
+    if user_update.reply_template is not None:
+        from app.services.replies import TemplateError, validate_template
+        from fastapi import HTTPException
+
+        # String vazia remove o template personalizado e volta aos padrões.
+        template = user_update.reply_template.strip()
+        try:
+            update_data["reply_template"] = validate_template(template) if template else None
+        except TemplateError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
     if user_update.current_password:
-        from app.core.security import verify_password, hash_password
+        from app.services.hashing import password_hasher
         from fastapi import HTTPException
 
-        if not verify_password(user_update.current_password, user.hash_password):
+        if not await password_hasher.verify(user_update.current_password, user.hash_password):
             raise HTTPException(status_code=400, detail="Current password is incorrect")
 
         if user_update.new_password:
-            update_data["hash_password"] = hash_password(user_update.new_password)
+            update_data["hash_password"] = await password_hasher.hash(user_update.new_password)
 
     if not update_data:
         return user
@@ -61,36 +88,71 @@ async def update_current_user(db: AsyncSession, user_update: UserUpdateRequest,
     for key, value in update_data.items():
         setattr(user, key, value)
     db.add(user)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        from fastapi import HTTPException
+
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Email already registered")
     await db.refresh(user)
+    await principal_cache.invalidate(user.id)
     return user
 
-async def delete_user_by_id(db: AsyncSession, user_id: int) -> bool:
-    user = await get_user_by_id(db, user_id)
-    if not user:
+async def delete_user_by_id(db: AsyncSession, user_id: int, chunk_size: int = ACCOUNT_DELETE_CHUNK_SIZE, on_progress: Callable[[int], Awaitable[None] | None] | None = None) -> bool:
+    """Remove o usuário e o histórico com DELETEs em lote, sem carregar as linhas.
+
+    Os textos saem em blocos de `chunk_size` linhas, cada bloco na própria
+    transação, para não segurar locks durante toda a remoção de contas
+    grandes; `on_progress(removidos)` é chamado (e aguardado, se for
+    corrotina) após cada bloco. Com
+    `chunk_size` <= 0 é um único `DELETE ... WHERE user_id = ...`.
+    """
+    if await get_user_identity(db, user_id) is None:
         return False
-    
-    texts = await get_texts_by_user(db, user_id)
-    for text in texts:
-        await db.delete(text)
-    
-    await db.delete(user)
+
+    deleted = 0
+    while True:
+        stmt = delete(TextEntry).execution_options(synchronize_session=False)
+        if chunk_size > 0:
+            ids = select(TextEntry.id).where(TextEntry.user_id == user_id).limit(chunk_size)
+            stmt = stmt.where(TextEntry.id.in_(ids))
+        else:
+            stmt = stmt.where(TextEntry.user_id == user_id)
+        result = await db.execute(stmt)
+        await db.commit()
+        deleted += result.rowcount or 0
+        if on_progress is not None:
+            progress = on_progress(deleted)
+            if inspect.isawaitable(progress):
+                await progress
+        if chunk_size <= 0 or (result.rowcount or 0) < chunk_size:
+            break
+
+    await db.execute(delete(User).where(User.id == user_id).execution_options(synchronize_session=False))
     await db.commit()
+    await principal_cache.invalidate(user_id)
     return True
 
 """
     FUNÇÕES PARA TEXTENTRY
 """
 
-async def create_text_entry(text_entry_req: TextEntryCreateRequest) -> TextEntry:
-    te = TextEntry(
+def _new_text_entry(text_entry_req: TextEntryCreateRequest) -> TextEntry:
+    return TextEntry(
         user_id=text_entry_req.user_id,
         original_text=text_entry_req.original_text or "",
         file_name=text_entry_req.file_name,
+        file_size=text_entry_req.file_size,
+        file_content_type=text_entry_req.file_content_type,
+        file_sha256=text_entry_req.file_sha256,
         category="Sem classificação",
         generated_response="",
         status=Status.PROCESSING.value,
     )
+
+async def create_text_entry(text_entry_req: TextEntryCreateRequest) -> TextEntry:
+    te = _new_text_entry(text_entry_req)
     async with async_session() as session:
         session.add(te)
         try:
@@ -100,15 +162,96 @@ async def create_text_entry(text_entry_req: TextEntryCreateRequest) -> TextEntry
         except Exception as e:
             await session.rollback()
             raise
-    
+
+async def create_text_entries(db: AsyncSession, text_entry_reqs: list[TextEntryCreateRequest]) -> list[TextEntry]:
+    """Cria as linhas (status Processando) numa única transação, na sessão da requisição que enfileira as tasks."""
+    entries = [_new_text_entry(req) for req in text_entry_reqs]
+    db.add_all(entries)
+    await db.commit()
+    return entries
+
+async def count_texts_by_user(db: AsyncSession, user_id: int) -> int:
+    result = await db.execute(select(func.count()).select_from(TextEntry).where(TextEntry.user_id == user_id))
+    return result.scalar_one()
+
 async def get_texts_by_user(db: AsyncSession, user_id: int) -> list[TextEntry]:
     result = await db.execute(select(TextEntry).where(TextEntry.user_id == user_id))
     return result.scalars().all()
 
+# Colunas da projeção resumida do histórico: sem os textos completos.
+TEXT_SUMMARY_COLUMNS = (
+    TextEntry.id,
+    TextEntry.user_id,
+    TextEntry.status,
+    TextEntry.category,
+    TextEntry.created_at,
+    TextEntry.file_name,
+    TextEntry.prompt_version,
+)
+TEXT_PREVIEW_CHARS = 160
+
+
+async def get_texts_page(
+    db: AsyncSession,
+    user_id: int,
+    limit: int,
+    after: tuple[datetime, int] | None = None,
+    status: str | None = None,
+    category: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    summary: bool = False,
+) -> list:
+    """Página do histórico do usuário em ordem (created_at, id) decrescente.
+
+    `after` é a chave (created_at, id) do último item da página anterior
+    (paginação por keyset, sem OFFSET). Retorna até `limit + 1` linhas para o
+    chamador saber se há próxima página. Com `summary=True`, retorna dicts
+    sem `original_text`/`generated_response`, com um `preview` curto.
+    """
+    if summary:
+        stmt = select(*TEXT_SUMMARY_COLUMNS, func.substr(TextEntry.original_text, 1, TEXT_PREVIEW_CHARS).label("preview"))
+    else:
+        stmt = select(TextEntry)
+    stmt = stmt.where(TextEntry.user_id == user_id)
+    if status:
+        stmt = stmt.where(TextEntry.status == status)
+    if category:
+        stmt = stmt.where(TextEntry.category == category)
+    if created_from:
+        stmt = stmt.where(TextEntry.created_at >= created_from)
+    if created_to:
+        stmt = stmt.where(TextEntry.created_at < created_to)
+    if after is not None:
+        after_created_at, after_id = after
+        stmt = stmt.where(
+            or_(
+                TextEntry.created_at < after_created_at,
+                and_(TextEntry.created_at == after_created_at, TextEntry.id < after_id),
+            )
+        )
+    stmt = stmt.order_by(TextEntry.created_at.desc(), TextEntry.id.desc()).limit(limit + 1)
+    result = await db.execute(stmt)
+    if summary:
+        return [dict(row._mapping) for row in result.all()]
+    return list(result.scalars().all())
+
 async def get_text_entry(db: AsyncSession) -> list[TextEntry]:
     result = await db.execute(select(TextEntry))
     return result.scalars().all()
 
+async def get_labeled_texts(db: AsyncSession, categories: list[str], limit: int, exclude_version_prefix: str | None = None) -> list[tuple[str, str]]:
+    stmt = (
+        select(TextEntry.original_text, TextEntry.category)
+        .where(TextEntry.status == Status.COMPLETED.value, TextEntry.category.in_(categories))
+        .order_by(TextEntry.id.desc())
+        .limit(limit)
+    )
+    if exclude_version_prefix:
+        stmt = stmt.where(TextEntry.prompt_version.is_(None) | ~TextEntry.prompt_version.startswith(exclude_version_prefix))
+    result = await db.execute(stmt)
+    return [(text, category) for text, category in result.all()]
+
 async def get_text_by_id(db: AsyncSession, text_entry_id: int) -> TextEntry | None:
     result = await db.execute(select(TextEntry).where(TextEntry.id == text_entry_id))
     return result.scalars().first()
@@ -146,15 +289,26 @@ async def update_text_entry_by_id(text_entry_id: int, **kwargs) -> TextEntry | N
             await session.rollback()
             raise
 
+async def update_text_entries(text_entry_ids: list[int], **kwargs) -> int:
+    """Um único `UPDATE ... WHERE id IN (...)`, sem SELECT antes; devolve quantas linhas mudaram."""
+    if not text_entry_ids or not kwargs:
+        return 0
+    values = {k: (v.value if isinstance(v, enum.Enum) else v) for k, v in kwargs.items()}
+    stmt = update(TextEntry).where(TextEntry.id.in_(text_entry_ids)).values(**values).execution_options(synchronize_session=False)
+    async with async_session() as session:
+        try:
+            result = await session.execute(stmt)
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+    return result.rowcount or 0
+
+async def update_text_entry_fields(text_entry_id: int, **kwargs) -> bool:
+    return await update_text_entries([text_entry_id], **kwargs) > 0
+
 def create_text_entry_sync(engine_obj, text_entry_req: TextEntryCreateRequest) -> TextEntry:
-    te = TextEntry(
-        user_id=text_entry_req.user_id,
-        original_text=text_entry_req.original_text or "",
-        file_name=text_entry_req.file_name,
-        category="Sem classificação",
-        generated_response="",
-        status=Status.PROCESSING.value,
-    )
+    te = _new_text_entry(text_entry_req)
     with Session(engine_obj) as session:
         session.add(te)
         try:
@@ -1,20 +1,62 @@
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict
 from sqlmodel import SQLModel
+from sqlalchemy import pool
 from sqlalchemy.ext.asyncio import (
-    create_async_engine,
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker
 )
-from app.core.constants import DATABASE_URL
+from app.core.constants import DB_ROLE
+from app.core.engine import create_engine_for
 
-engine = create_async_engine(DATABASE_URL, echo=True, pool_pre_ping=True)
+engine_role = DB_ROLE
+engine = create_engine_for(engine_role)
 
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+
+def get_engine() -> AsyncEngine:
+    return engine
+
+
+def configure_engine(role: str) -> AsyncEngine:
+    """Troca o engine do processo pelo perfil de `role`; `async_session` passa a usá-lo.
+
+    Usado no início de cada processo worker do Celery: as conexões herdadas
+    do processo pai são abandonadas sem fechar (pertencem ao pai).
+    """
+    global engine, engine_role
+    old = engine
+    engine, engine_role = create_engine_for(role), role
+    async_session.configure(bind=engine)
+    old.sync_engine.dispose(close=False)
+    return engine
+
+
+def pool_stats() -> Dict[str, Any]:
+    current = engine.sync_engine.pool
+    stats: Dict[str, Any] = {
+        "role": engine_role,
+        "pool": type(current).__name__,
+    }
+    if isinstance(current, pool.QueuePool):
+        stats.update(
+            size=current.size(),
+            checked_in=current.checkedin(),
+            checked_out=current.checkedout(),
+            overflow=current.overflow(),
+            max_overflow=current._max_overflow,
+        )
+    metrics = getattr(current, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.snapshot())
+    return stats
+
+
 async def init_db() -> None:
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        yield session
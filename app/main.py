@@ -1,27 +1,80 @@
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.core.config import settings
+from app.core.constants import MAX_REQUEST_BYTES, MAX_UPLOAD_BYTES
 from app.db import init_db
-from app.routes import auth, health, texts, users
+from app.routes import auth, health, metrics, texts, users
+from app.services.hashing import HashingBusy, password_hasher
+from app.services.metrics import observe_request
+from app.services.principal_cache import principal_cache
+from app.services.tracing import extract, tracer
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
   await init_db()
+  principal_cache.start()
   yield
+  await principal_cache.stop()
+  password_hasher.shutdown()
+  tracer.shutdown()
 
 app = FastAPI(lifespan=lifespan)
 
+_SINGLE_UPLOAD_PATHS = {"/texts/processar_email"}
+_MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    # Rejeita uploads grandes pelo Content-Length antes de o corpo multipart ser lido.
+    # Rotas de um arquivo só usam o limite por arquivo (mais folga para o envelope multipart).
+    if request.method == "POST" and request.url.path.startswith("/texts/"):
+        limit = MAX_UPLOAD_BYTES + _MULTIPART_OVERHEAD_BYTES if request.url.path in _SINGLE_UPLOAD_PATHS else MAX_REQUEST_BYTES
+        length = request.headers.get("content-length")
+        if length and length.isdigit() and int(length) > limit:
+            return JSONResponse(status_code=413, content={"detail": f"Requisição excede o limite de {limit} bytes"})
+    return await call_next(request)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Rótulo pelo template da rota (/texts/{text_id}), não pelo path, para não explodir a cardinalidade.
+        route = request.scope.get("route")
+        observe_request(request.method, getattr(route, "path", "unmatched"), status, time.perf_counter() - started)
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    # Span raiz da requisição (ou filho do `traceparent` recebido); as tasks enfileiradas herdam o contexto.
+    with tracer.span("http_request", parent=extract(request.headers.get("traceparent")), method=request.method, path=request.url.path) as span:
+        response = await call_next(request)
+        span.set(route=getattr(request.scope.get("route"), "path", None), status=response.status_code)
+        return response
+
+@app.exception_handler(HashingBusy)
+async def hashing_busy_handler(request: Request, exc: HashingBusy):
+    # Pool de Argon2 saturado: recusa cedo em vez de enfileirar logins sem limite.
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_ORIGINS,
     allow_credentials=settings.ALLOW_CREDENTIALS,
     allow_methods=settings.ALLOWED_METHODS,
     allow_headers=settings.ALLOWED_HEADERS,
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 app.include_router(users.router)
 app.include_router(health.router)
 app.include_router(auth.router)
-app.include_router(texts.router)
\ No newline at end of file
+app.include_router(texts.router)
+app.include_router(metrics.router)
\ No newline at end of file
@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 import enum
 from typing import List, Optional
-from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy import Column, DateTime, Index, Integer, String
 from sqlmodel import Relationship, SQLModel, Field
 
 from app.core.config import get_data_dir
@@ -16,10 +16,15 @@ class Status(str, enum.Enum):
   COMPLETED = "Concluído"
   FAILED = "Falhou"
 class User(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_user_email", "email", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     username: str
     email: str
     hash_password: str
+    reply_template: Optional[str] = Field(default=None, sa_column=Column(String, nullable=True))
     created_at: datetime = Field(
       default_factory=lambda: datetime.now(timezone.utc),
       sa_column=Column(DateTime(timezone=True), nullable=False)
@@ -27,6 +32,11 @@ class User(SQLModel, table=True):
     texts: List["TextEntry"] = Relationship(back_populates="user")
         
 class TextEntry(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_textentry_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_textentry_user_id_status_created_at", "user_id", "status", "created_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     original_text: str
@@ -38,6 +48,8 @@ class TextEntry(SQLModel, table=True):
     file_path: str = Field(default=str(get_data_dir()), sa_column=Column(String))
     file_content_type: Optional[str] = Field(default=None, sa_column=Column(String))
     file_size: Optional[int] = Field(default=None, sa_column=Column(Integer))
+    file_sha256: Optional[str] = Field(default=None, sa_column=Column(String(64), nullable=True))
+    prompt_version: Optional[str] = Field(default=None, sa_column=Column(String, nullable=True))
 
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
@@ -1,9 +1,13 @@
-
+import asyncio
 from fastapi import APIRouter, Depends
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_session
+from app.db import get_session, pool_stats
+from app.services.cache import result_cache
+from app.services.genai_client import client_manager
+from app.services.hashing import password_hasher
+from app.services.principal_cache import principal_cache
 
 router = APIRouter(prefix="/health")
 
@@ -13,10 +17,32 @@ async def health_db(session: AsyncSession = Depends(get_session)):
   value = result.scalar_one_or_none()
   return {"db": bool(value == 1)}
 
+@router.get("/db/pool")
+async def health_db_pool():
+  return pool_stats()
+
 @router.get("/ping")
 async def health_ping():
   return {"ping": "pong!"}
 
 @router.get("/")
 async def health_check():
-  return {"status": "ok"}
\ No newline at end of file
+  return {"status": "ok"}
+
+@router.get("/cache")
+async def health_cache():
+  if result_cache.backend.blocking:
+    return await asyncio.to_thread(result_cache.stats)
+  return result_cache.stats()
+
+@router.get("/genai")
+async def health_genai():
+  return client_manager.health()
+
+@router.get("/auth")
+async def health_auth():
+  return principal_cache.stats()
+
+@router.get("/hashing")
+async def health_hashing():
+  return password_hasher.stats()
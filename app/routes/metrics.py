@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Response
+from starlette.concurrency import run_in_threadpool
+
+from app.services import metrics
+
+router = APIRouter()
+
+_registry = metrics.build_registry()
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+  # A coleta lê o tamanho das filas no Redis de forma síncrona: fora do event loop.
+  body, content_type = await run_in_threadpool(metrics.render, _registry)
+  return Response(content=body, media_type=content_type)
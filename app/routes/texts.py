@@ -1,18 +1,77 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Form, Request
-import os
-from pathlib import Path
-import uuid
+import asyncio
+import base64
+import hashlib
+import json
+import time
+from datetime import datetime
+
+from celery.result import AsyncResult
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Form, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from app.db import get_session
 from app.core.security import get_current_user
-from app.schemas import TextEntryResponse
-from app.crud import get_texts_by_user, get_text_by_id, delete_text_entry_by_id
+from app.schemas import ProcessResultResponse, TaskStatusResponse, TextEntryCreateRequest, TextEntryResponse
+from app.crud import create_text_entries, delete_text_entry_by_id, get_texts_page, get_text_by_id, update_text_entries
+from app.models import Category, Status
 from app.core.config import get_data_dir, settings
-from app.services.tasks import process_pipeline_task
+from app.core.constants import (
+    BATCH_MAX_ITEMS,
+    BATCH_PACK_SIZE,
+    BATCH_SMALL_TEXT_CHARS,
+    TASK_STATUS_MAX_WAIT_SECONDS,
+    TASK_STATUS_POLL_INTERVAL,
+    TASK_STREAM_KEEPALIVE_SECONDS,
+    TASK_STREAM_TIMEOUT_SECONDS,
+    TEXTS_MAX_PAGE_SIZE,
+    TEXTS_PAGE_SIZE,
+)
+from app.services.celery import celery
+from app.services.events import format_sse, task_events
+from app.services.tasks import process_batch_task, process_pipeline_task
+from app.services.tracing import inject
+from app.services.uploads import StoredUpload, UploadTooLarge, save_upload
+from celery import group
 
 
 router = APIRouter(prefix="/texts")
 
+
+async def _store_upload(file: UploadFile, user_id: int) -> StoredUpload:
+    try:
+        return await save_upload(file, get_data_dir(), user_id=user_id)
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+
+
+def _discard_uploads(stored: list[StoredUpload | None]) -> None:
+    for upload in stored:
+        if upload is None:
+            continue
+        try:
+            upload.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _entry_request(user_id: int, text: str | None = None, stored: StoredUpload | None = None) -> TextEntryCreateRequest:
+    # Uploads entram sem texto: o worker grava o conteúdo extraído junto com o resultado.
+    return TextEntryCreateRequest(user_id=user_id, original_text=text or "", **(stored.meta() if stored else {}))
+
+
+def _task_context(current_user) -> dict:
+    return {"user_id": current_user.id, "username": current_user.username, "reply_template": current_user.reply_template}
+
+
+async def _enqueue_failed(entry_ids: list[int]) -> HTTPException:
+    try:
+        await update_text_entries(entry_ids, status=Status.FAILED.value)
+    except Exception:
+        pass
+    return HTTPException(status_code=503, detail="Serviço de processamento indisponível; tente novamente mais tarde")
+
+
 @router.post("/processar_email")
 async def processar_email(request: Request, file: UploadFile | None = File(None), text: str | None = Form(None), session=Depends(get_session), current_user=Depends(get_current_user)):
     try:
@@ -25,28 +84,251 @@ async def processar_email(request: Request, file: UploadFile | None = File(None)
     except Exception:
         raise
 
+    stored = None
     if file:
-        data_dir: Path = get_data_dir()
-        suffix = os.path.splitext(file.filename or "")[1] or ""
-        unique_name = f"upload-{uuid.uuid4().hex}{suffix}"
-        tmp_path = data_dir / unique_name
-        content = await file.read()
-        tmp_path.write_bytes(content)
-        process_kwargs = {"file_path": str(tmp_path), "user_id": current_user.id, "username": getattr(current_user, 'username', None)}
+        stored = await _store_upload(file, current_user.id)
+        process_kwargs = {"file_path": str(stored.path), "file_meta": stored.meta(), **_task_context(current_user)}
+        entry_req = _entry_request(current_user.id, stored=stored)
     else:
-        process_kwargs = {"text": text, "user_id": current_user.id, "username": getattr(current_user, 'username', None)}
+        process_kwargs = {"text": text, **_task_context(current_user)}
+        entry_req = _entry_request(current_user.id, text)
+
+    # A linha nasce aqui, na sessão da requisição; o worker só faz o UPDATE final.
+    try:
+        (entry,) = await create_text_entries(session, [entry_req])
+    except BaseException:
+        _discard_uploads([stored])
+        raise
+    process_kwargs["text_entry_id"] = entry.id
 
     try:
         task_obj = process_pipeline_task
-        async_result = task_obj.apply_async(kwargs=process_kwargs)
-        return {"task_id": getattr(async_result, "id", None), "status": "queued"}
+        async_result = task_obj.apply_async(kwargs=process_kwargs, headers=inject())
+    except Exception:
+        _discard_uploads([stored])
+        raise await _enqueue_failed([entry.id])
+    task_id = getattr(async_result, "id", None)
+    if task_id:
+        await task_events.set_owner(task_id, current_user.id)
+    return {"task_id": task_id, "id": entry.id, "status": "queued"}
+
+
+@router.post("/processar_lote")
+async def processar_lote(files: list[UploadFile] | None = File(None), texts: list[str] | None = Form(None), session=Depends(get_session), current_user=Depends(get_current_user)):
+    files = [f for f in (files or []) if f is not None]
+    texts = [t for t in (texts or []) if t and t.strip()]
+    if not files and not texts:
+        raise HTTPException(status_code=400, detail="Enviar 'texts' ou 'files'")
+    if len(files) + len(texts) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Máximo de {BATCH_MAX_ITEMS} itens por lote")
+
+    base_kwargs = _task_context(current_user)
+
+    small = [t for t in texts if len(t) <= BATCH_SMALL_TEXT_CHARS]
+    large = [t for t in texts if len(t) > BATCH_SMALL_TEXT_CHARS]
+
+    pack_size = max(BATCH_PACK_SIZE, 1)
+    # (task, kwargs, linhas de TextEntry da task)
+    jobs = []
+    for i in range(0, len(small), pack_size):
+        chunk = small[i:i + pack_size]
+        if len(chunk) == 1:
+            jobs.append((process_pipeline_task, {"text": chunk[0]}, [_entry_request(current_user.id, chunk[0])]))
+        else:
+            jobs.append((process_batch_task, {"texts": chunk}, [_entry_request(current_user.id, t) for t in chunk]))
+    for t in large:
+        jobs.append((process_pipeline_task, {"text": t}, [_entry_request(current_user.id, t)]))
+    # Arquivos já gravados saem do disco se o lote parar antes de enfileirar (413 de um arquivo seguinte, erro no banco).
+    stored_uploads: list[StoredUpload] = []
+    try:
+        for f in files:
+            stored = await _store_upload(f, current_user.id)
+            stored_uploads.append(stored)
+            jobs.append((process_pipeline_task, {"file_path": str(stored.path), "file_meta": stored.meta()}, [_entry_request(current_user.id, stored=stored)]))
+
+        entries = await create_text_entries(session, [req for _, _, reqs in jobs for req in reqs])
+    except BaseException:
+        _discard_uploads(stored_uploads)
+        raise
+    entry_ids = iter(e.id for e in entries)
+    signatures = []
+    for task, kwargs, reqs in jobs:
+        ids = [next(entry_ids) for _ in reqs]
+        if task is process_batch_task:
+            kwargs["text_entry_ids"] = ids
+        else:
+            kwargs["text_entry_id"] = ids[0]
+        signatures.append(task.s(**kwargs, **base_kwargs).set(headers=inject()))
+
+    try:
+        group_result = group(signatures).apply_async()
+        try:
+            group_result.save()
+        except Exception:
+            pass
+    except Exception:
+        _discard_uploads(stored_uploads)
+        raise await _enqueue_failed([e.id for e in entries])
+    task_ids = [getattr(r, "id", None) for r in group_result.results]
+    for task_id in task_ids:
+        if task_id:
+            await task_events.set_owner(task_id, current_user.id)
+    return {
+        "group_id": getattr(group_result, "id", None),
+        "task_ids": task_ids,
+        "count": len(files) + len(texts),
+        "status": "queued",
+    }
+
+
+async def _check_task_owner(task_id: str, user_id: int) -> None:
+    try:
+        owner = await task_events.owner(task_id)
     except Exception:
         raise HTTPException(status_code=503, detail="Serviço de processamento indisponível; tente novamente mais tarde")
+    if owner is None or owner != user_id:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+
+def _read_task_status(task_id: str) -> TaskStatusResponse:
+    async_result = AsyncResult(task_id, app=celery)
+    state = async_result.state
+    status = TaskStatusResponse(task_id=task_id, status=state)
+    if state == "SUCCESS":
+        value = async_result.result
+        if isinstance(value, list):
+            status.results = [ProcessResultResponse.model_validate(v) for v in value if isinstance(v, dict)]
+        elif isinstance(value, dict):
+            status.result = ProcessResultResponse.model_validate(value)
+    elif state == "FAILURE":
+        status.error = str(async_result.result)
+    return status
+
+
+def _task_etag(status: TaskStatusResponse) -> str:
+    digest = hashlib.sha256(status.model_dump_json().encode("utf-8")).hexdigest()[:16]
+    return f'W/"{digest}"'
+
+
+_READY_STATES = frozenset({"SUCCESS", "FAILURE", "REVOKED"})
+
+
+@router.get("/tasks/{task_id}", response_model=TaskStatusResponse, response_model_exclude_none=True)
+async def get_task_status(
+    task_id: str,
+    response: Response,
+    wait: float = Query(0, ge=0, description="Segundos para aguardar uma mudança de estado (long-polling)"),
+    if_none_match: str | None = Header(None),
+    current_user=Depends(get_current_user),
+):
+    """Estado e resultado de uma task lidos do result backend do Celery.
+
+    Com `wait`, segura a requisição até a task terminar ou, se o cliente
+    mandou `If-None-Match`, até o estado mudar em relação a esse ETag.
+    Sem mudança dentro do prazo, responde 304.
+    """
+    await _check_task_owner(task_id, current_user.id)
+
+    deadline = time.monotonic() + min(wait, TASK_STATUS_MAX_WAIT_SECONDS)
+    while True:
+        try:
+            status = await run_in_threadpool(_read_task_status, task_id)
+        except Exception:
+            raise HTTPException(status_code=503, detail="Serviço de processamento indisponível; tente novamente mais tarde")
+        etag = _task_etag(status)
+        changed = if_none_match is None or etag != if_none_match
+        if changed and (if_none_match is not None or status.status in _READY_STATES):
+            break
+        if time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(TASK_STATUS_POLL_INTERVAL)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if not changed:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return status
+
+
+@router.get("/{task_id}/stream")
+async def stream_task(task_id: str, request: Request, last_event_id: str | None = Header(None), current_user=Depends(get_current_user)):
+    """Server-Sent Events com o progresso da task: `status`, `category`,
+    `token` (trechos da resposta conforme o modelo gera) e, ao final, `done`
+    ou `error`. Reconexões com `Last-Event-ID` retomam do evento seguinte."""
+    await _check_task_owner(task_id, current_user.id)
+
+    after_seq = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+
+    async def _events():
+        deadline = time.monotonic() + TASK_STREAM_TIMEOUT_SECONDS
+        async for event in task_events.follow(task_id, after_seq, keepalive=TASK_STREAM_KEEPALIVE_SECONDS):
+            if event is None:
+                if await request.is_disconnected() or time.monotonic() > deadline:
+                    return
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(event)
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _encode_cursor(created_at: datetime, text_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), text_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, text_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(text_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _enum_value(enum_cls, raw: str | None, field: str) -> str | None:
+    # Aceita o nome (COMPLETED, PRODUTIVO) ou o valor gravado ("Concluído", "Produtivo").
+    if raw is None:
+        return None
+    for member in enum_cls:
+        if raw.upper() == member.name or raw == member.value:
+            return member.value
+    raise HTTPException(status_code=400, detail=f"{field} inválido: {raw}")
 
 
-@router.get("/", response_model=list[TextEntryResponse])
-async def list_texts(session=Depends(get_session), current_user=Depends(get_current_user)):
-    items = await get_texts_by_user(session, current_user.id)
+@router.get("/", response_model=list[TextEntryResponse], response_model_exclude_unset=True)
+async def list_texts(
+    response: Response,
+    limit: int = Query(TEXTS_PAGE_SIZE, ge=1, le=TEXTS_MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+    status: str | None = Query(None),
+    category: str | None = Query(None),
+    created_from: datetime | None = Query(None),
+    created_to: datetime | None = Query(None),
+    fields: str = Query("full", pattern="^(full|summary)$", description="'summary' omite original_text e generated_response"),
+    session=Depends(get_session),
+    current_user=Depends(get_current_user),
+):
+    items = await get_texts_page(
+        session,
+        current_user.id,
+        limit,
+        after=_decode_cursor(cursor) if cursor else None,
+        status=_enum_value(Status, status, "status"),
+        category=_enum_value(Category, category, "category"),
+        created_from=created_from,
+        created_to=created_to,
+        summary=fields == "summary",
+    )
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        created_at, text_id = (last["created_at"], last["id"]) if isinstance(last, dict) else (last.created_at, last.id)
+        response.headers["X-Next-Cursor"] = _encode_cursor(created_at, text_id)
     return items
 
 @router.delete("/{text_id}", status_code=204)
@@ -1,9 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from celery.result import AsyncResult
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
 from app.db import get_session
-from app.schemas import UserResponse, UserUpdateRequest
-from app.crud import delete_user_by_id, get_user_by_id, get_users, update_current_user
+from app.schemas import AccountDeletionStatusResponse, UserResponse, UserUpdateRequest
+from app.crud import count_texts_by_user, get_user_by_id, get_users, update_current_user
+from app.core.constants import ACCOUNT_DELETE_ASYNC_THRESHOLD
 from app.core.security import get_current_user
+from app.services.celery import celery
+from app.services.events import task_events
+from app.services.principal_cache import principal_cache
+from app.services.tasks import delete_user_task
+from app.services.tracing import inject
+from app.services.user_service import delete_account
 
 router = APIRouter(prefix="/users")
 
@@ -14,7 +24,7 @@ async def get_users_list(session=Depends(get_session), current_user=Depends(get_
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(session=Depends(get_session), current_user=Depends(get_current_user)):
-    return await get_user_by_id(session, current_user.id)
+    return await get_user_by_id(session, current_user.id, with_texts=True)
 
 @router.put("/me", response_model=UserResponse)
 async def update_current_user_info(
@@ -30,7 +40,56 @@ async def update_current_user_info(
 
 @router.delete("/me", status_code=204)
 async def delete_current_user(session=Depends(get_session), current_user=Depends(get_current_user)):
-    success = await delete_user_by_id(session, current_user.id)
-    if not success:
+    """Remove a conta. Contas com muitos textos são removidas por uma task do
+    Celery: a resposta é 202 com o `task_id`, acompanhado em
+    `GET /users/deletions/{task_id}`."""
+    total = await count_texts_by_user(session, current_user.id)
+    if ACCOUNT_DELETE_ASYNC_THRESHOLD > 0 and total >= ACCOUNT_DELETE_ASYNC_THRESHOLD:
+        try:
+            async_result = delete_user_task.apply_async(kwargs={"user_id": current_user.id, "total_texts": total}, headers=inject())
+        except Exception:
+            raise HTTPException(status_code=503, detail="Serviço de processamento indisponível; tente novamente mais tarde")
+        await task_events.set_deletion_owner(async_result.id, current_user.id)
+        # O worker só invalida o cache do próprio processo: sem AUTH_CACHE_REDIS_URL, os nós da API
+        # continuariam autenticando a conta removida até o TTL. Invalida (e publica) já no enqueue.
+        await principal_cache.invalidate(current_user.id)
+        return JSONResponse(status_code=202, content={"task_id": async_result.id, "status": "queued", "total_texts": total})
+
+    if await delete_account(session, current_user.id) is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return
\ No newline at end of file
+    return Response(status_code=204)
+
+
+def _read_deletion_status(task_id: str) -> AccountDeletionStatusResponse:
+    async_result = AsyncResult(task_id, app=celery)
+    status = AccountDeletionStatusResponse(task_id=task_id, status=async_result.state)
+    info = async_result.info
+    if async_result.state == "FAILURE":
+        status.error = str(info)
+    elif isinstance(info, dict):
+        status.deleted_texts = info.get("deleted_texts")
+        status.total_texts = info.get("total_texts")
+        status.removed_files = info.get("removed_files")
+    return status
+
+
+@router.get("/deletions/{task_id}", response_model=AccountDeletionStatusResponse, response_model_exclude_none=True)
+async def get_deletion_status(task_id: str):
+    """Progresso da remoção de uma conta.
+
+    Sem autenticação: o usuário deixa de existir ao fim da task, então o
+    `task_id` (só devolvido a quem pediu a remoção) serve de credencial.
+    Só ids registrados como remoção de conta resolvem; os demais (inclusive
+    tasks do pipeline de textos) respondem 404.
+    """
+    try:
+        owner = await task_events.deletion_owner(task_id)
+        status = await run_in_threadpool(_read_deletion_status, task_id) if owner is not None else None
+    except Exception:
+        raise HTTPException(status_code=503, detail="Serviço de processamento indisponível; tente novamente mais tarde")
+    if status is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if status.status == "SUCCESS":
+        # Principal recarregado durante a remoção (a linha ainda existia) sai do cache deste nó.
+        await principal_cache.invalidate(owner)
+    return status
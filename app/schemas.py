@@ -15,6 +15,16 @@ class UserUpdateRequest(BaseModel):
     email: str | None = None
     current_password: str | None = None
     new_password: str | None = None
+    reply_template: str | None = None
+
+class CurrentUser(BaseModel):
+    """Identidade do usuário autenticado: só as colunas de `user`, sem relacionamentos."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    username: str
+    email: str
+    reply_template: str | None = None
 
 class UserResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -22,12 +32,16 @@ class UserResponse(BaseModel):
     id: int
     username: str
     email: str
+    reply_template: str | None = None
     texts: list["TextEntryResponse"]
     
 class TextEntryCreateRequest(BaseModel):
     user_id: int
     original_text: str | None = None
     file_name: str | None = None
+    file_size: int | None = None
+    file_content_type: str | None = None
+    file_sha256: str | None = None
     
 class TextEntryResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -40,6 +54,8 @@ class TextEntryResponse(BaseModel):
     created_at: datetime
     generated_response: str | None = None
     file_name: str | None = None
+    prompt_version: str | None = None
+    preview: str | None = None
     
 class TokenResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -50,13 +66,24 @@ class TokenResponse(BaseModel):
 
 
 class ProcessResultResponse(BaseModel):
+    id: int | None = None
     category: str
     confidence: float | None = None
     generated_response: str | None = None
+    source: str | None = None
 
 class TaskStatusResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
     task_id: str
     status: str
-    result: ProcessResultResponse | None = None
\ No newline at end of file
+    result: ProcessResultResponse | None = None
+    results: list[ProcessResultResponse] | None = None
+    error: str | None = None
+class AccountDeletionStatusResponse(BaseModel):
+    task_id: str
+    status: str
+    deleted_texts: int | None = None
+    total_texts: int | None = None
+    removed_files: int | None = None
+    error: str | None = None
@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+
+from app.core.constants import (
+    RESULT_CACHE_BACKEND,
+    RESULT_CACHE_MAX_ENTRIES,
+    RESULT_CACHE_REDIS_URL,
+    RESULT_CACHE_TTL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAMESPACE = "autou:result-cache"
+
+
+class CacheBackend:
+    name = "base"
+    # Backends que fazem I/O de rede: as versões async do ResultCache os chamam fora do event loop.
+    blocking = False
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def record(self, hit: bool) -> None:
+        pass
+
+    def shared_stats(self) -> Dict[str, int] | None:
+        return None
+
+
+class NullCacheBackend(CacheBackend):
+    name = "none"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """LRU em memória com expiração por TTL (por processo)."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES, ttl_seconds: int = RESULT_CACHE_TTL_SECONDS):
+        self._data: TTLCache = TTLCache(maxsize=max_entries, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._data.get(key)
+        return dict(value) if value is not None else None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._data[key] = dict(value)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class RedisCacheBackend(CacheBackend):
+    """Cache compartilhado entre workers, usando o Redis do result backend do Celery."""
+
+    name = "redis"
+    blocking = True
+
+    def __init__(self, url: str = RESULT_CACHE_REDIS_URL, ttl_seconds: int = RESULT_CACHE_TTL_SECONDS):
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_connect_timeout=2, socket_timeout=2)
+        # from_url não conecta: sem o ping, um Redis fora do ar só apareceria no primeiro get.
+        self._client.ping()
+        self._ttl = ttl_seconds
+        self._stats_key = f"{CACHE_NAMESPACE}:stats"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self._client.get(key)
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._client.set(key, json.dumps(value, ensure_ascii=False), ex=self._ttl)
+
+    def record(self, hit: bool) -> None:
+        self._client.hincrby(self._stats_key, "hits" if hit else "misses", 1)
+
+    def shared_stats(self) -> Dict[str, int] | None:
+        raw = self._client.hgetall(self._stats_key) or {}
+        return {k.decode() if isinstance(k, bytes) else k: int(v) for k, v in raw.items()}
+
+
+class ResultCache:
+    """Cache endereçado por conteúdo para os resultados do pipeline de classificação.
+
+    Falhas do backend nunca interrompem o pipeline: são contadas como miss.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @staticmethod
+    def make_key(cleaned_text: str, model: str, prompt_version: str, username: str | None = None, reply_mode: str | None = None) -> str:
+        normalized = " ".join((cleaned_text or "").split())
+        material = "\x1f".join([model or "", prompt_version or "", reply_mode or "", username or "", normalized])
+        digest = hashlib.sha256(material.encode("utf-8")).hexdigest()
+        return f"{CACHE_NAMESPACE}:{digest}"
+
+    def _count(self, attr: str) -> None:
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            self._count("errors")
+            value = None
+        hit = value is not None
+        self._count("hits" if hit else "misses")
+        try:
+            self.backend.record(hit)
+        except Exception:
+            pass
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        try:
+            self.backend.set(key, value)
+        except Exception:
+            self._count("errors")
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.get, key)
+        return self.get(key)
+
+    async def aget_many(self, keys: list[str]) -> list[Optional[Dict[str, Any]]]:
+        if self.backend.blocking:
+            return await asyncio.to_thread(lambda: [self.get(k) for k in keys])
+        return [self.get(k) for k in keys]
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        if self.backend.blocking:
+            await asyncio.to_thread(self.set, key, value)
+        else:
+            self.set(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses, errors = self.hits, self.misses, self.errors
+        shared = None
+        try:
+            shared = self.backend.shared_stats()
+        except Exception:
+            shared = None
+        if shared is not None:
+            hits, misses = shared.get("hits", 0), shared.get("misses", 0)
+        total = hits + misses
+        return {
+            "backend": self.backend.name,
+            "hits": hits,
+            "misses": misses,
+            "errors": errors,
+            "hit_rate": (hits / total) if total else 0.0,
+        }
+
+
+def _build_backend(name: str) -> CacheBackend:
+    if name == "redis":
+        try:
+            return RedisCacheBackend()
+        except Exception as exc:
+            logger.warning("Redis result cache unavailable, falling back to memory: %s", exc)
+            return MemoryCacheBackend()
+    if name in ("none", "off", "false", "0"):
+        return NullCacheBackend()
+    return MemoryCacheBackend()
+
+
+result_cache = ResultCache(_build_backend(RESULT_CACHE_BACKEND))
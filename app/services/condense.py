@@ -0,0 +1,134 @@
+import re
+from typing import Any, Callable, Dict
+
+from app.core.constants import LLM_INPUT_HEAD_RATIO, LLM_INPUT_MAX_TOKENS, LLM_INPUT_STRIP_NOISE
+
+# Cabeçalhos que iniciam o histórico citado de uma resposta: tudo a partir deles é descartado.
+_REPLY_HEADER_RE = re.compile(
+    r"^\s*(?:"
+    r"(?:Em|On)\s.{0,200}?(?:escreveu|wrote)\s*:"
+    r"|-{2,}\s*(?:Original Message|Mensagem original)\s*-{2,}"
+    r"|_{10,}"
+    r")\s*$",
+    flags=re.IGNORECASE,
+)
+_OUTLOOK_FROM_RE = re.compile(r"^\s*(?:De|From)\s*:\s*\S", flags=re.IGNORECASE)
+_OUTLOOK_FIELD_RE = re.compile(r"^\s*(?:Enviad[oa](?:\s+em)?|Sent|Para|To|Data|Date|Assunto|Subject)\s*:", flags=re.IGNORECASE)
+_SIGNATURE_DELIMITER_RE = re.compile(r"^--\s?$")
+_MOBILE_SIGNATURE_RE = re.compile(r"^\s*(?:Enviado do meu|Enviado de meu|Sent from my|Get Outlook for)\b.*$", flags=re.IGNORECASE)
+# Avisos legais: só no bloco final do e-mail, com forma de frase ("esta mensagem ... confidencial"
+# + menção ao destinatário/uso) ou com cabeçalho "Aviso legal:" no início do parágrafo. Palavras
+# soltas como "confidencialidade" aparecem em pedidos legítimos e não bastam.
+_DISCLAIMER_HEADER_RE = re.compile(r"^\s*(?:aviso legal|disclaimer|confidentiality notice)\s*:", flags=re.IGNORECASE)
+_DISCLAIMER_SENTENCE_RE = re.compile(
+    r"(?:(?:esta|essa) (?:mensagem|comunica[çc][ãa]o)|este e-?mail).{0,160}?confiden"
+    r"|this (?:e-?mail|message|communication).{0,160}?confidential",
+    flags=re.IGNORECASE | re.DOTALL,
+)
+_DISCLAIMER_CUE_RE = re.compile(
+    r"destinat[áa]ri|uso exclusivo|autoriza|proibid|intended (?:solely )?for|intended recipient|prohibited|notify the sender",
+    flags=re.IGNORECASE,
+)
+
+
+def _is_disclaimer(paragraph: str) -> bool:
+    if _DISCLAIMER_HEADER_RE.match(paragraph):
+        return True
+    return bool(_DISCLAIMER_SENTENCE_RE.search(paragraph) and _DISCLAIMER_CUE_RE.search(paragraph))
+
+
+def _is_outlook_header(lines: list[str], i: int) -> bool:
+    if not _OUTLOOK_FROM_RE.match(lines[i]):
+        return False
+    following = [l for l in lines[i + 1:i + 5] if l.strip()]
+    return sum(1 for l in following if _OUTLOOK_FIELD_RE.match(l)) >= 2
+
+
+def strip_noise(text: str) -> tuple[str, Dict[str, int]]:
+    """Remove histórico citado, assinaturas e avisos legais, preservando o corpo do e-mail.
+
+    Mensagens encaminhadas não são removidas: o conteúdo encaminhado costuma ser
+    justamente o que deve ser classificado.
+    """
+    removed = {"quoted_chars": 0, "signature_chars": 0, "disclaimer_chars": 0}
+    lines = text.splitlines()
+
+    cut = None
+    for i, line in enumerate(lines):
+        if _REPLY_HEADER_RE.match(line) or _is_outlook_header(lines, i):
+            cut = i
+            break
+    if cut is not None:
+        removed["quoted_chars"] += sum(len(l) + 1 for l in lines[cut:])
+        lines = lines[:cut]
+
+    kept: list[str] = []
+    for line in lines:
+        if line.lstrip().startswith(">"):
+            removed["quoted_chars"] += len(line) + 1
+            continue
+        if _MOBILE_SIGNATURE_RE.match(line):
+            removed["signature_chars"] += len(line) + 1
+            continue
+        kept.append(line)
+    lines = kept
+
+    for i, line in enumerate(lines):
+        if _SIGNATURE_DELIMITER_RE.match(line):
+            removed["signature_chars"] += sum(len(l) + 1 for l in lines[i:])
+            lines = lines[:i]
+            break
+
+    # Avisos legais só saem do fim do e-mail (depois do corpo e da assinatura).
+    body = re.split(r"\n\s*\n", "\n".join(lines))
+    while body and (not body[-1].strip() or _is_disclaimer(body[-1])):
+        paragraph = body.pop()
+        if paragraph.strip():
+            removed["disclaimer_chars"] += len(paragraph) + 2
+
+    stripped = "\n\n".join(body).strip()
+    if not stripped:
+        return text, {k: 0 for k in removed}
+    return stripped, removed
+
+
+def cap_tokens(tokens: list[str], max_tokens: int, head_ratio: float = LLM_INPUT_HEAD_RATIO) -> tuple[list[str], int]:
+    """Mantém o início e o final da sequência dentro de `max_tokens`."""
+    if not max_tokens or len(tokens) <= max_tokens:
+        return tokens, 0
+    head = max(1, min(max_tokens, int(max_tokens * head_ratio)))
+    tail = max_tokens - head
+    kept = tokens[:head] + (tokens[-tail:] if tail else [])
+    return kept, len(tokens) - len(kept)
+
+
+def condense_for_llm(
+    original_text: str,
+    nlp_res: Dict[str, Any],
+    preprocess: Callable[[str], Dict[str, Any]],
+    max_tokens: int = LLM_INPUT_MAX_TOKENS,
+    strip: bool = LLM_INPUT_STRIP_NOISE,
+) -> Dict[str, Any]:
+    """Etapa entre o pré-processamento e o LLM: limita o texto enviado ao modelo.
+
+    Retorna o texto a ser enviado (`text`) e quanto foi descartado.
+    """
+    removed = {"quoted_chars": 0, "signature_chars": 0, "disclaimer_chars": 0}
+    source = nlp_res
+    if strip:
+        stripped, removed = strip_noise(original_text)
+        if stripped != original_text:
+            source = preprocess(stripped)
+
+    tokens = source.get("tokens") or source.get("cleaned_text", "").split()
+    kept, dropped = cap_tokens(tokens, max_tokens)
+    text = " ".join(kept) if dropped else source.get("cleaned_text", "")
+
+    return {
+        "text": text,
+        "original_tokens": nlp_res.get("total_tokens", len(nlp_res.get("tokens") or [])),
+        "kept_tokens": len(kept),
+        "dropped_tokens": dropped,
+        "truncated": dropped > 0,
+        **removed,
+    }
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+import weakref
+from typing import Any, AsyncIterator, Dict
+
+from app.core.constants import TASK_EVENTS_ENABLED, TASK_EVENTS_REDIS_URL, TASK_EVENTS_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+EVENTS_NAMESPACE = "autou:task"
+
+# Eventos que encerram o stream de uma task.
+TERMINAL_EVENTS: frozenset[str] = frozenset({"done", "error"})
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    data = json.dumps(event.get("data"), ensure_ascii=False)
+    return f"id: {event['seq']}\nevent: {event['event']}\ndata: {data}\n\n"
+
+
+class TaskEvents:
+    """Eventos de progresso de uma task publicados no Redis.
+
+    Cada evento recebe um `seq` crescente e vai para uma lista (histórico,
+    para quem se conectar depois) e para um canal pub/sub (tempo real). O
+    cliente `redis.asyncio` é preso ao event loop em que foi criado, por isso
+    há um por loop (worker e API usam loops diferentes).
+    """
+
+    def __init__(self, url: str = TASK_EVENTS_REDIS_URL, ttl_seconds: int = TASK_EVENTS_TTL_SECONDS, enabled: bool = TASK_EVENTS_ENABLED):
+        self.url = url
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def _log_key(task_id: str) -> str:
+        return f"{EVENTS_NAMESPACE}:{task_id}:events"
+
+    @staticmethod
+    def _channel(task_id: str) -> str:
+        return f"{EVENTS_NAMESPACE}:{task_id}:channel"
+
+    @staticmethod
+    def _owner_key(task_id: str) -> str:
+        return f"{EVENTS_NAMESPACE}:{task_id}:owner"
+
+    @staticmethod
+    def _deletion_owner_key(task_id: str) -> str:
+        # Espaço próprio: ids de tasks do pipeline não resolvem em GET /users/deletions/{task_id}.
+        return f"{EVENTS_NAMESPACE}:deletion:{task_id}:owner"
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            import redis.asyncio as aioredis
+
+            client = aioredis.Redis.from_url(self.url)
+            self._clients[loop] = client
+        return client
+
+    async def publish(self, task_id: str, events: list[Dict[str, Any]]) -> None:
+        if not events:
+            return
+        payloads = [json.dumps(e, ensure_ascii=False) for e in events]
+        pipe = self._client().pipeline(transaction=False)
+        pipe.rpush(self._log_key(task_id), *payloads)
+        pipe.expire(self._log_key(task_id), self.ttl_seconds)
+        for payload in payloads:
+            pipe.publish(self._channel(task_id), payload)
+        await pipe.execute()
+
+    async def set_owner(self, task_id: str, user_id: int) -> None:
+        # Gravado mesmo com eventos desligados: GET /texts/tasks/{task_id} também usa o dono.
+        try:
+            await self._client().set(self._owner_key(task_id), str(user_id), ex=self.ttl_seconds)
+        except Exception as exc:
+            logger.warning("Could not record owner of task %s: %s", task_id, exc)
+
+    async def owner(self, task_id: str) -> int | None:
+        raw = await self._client().get(self._owner_key(task_id))
+        return int(raw) if raw is not None else None
+
+    async def set_deletion_owner(self, task_id: str, user_id: int) -> None:
+        try:
+            await self._client().set(self._deletion_owner_key(task_id), str(user_id), ex=self.ttl_seconds)
+        except Exception as exc:
+            logger.warning("Could not record owner of deletion task %s: %s", task_id, exc)
+
+    async def deletion_owner(self, task_id: str) -> int | None:
+        raw = await self._client().get(self._deletion_owner_key(task_id))
+        return int(raw) if raw is not None else None
+
+    async def backlog(self, task_id: str, after_seq: int = 0) -> list[Dict[str, Any]]:
+        raw = await self._client().lrange(self._log_key(task_id), after_seq, -1)
+        return [e for e in (json.loads(r) for r in raw) if e.get("seq", 0) > after_seq]
+
+    async def follow(self, task_id: str, after_seq: int = 0, keepalive: float = 15.0) -> AsyncIterator[Dict[str, Any] | None]:
+        """Histórico a partir de `after_seq` seguido dos eventos ao vivo.
+
+        A inscrição no canal acontece antes da leitura do histórico, então
+        nenhum evento se perde entre as duas etapas; duplicados são
+        descartados pelo `seq`. Produz None a cada `keepalive` segundos sem
+        eventos e termina no primeiro evento terminal.
+        """
+        pubsub = self._client().pubsub()
+        await pubsub.subscribe(self._channel(task_id))
+        try:
+            last = after_seq
+            for event in await self.backlog(task_id, after_seq):
+                last = event["seq"]
+                yield event
+                if event["event"] in TERMINAL_EVENTS:
+                    return
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=keepalive)
+                if message is None:
+                    yield None
+                    continue
+                event = json.loads(message["data"])
+                if event.get("seq", 0) <= last:
+                    continue
+                last = event["seq"]
+                yield event
+                if event["event"] in TERMINAL_EVENTS:
+                    return
+        finally:
+            try:
+                await pubsub.unsubscribe(self._channel(task_id))
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+    def stream(self, task_id: str | None) -> "TaskStream":
+        return TaskStream(self if self.enabled and task_id else None, task_id)
+
+
+class TaskStream:
+    """Publicador de eventos de uma única task.
+
+    `emit` é síncrono e não bloqueia: os eventos entram numa fila e uma task
+    do loop os envia em ordem, agrupando o que estiver pendente num único
+    pipeline do Redis. Falhas de publicação são registradas e ignoradas; o
+    resultado da task nunca depende do stream.
+    """
+
+    def __init__(self, events: TaskEvents | None, task_id: str | None):
+        self.events = events
+        self.task_id = task_id
+        self._seq = 0
+        self._queue: asyncio.Queue | None = None
+        self._drainer: asyncio.Task | None = None
+
+    @property
+    def active(self) -> bool:
+        return self.events is not None
+
+    def emit(self, event: str, data: Any = None) -> None:
+        if self.events is None:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._drainer = asyncio.get_running_loop().create_task(self._drain())
+        self._seq += 1
+        self._queue.put_nowait({"seq": self._seq, "event": event, "data": data})
+
+    async def _drain(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            closing = batch[-1] is None
+            batch = [e for e in batch if e is not None]
+            try:
+                await self.events.publish(self.task_id, batch)
+            except Exception as exc:
+                logger.warning("Could not publish events for task %s: %s", self.task_id, exc)
+            if closing:
+                return
+
+    async def aclose(self, timeout: float = 5.0) -> None:
+        if self._drainer is None:
+            return
+        self._queue.put_nowait(None)
+        try:
+            await asyncio.wait_for(self._drainer, timeout)
+        except Exception:
+            self._drainer.cancel()
+
+
+task_events = TaskEvents()
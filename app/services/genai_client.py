@@ -0,0 +1,350 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from dataclasses import asdict, dataclass
+from typing import Any, Dict
+
+import google.genai as genai
+import httpx
+
+try:
+    from google.genai import types as genai_types
+except Exception:
+    genai_types = None
+
+try:
+    from google.genai.errors import ClientError as GenAIClientError
+except Exception:
+    GenAIClientError = None
+
+from app.core.constants import (
+    GENAI_API_KEY,
+    GENAI_CLIENT_MAX_AGE_SECONDS,
+    GENAI_CLIENT_MAX_ERRORS,
+    GENAI_CLIENT_MAX_USES,
+    GENAI_CONTEXT_CACHE,
+    GENAI_CONTEXT_CACHE_TTL_SECONDS,
+    GENAI_HTTP_KEEPALIVE_EXPIRY,
+    GENAI_HTTP_MAX_CONNECTIONS,
+    GENAI_HTTP_MAX_KEEPALIVE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CallTimings:
+    queue_ms: float = 0.0
+    setup_ms: float = 0.0
+    first_token_ms: float | None = None
+    total_ms: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class LatencyStats:
+    def __init__(self):
+        self.calls = 0
+        self.setup_ms = 0.0
+        self.first_token_ms = 0.0
+        self.first_token_calls = 0
+        self.total_ms = 0.0
+        self.last: CallTimings | None = None
+
+    def add(self, timings: CallTimings) -> None:
+        self.calls += 1
+        self.setup_ms += timings.setup_ms
+        self.total_ms += timings.total_ms
+        if timings.first_token_ms is not None:
+            self.first_token_ms += timings.first_token_ms
+            self.first_token_calls += 1
+        self.last = timings
+
+    def as_dict(self) -> Dict[str, Any]:
+        calls = self.calls or 1
+        return {
+            "calls": self.calls,
+            "avg_setup_ms": self.setup_ms / calls,
+            "avg_first_token_ms": (self.first_token_ms / self.first_token_calls) if self.first_token_calls else None,
+            "avg_total_ms": self.total_ms / calls,
+            "last": self.last.as_dict() if self.last else None,
+        }
+
+
+class GenAIClientManager:
+    """Mantém um único `genai.Client` por processo, com pool HTTP keep-alive.
+
+    O cliente é criado sob demanda (depois do fork dos workers do Celery) e é
+    reciclado por idade, número de usos ou falhas consecutivas.
+
+    O cliente assíncrono (`client.aio`) mantém conexões presas ao event loop em
+    que foram abertas, por isso é recriado quando o loop em execução muda.
+    """
+
+    def __init__(
+        self,
+        api_key: str | None = GENAI_API_KEY,
+        max_age_seconds: int = GENAI_CLIENT_MAX_AGE_SECONDS,
+        max_uses: int = GENAI_CLIENT_MAX_USES,
+        max_consecutive_errors: int = GENAI_CLIENT_MAX_ERRORS,
+    ):
+        self.api_key = api_key
+        self.max_age_seconds = max_age_seconds
+        self.max_uses = max_uses
+        self.max_consecutive_errors = max_consecutive_errors
+        self._reset_state()
+
+    def _reset_state(self) -> None:
+        self._lock = threading.Lock()
+        self._client = None
+        self._pid = os.getpid()
+        self._created_at = 0.0
+        self._uses = 0
+        self._consecutive_errors = 0
+        self._recycles = 0
+        self._aio_client = None
+        self._aio_loop = None
+        self.latency = LatencyStats()
+
+    def _after_fork(self) -> None:
+        # O cliente herdado do processo pai compartilha sockets com ele:
+        # apenas descarta a referência, sem fechar conexões.
+        self._reset_state()
+
+    def _http_options(self):
+        if genai_types is None:
+            return None
+        limits = httpx.Limits(
+            max_connections=GENAI_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=GENAI_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=GENAI_HTTP_KEEPALIVE_EXPIRY,
+        )
+        try:
+            return genai_types.HttpOptions(client_args={"limits": limits}, async_client_args={"limits": limits})
+        except Exception:
+            return None
+
+    def _build(self):
+        http_options = self._http_options()
+        if http_options is not None:
+            try:
+                return genai.Client(api_key=self.api_key, http_options=http_options)
+            except TypeError:
+                pass
+        return genai.Client(api_key=self.api_key)
+
+    def _should_recycle(self) -> str | None:
+        if self._client is None:
+            return None
+        if self.max_age_seconds and time.monotonic() - self._created_at > self.max_age_seconds:
+            return "max_age"
+        if self.max_uses and self._uses >= self.max_uses:
+            return "max_uses"
+        if self.max_consecutive_errors and self._consecutive_errors >= self.max_consecutive_errors:
+            return "errors"
+        return None
+
+    def _close(self, client) -> None:
+        close = getattr(client, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception:
+                pass
+
+    def _close_aio(self, client, loop: asyncio.AbstractEventLoop | None) -> None:
+        # O pool assíncrono só pode ser fechado no loop que o criou, e só se esse loop ainda estiver rodando.
+        aclose = getattr(getattr(client, "aio", None), "aclose", None)
+        if not callable(aclose) or loop is None or loop.is_closed() or not loop.is_running():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(aclose(), loop)
+        except Exception:
+            pass
+
+    def get(self):
+        if not self.api_key:
+            raise RuntimeError("GenAI API not configured: set GENAI_API_KEY")
+        if not hasattr(genai, "Client"):
+            raise RuntimeError("google.genai client (genai.Client) is not available in this environment")
+        if self._pid != os.getpid():
+            self._after_fork()
+        with self._lock:
+            reason = self._should_recycle()
+            if reason is not None:
+                logger.info("Recycling GenAI client (%s)", reason)
+                self._close(self._client)
+                self._client = None
+                self._aio_client = None
+                self._aio_loop = None
+                self._recycles += 1
+            if self._client is None:
+                self._client = self._build()
+                self._created_at = time.monotonic()
+                self._uses = 0
+                self._consecutive_errors = 0
+            self._uses += 1
+            return self._client
+
+    def get_async(self):
+        client = self.get()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._aio_client is not client or self._aio_loop is None or self._aio_loop() is not loop:
+                if self._aio_client is client:
+                    # Mesmo cliente, loop diferente: as conexões assíncronas antigas não servem mais.
+                    # Fecha o cliente antigo como em recycle(); sem isso, cada asyncio.run vazava um cliente.
+                    self._close_aio(client, self._aio_loop() if self._aio_loop is not None else None)
+                    self._close(client)
+                    self._client = self._build()
+                    self._created_at = time.monotonic()
+                    self._uses = 1
+                    client = self._client
+                self._aio_client = client
+                self._aio_loop = weakref.ref(loop)
+            return client.aio
+
+    def recycle(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._close(self._client)
+                self._client = None
+                self._aio_client = None
+                self._aio_loop = None
+                self._recycles += 1
+
+    def report_success(self, timings: CallTimings | None = None) -> None:
+        with self._lock:
+            self._consecutive_errors = 0
+            if timings is not None:
+                self.latency.add(timings)
+        if timings is not None:
+            logger.debug(
+                "GenAI call setup=%.1fms first_token=%sms total=%.1fms",
+                timings.setup_ms,
+                f"{timings.first_token_ms:.1f}" if timings.first_token_ms is not None else "-",
+                timings.total_ms,
+            )
+
+    def report_failure(self, exc: BaseException | None = None) -> None:
+        with self._lock:
+            self._consecutive_errors += 1
+
+    def health(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "configured": bool(self.api_key),
+                "initialized": self._client is not None,
+                "pid": self._pid,
+                "age_seconds": (time.monotonic() - self._created_at) if self._client is not None else None,
+                "uses": self._uses,
+                "consecutive_errors": self._consecutive_errors,
+                "healthy": self._consecutive_errors < self.max_consecutive_errors if self.max_consecutive_errors else True,
+                "recycles": self._recycles,
+                "latency": self.latency.as_dict(),
+            }
+
+
+class ContextCache:
+    """Nomes de `cachedContents` do provedor para o prefixo estático de cada template.
+
+    Se o modelo não suportar cache de contexto (ou o prefixo for curto demais),
+    o provedor responde 400/404 e o template passa a ser enviado inteiro.
+    Outras falhas (timeout, 5xx, conexão) só pulam o cache por um tempo, com
+    backoff, antes de uma nova tentativa.
+    """
+
+    # Códigos do ClientError que indicam cache de contexto não suportado para o modelo/prefixo.
+    UNSUPPORTED_CODES = (400, 404)
+    RETRY_BASE_SECONDS = 30.0
+    RETRY_MAX_SECONDS = 900.0
+
+    def __init__(self, enabled: bool = GENAI_CONTEXT_CACHE, ttl_seconds: int = GENAI_CONTEXT_CACHE_TTL_SECONDS):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: Dict[tuple, tuple[str, float]] = {}
+        self._unsupported: set[tuple] = set()
+        # key -> (instante da próxima tentativa, falhas transitórias seguidas)
+        self._retry_at: Dict[tuple, tuple[float, int]] = {}
+
+    def _lookup(self, key: tuple) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    def _config(self, model: str, template):
+        return genai_types.CreateCachedContentConfig(
+            contents=[genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=template.prefix)])],
+            ttl=f"{self.ttl_seconds}s",
+            display_name=f"autou-{template.name}-{template.version}",
+        )
+
+    def _skip(self, key: tuple) -> bool:
+        if not self.enabled or genai_types is None or key in self._unsupported:
+            return True
+        with self._lock:
+            retry = self._retry_at.get(key)
+        return retry is not None and retry[0] > time.monotonic()
+
+    def _store(self, key: tuple, cache) -> str | None:
+        name = getattr(cache, "name", None)
+        if name:
+            with self._lock:
+                # Renova um pouco antes de o provedor expirar o cache.
+                self._entries[key] = (name, time.monotonic() + self.ttl_seconds * 0.9)
+                self._retry_at.pop(key, None)
+        return name
+
+    def _is_unsupported(self, exc: Exception) -> bool:
+        return GenAIClientError is not None and isinstance(exc, GenAIClientError) and getattr(exc, "code", None) in self.UNSUPPORTED_CODES
+
+    def _mark_failed(self, key: tuple, exc: Exception) -> None:
+        if self._is_unsupported(exc):
+            logger.info("Context cache unavailable for %s: %s", key, exc)
+            self._unsupported.add(key)
+            return
+        with self._lock:
+            failures = self._retry_at.get(key, (0.0, 0))[1] + 1
+            delay = min(self.RETRY_BASE_SECONDS * 2 ** (failures - 1), self.RETRY_MAX_SECONDS)
+            self._retry_at[key] = (time.monotonic() + delay, failures)
+        logger.warning("Context cache creation failed for %s, retrying in %.0fs: %s", key, delay, exc)
+
+    def get(self, client, model: str, template) -> str | None:
+        key = (model, template.version)
+        if self._skip(key):
+            return None
+        name = self._lookup(key)
+        if name:
+            return name
+        try:
+            return self._store(key, client.caches.create(model=model, config=self._config(model, template)))
+        except Exception as exc:
+            self._mark_failed(key, exc)
+            return None
+
+    async def aget(self, aio, model: str, template) -> str | None:
+        key = (model, template.version)
+        if self._skip(key):
+            return None
+        name = self._lookup(key)
+        if name:
+            return name
+        try:
+            return self._store(key, await aio.caches.create(model=model, config=self._config(model, template)))
+        except Exception as exc:
+            self._mark_failed(key, exc)
+            return None
+
+
+client_manager = GenAIClientManager()
+context_cache = ContextCache()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=client_manager._after_fork)
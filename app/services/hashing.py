@@ -0,0 +1,82 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app.core.constants import HASH_EXECUTOR, HASH_MAX_PENDING, HASH_WORKERS
+from app.core.security import hash_password, verify_password
+
+
+class HashingBusy(Exception):
+    """Fila do pool de hashing cheia: a API responde 503 com Retry-After."""
+
+
+class PasswordHasher:
+    """Pool limitado para hash e verificação de senhas (Argon2).
+
+    O Argon2 é caro de propósito em CPU e memória; rodá-lo no event loop
+    trava as demais requisições do worker do uvicorn. As operações vão para
+    um pool dedicado de `HASH_WORKERS` (threads — o argon2-cffi libera o GIL —
+    ou processos) e, quando há mais de `HASH_MAX_PENDING` operações em
+    execução ou na fila, novas chamadas falham na hora com `HashingBusy`.
+    """
+
+    def __init__(self, kind: str = HASH_EXECUTOR, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        self.kind = kind
+        self.workers = max(workers, 1)
+        self.max_pending = max(max_pending, self.workers)
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _run(self, fn: Callable, *args) -> Any:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HashingBusy("Muitas operações de senha em andamento; tente novamente em instantes")
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "executor": self.kind,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+password_hasher = PasswordHasher()
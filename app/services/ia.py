@@ -1,10 +1,26 @@
 import asyncio
 import os
+import re
+import time
+import weakref
 from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, Any
+from typing import Any, Callable, Dict
 import google.genai as genai
 from app.models import Category
-from app.core.constants import GENAI_API_KEY, GENAI_MAX_OUTPUT_TOKENS, GENAI_MODEL, GENAI_TEMPERATURE, IA_ASYNC_WORKERS
+from app.core.constants import (
+    GENAI_API_KEY,
+    GENAI_ASYNC_CONCURRENCY,
+    GENAI_MAX_OUTPUT_TOKENS,
+    GENAI_MODEL,
+    GENAI_TEMPERATURE,
+    IA_ASYNC_WORKERS,
+    IA_BACKEND,
+)
+from app.services import metrics
+from app.services.genai_client import CallTimings, client_manager, context_cache, genai_types
+from app.services.prompts import CLASSIFICATION_TEMPLATE, PromptTemplate
+from app.services.replies import uses_template
+from app.services.tracing import tracer
 
 if GENAI_API_KEY:
     try:
@@ -15,43 +31,137 @@ if GENAI_API_KEY:
     except Exception:
         pass
 
+# Hash do conteúdo estático do template: faz parte da chave do cache de
+# resultados e é gravado em TextEntry.prompt_version.
+PROMPT_VERSION: str = CLASSIFICATION_TEMPLATE.version
 
-def _call_genai_blocking(prompt: str) -> str:
-    if not GENAI_API_KEY:
-        raise RuntimeError("GenAI API not configured: set GENAI_API_KEY")
-    if not hasattr(genai, "Client"):
-        raise RuntimeError("google.genai client (genai.Client) is not available in this environment")
 
-    try:
-        try:
-            from google.genai import types as genai_types
-        except Exception:
-            genai_types = None
-        client = genai.Client(api_key=GENAI_API_KEY)
+def _build_request(prompt: str, cached_content: str | None = None):
+    contents = [
+        genai_types.Content(
+            role="user",
+            parts=[genai_types.Part.from_text(text=prompt)],
+        )
+    ]
+    config_kwargs = {"max_output_tokens": GENAI_MAX_OUTPUT_TOKENS, "temperature": GENAI_TEMPERATURE}
+    if cached_content:
+        config_kwargs["cached_content"] = cached_content
+    config = genai_types.GenerateContentConfig(**config_kwargs)
+    return contents, config
+
+
+def _chunk_text(chunk) -> str:
+    chunk_text = (
+        getattr(chunk, "text", None)
+        or getattr(chunk, "delta", None)
+        or getattr(chunk, "content", None)
+        or str(chunk)
+    )
+    return str(chunk_text)
+
+
+class _HeaderStop:
+    """Interrompe o stream quando as linhas de CATEGORIA e CONFIDENCE já chegaram
+    e `should_stop` decide que o restante (a resposta sugerida) não será usado."""
+
+    def __init__(self, should_stop: Callable[[str], bool] | None):
+        self.should_stop = should_stop
+        self.done = should_stop is None
+
+    def __call__(self, parts: list[str]) -> bool:
+        if self.done:
+            return False
+        head = "".join(parts)
+        if head.count("\n") < 2:
+            return False
+        self.done = True
+        return self.should_stop(head)
+
+
+class _StreamRelay:
+    """Converte os chunks do stream em eventos para o cliente.
+
+    Acumula até as linhas de CATEGORIA e CONFIDENCE chegarem, emite
+    `category` uma vez e, a partir daí, repassa o texto da resposta como
+    eventos `token` (sem o rótulo RESPOSTA_SUGERIDA).
+    """
+
+    _LABEL = "RESPOSTA_SUGERIDA:"
+
+    def __init__(self, on_event: Callable[[str, Any], None]):
+        self.on_event = on_event
+        self._head: list[str] = []
+        self._body_started = False
+        self._pending = ""
+
+    def feed(self, chunk: str) -> None:
+        if self._head is not None:
+            self._head.append(chunk)
+            head = "".join(self._head)
+            if head.count("\n") < 2:
+                return
+            self._head = None
+            parsed = parse_response(head)
+            self.on_event("category", {"category": parsed["category"], "confidence": parsed["confidence"]})
+            chunk = head.split("\n", 2)[2]
+        if not self._body_started:
+            # Espera o rótulo chegar inteiro para não repassá-lo ao cliente.
+            self._pending += chunk
+            stripped = self._pending.lstrip()
+            if len(stripped) < len(self._LABEL) and self._LABEL.startswith(stripped.upper()):
+                return
+            if stripped.upper().startswith(self._LABEL):
+                stripped = stripped[len(self._LABEL):].lstrip()
+            self._body_started = True
+            chunk, self._pending = stripped, ""
+        if chunk:
+            self.on_event("token", {"text": chunk})
+
+
+def _templated_reply_header(head: str) -> bool:
+    return uses_template(parse_response(head).get("category"))
+
+
+def _call_genai_blocking(prompt: str, timings: CallTimings | None = None, template: PromptTemplate | None = None, suffix: str | None = None, stop: Callable[[str], bool] | None = None, on_chunk: Callable[[str], None] | None = None) -> str:
+    timings = timings if timings is not None else CallTimings()
+    started = time.perf_counter()
+    client = client_manager.get()
 
+    try:
         if genai_types is not None:
-            contents = [
-                genai_types.Content(
-                    role="user",
-                    parts=[genai_types.Part.from_text(text=prompt)],
-                )
-            ]
-            config = genai_types.GenerateContentConfig(max_output_tokens=GENAI_MAX_OUTPUT_TOKENS, temperature=GENAI_TEMPERATURE)
+            cached = context_cache.get(client, GENAI_MODEL, template) if template is not None and suffix is not None else None
+            contents, config = _build_request(suffix if cached else prompt, cached)
+            timings.setup_ms = (time.perf_counter() - started) * 1000
 
             if hasattr(client.models, "generate_content_stream"):
-                response_text = ""
-                for chunk in client.models.generate_content_stream(model=GENAI_MODEL, contents=contents, config=config):
-                    chunk_text = (
-                        getattr(chunk, "text", None)
-                        or getattr(chunk, "delta", None)
-                        or getattr(chunk, "content", None)
-                        or str(chunk)
-                    )
-                    response_text += str(chunk_text)
+                parts: list[str] = []
+                header_stop = _HeaderStop(stop)
+                usage = None
+                stream = client.models.generate_content_stream(model=GENAI_MODEL, contents=contents, config=config)
+                try:
+                    for chunk in stream:
+                        if timings.first_token_ms is None:
+                            timings.first_token_ms = (time.perf_counter() - started) * 1000
+                        # O último chunk traz a contagem de tokens da chamada.
+                        usage = getattr(chunk, "usage_metadata", None) or usage
+                        parts.append(_chunk_text(chunk))
+                        if on_chunk is not None:
+                            on_chunk(parts[-1])
+                        if header_stop(parts):
+                            break
+                finally:
+                    # Parada antecipada: fecha o stream para devolver a conexão ao pool agora, não no GC.
+                    close = getattr(stream, "close", None)
+                    if callable(close):
+                        close()
+                response_text = "".join(parts)
+                metrics.record_llm_usage(usage)
             else:
                 resp = client.models.generate_content(model=GENAI_MODEL, contents=contents, config=config)
                 response_text = getattr(resp, "text", str(resp))
+                metrics.record_llm_usage(getattr(resp, "usage_metadata", None))
         else:
+            timings.setup_ms = (time.perf_counter() - started) * 1000
             resp = client.models.generate_content(
                 model=GENAI_MODEL,
                 contents=[{"role": "user", "content": [{"type": "text", "text": prompt}]}],
@@ -60,9 +170,11 @@ def _call_genai_blocking(prompt: str) -> str:
             )
             response_text = getattr(resp, "text", str(resp))
     except Exception as exc:
+        client_manager.report_failure(exc)
         raise RuntimeError(f"genai.Client call failed: {exc}") from exc
 
-
+    timings.total_ms = (time.perf_counter() - started) * 1000
+    client_manager.report_success(timings)
     return response_text
 
 
@@ -106,124 +218,169 @@ def _clean_sdk_artifacts(s: str) -> str:
     return out
 
 def build_prompt(text: str, username: str | None = None) -> str:
-    examples = [
-        {
-            "email": "Prezada equipe,\n\nFinalizei o relatório trimestral de desempenho e já o disponibilizei na pasta compartilhada: \\\\Servidor\\Projetos\\Relatorios\\2025_Q1\\.\nAlém do relatório em PDF, incluí também uma planilha em Excel com os indicadores detalhados por área (financeiro, comercial e operacional).\r\n\r\nMarquei a reunião de revisão para quarta-feira, dia 15/10, às 14h, via Microsoft Teams. O link já está no calendário, mas segue aqui também: https://teams.microsoft.com/l/meetup-join/123.\n\nPeço que todos leiam os tópicos 3.2 e 4.1 do relatório antes da reunião, pois serão foco de discussão.\n\nAtenciosamente,\nCarlos",
-            "category": "PRODUTIVO",
-            "reason": "O email contém entrega de relatórios, anexos em formatos diferentes, local de armazenamento, link de reunião e instruções claras para preparação.",
-            "suggested_response": "Olá Carlos,\n\nObrigado pelo envio do relatório trimestral e da planilha detalhada. Já acessamos os arquivos na pasta compartilhada (\\\\Servidor\\Projetos\\Relatorios\\2025_Q1\\).\n\nVamos revisar especialmente os tópicos 3.2 e 4.1 antes da reunião de quarta-feira (15/10 às 14h).\n\nAté lá,\nEquipe"
-        },
-        {
-            "email": "Bom dia,\n\nEnviei a versão final do contrato com o cliente XYZ. O documento foi salvo em: C:\\Users\\Public\\Documentos\\Contratos\\XYZ_Final.pdf\n\nSolicito que a equipe jurídica faça a revisão até amanhã, 29/09, para que possamos enviar ao cliente ainda dentro do prazo.\r\n\r\nAlém disso, precisamos que o time de finanças valide os valores da cláusula 5.3 (ajustes de pagamento).\n\nAbraços,\nFernanda",
-            "category": "PRODUTIVO",
-            "reason": "O email trata de contrato, prazos de revisão e validação de cláusulas financeiras.",
-            "suggested_response": "Bom dia Fernanda,\n\nRecebemos o contrato salvo em C:\\Users\\Public\\Documentos\\Contratos\\XYZ_Final.pdf.\n\nA equipe jurídica vai revisar os pontos legais até amanhã (29/09) e o financeiro validará os valores da cláusula 5.3.\n\nTe daremos retorno antes do prazo.\n\nAbs,\nEquipe"
-        },
-        {
-            "email": "Prezados,\n\nO cronograma atualizado do projeto Ômega já está disponível em: /mnt/projetos/omega/cronograma_v2.xlsx\n\nAs principais mudanças:\n- Entrega do módulo de autenticação adiada para 20/10.\n- Inclusão de uma nova etapa de testes de integração entre 22/10 e 25/10.\r\n- Ajustes nas dependências do módulo de relatórios.\n\nPor favor, confirmem se todos os responsáveis estão de acordo com as novas datas.\n\nObrigado,\nMariana",
-            "category": "PRODUTIVO",
-            "reason": "O email comunica mudanças relevantes no cronograma e pede validação da equipe.",
-            "suggested_response": "Oi Mariana,\n\nObrigado pelo envio do cronograma atualizado em /mnt/projetos/omega/cronograma_v2.xlsx.\n\nJá verificamos as mudanças: entrega do módulo de autenticação (20/10), etapa de testes de integração (22/10-25/10) e ajustes no módulo de relatórios.\n\nNossa equipe confirma que está de acordo com as novas datas.\n\nAtenciosamente,\nEquipe"
-        },
-        {
-            "email": "Boa tarde,\n\nAnexei o documento Indicadores_Q2.pdf com os resultados de desempenho do segundo trimestre.\nPrincipais pontos a observar:\r\n1) Crescimento de 12% no setor comercial.\n2) Redução de custos operacionais em 8%.\n3) Atraso na entrega de dois projetos (detalhes no anexo).\n\nSolicito que cada gestor prepare comentários sobre os indicadores de sua área para a reunião de sexta-feira, às 11h.\n\nAbraços,\nBeatriz",
-            "category": "PRODUTIVO",
-            "reason": "O email contém indicadores de desempenho e solicita análise da equipe antes da reunião.",
-            "suggested_response": "Boa tarde Beatriz,\n\nObrigado pelo envio do documento Indicadores_Q2.pdf.\n\nJá notamos os principais pontos: crescimento comercial (12%), redução de custos operacionais (8%) e atrasos em dois projetos.\n\nCada gestor vai preparar os comentários de sua área antes da reunião de sexta-feira às 11h.\n\nAbs,\nEquipe"
-        },
-        {
-            "email": "Equipe,\n\nLembrando que o material para a apresentação do cliente XPTO deve ser finalizado até quinta-feira (02/10), às 18h.\nO conteúdo parcial está salvo no Google Drive: https://drive.google.com/projetoXPTO.\r\n\r\nAinda faltam os slides de resultados financeiros e o gráfico de tendências.\n\nPeço que cada responsável atualize sua parte até quarta-feira, para termos um dia de folga para revisão final.\n\n[]s,\nRafael",
-            "category": "PRODUTIVO",
-            "reason": "O email define prazos claros, aponta pendências e reforça a importância da entrega antecipada para revisão.",
-            "suggested_response": "Oi Rafael,\n\nObrigado pelo lembrete. Já acessamos o material no Google Drive (https://drive.google.com/projetoXPTO).\n\nCada responsável vai atualizar sua parte até quarta-feira, incluindo os slides de resultados financeiros e o gráfico de tendências.\n\nAssim teremos tempo de sobra para a revisão final na quinta.\n\n[]s,\nEquipe"
-        },
-        {
-            "email": "Oi pessoal,\n\nVocês acreditam que esqueci a marmita em casa hoje? kkkkk\nAlguém topa pedir hambúrguer comigo no almoço?\n\nValeu,\nJoão",
-            "category": "IMPRODUTIVO",
-            "reason": "Assunto pessoal, sem relação com o trabalho.",
-            "suggested_response": "Oi João,\nVamos combinar o almoço pessoalmente.\nNo email, seguimos focando nos temas de trabalho. :)"
-        },
-        {
-            "email": "Gente,\n\nOlhem esse vídeo hilário que encontrei:\nhttps://youtu.be/123xyz 😂😂😂\n\nNão consigo parar de rir kkkk\n\nAbraços,\nPedro",
-            "category": "IMPRODUTIVO",
-            "reason": "Compartilhamento de entretenimento sem relevância profissional.",
-            "suggested_response": "Oi Pedro,\nEsse tipo de conteúdo é melhor nos grupos informais.\nVamos manter o email apenas para trabalho."
-        },
-        {
-            "email": "Oi,\n\nVocês viram a nova temporada daquela série que todo mundo acompanha? Achei o final meio forçado rsrs\n\nPodemos comentar no café da tarde!\n\nBjs,\nLuiza",
-            "category": "IMPRODUTIVO",
-            "reason": "Discussão de série de TV não tem relação com tarefas ou entregas.",
-            "suggested_response": "Oi Luiza,\nCombinado, falamos da série no café.\nPor aqui seguimos só com os assuntos de trabalho. :)"
-        },
-        {
-            "email": "Fala galera,\n\nBora pedir pizza na sexta? Quais sabores vcs curtem mais? 🍕\n\nAbs,\nThiago",
-            "category": "IMPRODUTIVO",
-            "reason": "Assunto de refeição, informal e sem relação com demandas da equipe.",
-            "suggested_response": "Oi Thiago,\nMelhor alinharmos esse tipo de coisa pessoalmente.\nNo email seguimos só com trabalho."
-        },
-        {
-            "email": "Oi,\n\nAlguém sabe se segunda é feriado municipal mesmo? Não queria vir à toa kkkkk\n\nValeu,\nAndré",
-            "category": "IMPRODUTIVO",
-            "reason": "Informação facilmente obtida em calendário oficial, não precisa ser discutida por email corporativo.",
-            "suggested_response": "Oi André,\nConfirma no calendário oficial da empresa para ter certeza.\nAssim todos ficam alinhados."
-        }
-    ]
+    return CLASSIFICATION_TEMPLATE.render(text, username)
+
+
+def build_batch_prompt(texts: list[str], username: str | None = None) -> str:
+    return CLASSIFICATION_TEMPLATE.render_batch(texts, username)
 
-    username_line = f"Nome do usuário: {username}\n" if username else ""
-
-    instructions = (
-        "INSTRUÇÕES (OBRIGATÓRIO): Você é um assistente que analisa e classifica e-mails em duas categorias: PRODUTIVO ou IMPRODUTIVO.\n"
-        "- PRODUTIVO: e-mails que requerem ação ou resposta específica.\n"
-        "- IMPRODUTIVO: e-mails que não necessitam de ação imediata (piadas, convites sociais, mensagens sem relação direta ao trabalho).\n\n"
-        "SAÍDA OBRIGATÓRIA:\n"
-        "1) PRIMEIRA LINHA: apenas a CATEGORIA em maiúsculas: PRODUTIVO ou IMPRODUTIVO.\n"
-        "2) SEGUNDA LINHA: 'CONFIDENCE: <valor>' entre 0 e 1.\n"
-        "3) TERCEIRA LINHA EM DIANTE: 'RESPOSTA_SUGERIDA:' seguido do texto da resposta.\n\n"
-        "REGRAS PARA RESPOSTA_SUGERIDA:\n"
-        "- É PROIBIDO repetir ou reescrever o conteúdo do e-mail recebido.\n"
-        "- Escreva como se fosse um colega respondendo ao remetente.\n"
-        "- A resposta deve ser curta, clara e acrescentar valor (ex.: agradecer, confirmar recebimento, indicar próxima ação).\n"
-        "- Use tom educado e profissional.\n"
-        "- Preserve/Crie formatação: quebras de linha (\\n, \\r), barras (\\\\), acentuação e caracteres especiais.\n\n"
-        "Exemplo negativo (NÃO FAZER):\n"
-        "Texto original: 'Finalizei o relatório e marquei reunião.'\n"
-        "Resposta incorreta: 'Você finalizou o relatório e marcou reunião.' (apenas reescreve o email)\n\n"
-        "Exemplo positivo (CORRETO):\n"
-        "Texto original: 'Finalizei o relatório e marquei reunião.'\n"
-        "Resposta correta: 'Obrigado pelo envio do relatório. Vou revisar e estarei presente na reunião.'\n"
-        "- Leia o email com atenção para descobrir quem é o remetente (se houver) e use o nome do usuário para assinar a resposta (Atenciosamente, <usuário>).\n"
-        "- Leia o texto do email cuidadosamente para entender o contexto e detalhes importantes.\n"
-        "- Utilize os exemplos abaixo para entender o estilo e formatação da resposta desejados.\n"
-    )
 
+_BATCH_RESULT_RE = re.compile(r"^\s*#{2,3}\s*RESULTADO\s+(\d+)\s*:?\s*$", flags=re.IGNORECASE | re.MULTILINE)
 
-    ex_texts: list[str] = []
-    for ex in examples:
-        ex_lines = [
-            f"EMAIL: {ex.get('email','')}",
-            f"CATEGORIA: {ex.get('category','')}",
-            f"RAZAO: {ex.get('reason','')}",
-            f"RESPOSTA_SUGERIDA: {ex.get('suggested_response','')}",
-        ]
-        ex_texts.append("\n".join(ex_lines))
 
-    prompt_parts = [instructions, username_line, "\n\n".join(ex_texts), "\nANALISE O SEGUINTE EMAIL A PARTIR DAQUI:", "\nTEXTO:\n", text]
+def parse_batch_response(response_text: str, count: int) -> list[Dict[str, Any] | None]:
+    """Divide a resposta do modo lote por '### RESULTADO <n>'.
 
-    prompt = "\n\n".join([p for p in prompt_parts if p])
-    return prompt
+    Retorna uma lista com `count` posições; blocos ausentes ou sem categoria
+    reconhecida ficam como None para que o chamador refaça o e-mail sozinho.
+    """
+    cleaned = _clean_sdk_artifacts(response_text or "")
+    results: list[Dict[str, Any] | None] = [None] * count
+    matches = list(_BATCH_RESULT_RE.finditer(cleaned))
+    for pos, m in enumerate(matches):
+        idx = int(m.group(1)) - 1
+        if idx < 0 or idx >= count or results[idx] is not None:
+            continue
+        end = matches[pos + 1].start() if pos + 1 < len(matches) else len(cleaned)
+        block = cleaned[m.end():end].strip()
+        if not block:
+            continue
+        parsed = parse_response(block)
+        if parsed.get("category") == Category.SEM_CLASSIFICACAO.value:
+            continue
+        results[idx] = parsed
+    return results
 
 
 _INFER_EXECUTOR = ThreadPoolExecutor(max_workers=IA_ASYNC_WORKERS)
 
 
-async def infer_async(text: str, username: str | None = None) -> Dict[str, Any]:
-    prompt = build_prompt(text, username)
+_ASYNC_SEMAPHORES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _get_async_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _ASYNC_SEMAPHORES.get(loop)
+    if sem is None:
+        sem = asyncio.Semaphore(GENAI_ASYNC_CONCURRENCY)
+        _ASYNC_SEMAPHORES[loop] = sem
+    return sem
+
+
+async def _call_genai_async(prompt: str, timings: CallTimings | None = None, template: PromptTemplate | None = None, suffix: str | None = None, stop: Callable[[str], bool] | None = None, on_chunk: Callable[[str], None] | None = None) -> str:
+    timings = timings if timings is not None else CallTimings()
+    queued = time.perf_counter()
+    async with _get_async_semaphore():
+        started = time.perf_counter()
+        timings.queue_ms = (started - queued) * 1000
+        aio = client_manager.get_async()
+        try:
+            cached = await context_cache.aget(aio, GENAI_MODEL, template) if template is not None and suffix is not None else None
+            contents, config = _build_request(suffix if cached else prompt, cached)
+            timings.setup_ms = (time.perf_counter() - started) * 1000
+
+            parts: list[str] = []
+            header_stop = _HeaderStop(stop)
+            usage = None
+            stream = await aio.models.generate_content_stream(model=GENAI_MODEL, contents=contents, config=config)
+            try:
+                async for chunk in stream:
+                    if timings.first_token_ms is None:
+                        timings.first_token_ms = (time.perf_counter() - started) * 1000
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    parts.append(_chunk_text(chunk))
+                    if on_chunk is not None:
+                        on_chunk(parts[-1])
+                    if header_stop(parts):
+                        break
+            finally:
+                aclose = getattr(stream, "aclose", None)
+                if callable(aclose):
+                    await aclose()
+            response_text = "".join(parts)
+            metrics.record_llm_usage(usage)
+        except Exception as exc:
+            client_manager.report_failure(exc)
+            raise RuntimeError(f"genai.Client async call failed: {exc}") from exc
+
+    timings.total_ms = (time.perf_counter() - started) * 1000
+    client_manager.report_success(timings)
+    return response_text
+
+
+async def _generate(prompt: str, timings: CallTimings, template: PromptTemplate | None = None, suffix: str | None = None, stop: Callable[[str], bool] | None = None, on_chunk: Callable[[str], None] | None = None) -> str:
     try:
+        if IA_BACKEND == "async" and genai_types is not None:
+            return await _call_genai_async(prompt, timings, template, suffix, stop, on_chunk)
         loop = asyncio.get_event_loop()
-        response_text = await loop.run_in_executor(_INFER_EXECUTOR, _call_genai_blocking, prompt)
+        if on_chunk is not None:
+            # A chamada bloqueante roda em outra thread: os chunks voltam ao loop em ordem.
+            relay, on_chunk = on_chunk, lambda chunk: loop.call_soon_threadsafe(relay, chunk)
+        return await loop.run_in_executor(_INFER_EXECUTOR, _call_genai_blocking, prompt, timings, template, suffix, stop, on_chunk)
     except Exception as exc:
         raise RuntimeError(f"GenAI async infer failed: {exc}") from exc
 
+
+async def infer_async(text: str, username: str | None = None, templated_replies: bool = False, on_event: Callable[[str, Any], None] | None = None) -> Dict[str, Any]:
+    """Classifica um e-mail e gera a resposta sugerida.
+
+    Com `templated_replies=True`, o stream é encerrado logo após as linhas de
+    categoria e confiança quando a categoria tem resposta por template
+    (ver `app/services/replies.py`), economizando os tokens da resposta.
+    `on_event` recebe `category` assim que a categoria chega e `token` para
+    cada trecho da resposta, à medida que o modelo gera.
+    """
+    with metrics.stage("build_prompt"), tracer.span("build_prompt"):
+        prompt = build_prompt(text, username)
+        suffix = CLASSIFICATION_TEMPLATE.render_suffix(text, username)
+    timings = CallTimings()
+    stop = _templated_reply_header if templated_replies else None
+    on_chunk = _StreamRelay(on_event).feed if on_event is not None else None
+    with tracer.span("llm", model=GENAI_MODEL, backend=IA_BACKEND, batch_size=1) as span:
+        response_text = await _generate(prompt, timings, CLASSIFICATION_TEMPLATE, suffix, stop, on_chunk)
+        span.set(**timings.as_dict())
+    metrics.observe_llm_call(timings)
+
+    result = parse_response(response_text)
+    result["prompt_version"] = PROMPT_VERSION
+    result["latency"] = timings.as_dict()
+    return result
+
+
+async def infer_batch_async(texts: list[str], username: str | None = None) -> list[Dict[str, Any]]:
+    """Classifica vários e-mails com uma única chamada ao LLM.
+
+    E-mails que não puderem ser extraídos da resposta do lote são refeitos
+    individualmente com `infer_async`.
+    """
+    if not texts:
+        return []
+    if len(texts) == 1:
+        return [await infer_async(texts[0], username=username)]
+
+    with metrics.stage("build_prompt"), tracer.span("build_prompt", batch_size=len(texts)):
+        prompt = build_batch_prompt(texts, username)
+        suffix = CLASSIFICATION_TEMPLATE.render_batch_suffix(texts, username)
+    timings = CallTimings()
+    with tracer.span("llm", model=GENAI_MODEL, backend=IA_BACKEND, batch_size=len(texts)) as span:
+        response_text = await _generate(prompt, timings, CLASSIFICATION_TEMPLATE, suffix)
+        span.set(**timings.as_dict())
+    metrics.observe_llm_call(timings)
+    parsed = parse_batch_response(response_text, len(texts))
+
+    results: list[Dict[str, Any]] = []
+    for text, item in zip(texts, parsed):
+        if item is None:
+            item = await infer_async(text, username=username)
+        else:
+            item["prompt_version"] = PROMPT_VERSION
+            item["latency"] = timings.as_dict()
+            item["batched"] = True
+        results.append(item)
+    return results
+
+
+def parse_response(response_text: str) -> Dict[str, Any]:
     cleaned = _clean_sdk_artifacts(response_text)
 
     category = Category.SEM_CLASSIFICACAO
@@ -0,0 +1,249 @@
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Any, Dict, Iterable
+
+import numpy as np
+
+from app.core.constants import (
+    LOCAL_CLASSIFIER_CATEGORIES,
+    LOCAL_CLASSIFIER_ENABLED,
+    LOCAL_CLASSIFIER_MAX_SAMPLES,
+    LOCAL_CLASSIFIER_MIN_SAMPLES,
+    LOCAL_CLASSIFIER_REFRESH_SECONDS,
+    LOCAL_CLASSIFIER_REPLY,
+    LOCAL_CLASSIFIER_THRESHOLD,
+)
+from app.models import Category
+from app.services.prompts import EXAMPLES
+from app.services.replies import render_reply
+from app.services.tokenizer import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Prefixo gravado em TextEntry.prompt_version quando a resposta veio do
+# classificador local; essas linhas ficam fora do treino seguinte.
+VERSION_PREFIX = "local-"
+
+
+def _features(text: str) -> list[str]:
+    tokens = tokenize(text, fold=True).tokens
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+class _Docs:
+    """Matriz esparsa em formato CSR (indptr/indices/values) só com numpy."""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, values: np.ndarray, n_features: int):
+        self.indptr = indptr
+        self.indices = indices
+        self.values = values
+        self.n_features = n_features
+        self._row_lengths = np.diff(indptr)
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def dot(self, w: np.ndarray) -> np.ndarray:
+        # Toda linha tem ao menos o termo de bias, então reduceat nunca vê segmentos vazios.
+        return np.add.reduceat(self.values * w[self.indices], self.indptr[:-1])
+
+    def rdot(self, r: np.ndarray) -> np.ndarray:
+        return np.bincount(self.indices, weights=self.values * np.repeat(r, self._row_lengths), minlength=self.n_features)
+
+
+class TfidfLogReg:
+    """TF-IDF (unigramas + bigramas) com regressão logística binária.
+
+    Treino em lote por gradiente descendente com regularização L2; a classe
+    positiva é `labels[1]`. `predict` devolve também quantos termos do texto
+    existem no vocabulário, usado para não confiar em e-mails fora do domínio.
+    """
+
+    def __init__(self, labels: tuple[str, str], l2: float = 1e-3, iterations: int = 300, learning_rate: float = 2.0, max_features: int = 50000):
+        self.labels = labels
+        self.l2 = l2
+        self.iterations = iterations
+        self.learning_rate = learning_rate
+        self.max_features = max_features
+        self.vocabulary: dict[str, int] = {}
+        self.idf: np.ndarray | None = None
+        self.weights: np.ndarray | None = None
+        self.samples = 0
+        self.version = ""
+
+    def _vectorize(self, docs: Iterable[list[str]]) -> _Docs:
+        indptr = [0]
+        indices: list[int] = []
+        values: list[float] = []
+        for feats in docs:
+            counts: dict[int, int] = {}
+            for f in feats:
+                idx = self.vocabulary.get(f)
+                if idx is not None:
+                    counts[idx] = counts.get(idx, 0) + 1
+            row_idx = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            row_val = np.fromiter(counts.values(), dtype=np.float64, count=len(counts)) * self.idf[row_idx] if counts else np.empty(0)
+            norm = np.linalg.norm(row_val)
+            if norm:
+                row_val = row_val / norm
+            # Índice 0 é o bias.
+            indices.append(0)
+            values.append(1.0)
+            indices.extend(row_idx.tolist())
+            values.extend(row_val.tolist())
+            indptr.append(len(indices))
+        return _Docs(np.asarray(indptr, dtype=np.int64), np.asarray(indices, dtype=np.int64), np.asarray(values, dtype=np.float64), len(self.vocabulary) + 1)
+
+    def fit(self, texts: list[str], labels: list[str]) -> "TfidfLogReg":
+        docs = [_features(t) for t in texts]
+        df: dict[str, int] = {}
+        for feats in docs:
+            for f in set(feats):
+                df[f] = df.get(f, 0) + 1
+        terms = sorted(df, key=lambda f: (-df[f], f))[: self.max_features]
+        self.vocabulary = {f: i for i, f in enumerate(terms, start=1)}
+        n = len(docs)
+        self.idf = np.ones(len(self.vocabulary) + 1)
+        self.idf[1:] = np.log((1 + n) / (1 + np.array([df[f] for f in terms], dtype=np.float64))) + 1
+
+        X = self._vectorize(docs)
+        y = np.array([1.0 if label == self.labels[1] else 0.0 for label in labels])
+        w = np.zeros(X.n_features)
+        for _ in range(self.iterations):
+            p = 1.0 / (1.0 + np.exp(-X.dot(w)))
+            grad = X.rdot(p - y) / n + self.l2 * w
+            grad[0] -= self.l2 * w[0]
+            w -= self.learning_rate * grad
+        self.weights = w
+        self.samples = n
+        digest = hashlib.sha256(w.tobytes() + "\x1f".join(terms).encode("utf-8")).hexdigest()[:12]
+        self.version = VERSION_PREFIX + digest
+        return self
+
+    def predict(self, text: str) -> tuple[str, float, int]:
+        feats = _features(text)
+        X = self._vectorize([feats])
+        known = len(X.indices) - 1
+        p = float(1.0 / (1.0 + np.exp(-X.dot(self.weights)[0])))
+        if p >= 0.5:
+            return self.labels[1], p, known
+        return self.labels[0], 1.0 - p, known
+
+
+class LocalClassifier:
+    """Atalho local antes do LLM.
+
+    Treina com os exemplos few-shot do prompt e com o histórico de
+    `TextEntry.category` (classificado pelo LLM), e re-treina a cada
+    `LOCAL_CLASSIFIER_REFRESH_SECONDS`. Só responde quando a confiança
+    passa do limiar, a categoria está em `LOCAL_CLASSIFIER_CATEGORIES` e o
+    e-mail tem termos suficientes no vocabulário; caso contrário retorna None
+    e o pipeline segue para o LLM.
+    """
+
+    MIN_KNOWN_FEATURES = 3
+
+    def __init__(
+        self,
+        enabled: bool = LOCAL_CLASSIFIER_ENABLED,
+        threshold: float = LOCAL_CLASSIFIER_THRESHOLD,
+        categories: list[str] = LOCAL_CLASSIFIER_CATEGORIES,
+        min_samples: int = LOCAL_CLASSIFIER_MIN_SAMPLES,
+        max_samples: int = LOCAL_CLASSIFIER_MAX_SAMPLES,
+        refresh_seconds: int = LOCAL_CLASSIFIER_REFRESH_SECONDS,
+        reply: bool = LOCAL_CLASSIFIER_REPLY,
+    ):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.categories = {Category[c].value for c in categories if c in Category.__members__}
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.refresh_seconds = refresh_seconds
+        self.reply = reply
+        self._model: TfidfLogReg | None = None
+        self._trained_at = 0.0
+        self._training = False
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._model is not None and self._model.samples >= self.min_samples
+
+    @property
+    def version(self) -> str | None:
+        return self._model.version if self._model is not None else None
+
+    def fit(self, rows: list[tuple[str, str]]) -> TfidfLogReg:
+        samples = [(ex["email"], Category[ex["category"]].value) for ex in EXAMPLES]
+        samples += [(text, category) for text, category in rows if text and category in (Category.PRODUTIVO.value, Category.IMPRODUTIVO.value)]
+        texts, labels = zip(*samples)
+        model = TfidfLogReg(labels=(Category.PRODUTIVO.value, Category.IMPRODUTIVO.value)).fit(list(texts), list(labels))
+        self._model = model
+        self._trained_at = time.monotonic()
+        logger.info("Local classifier trained on %d samples (%s)", model.samples, model.version)
+        return model
+
+    async def refresh(self, session_factory) -> None:
+        """Re-treina se o modelo estiver ausente ou velho; ignora se já houver um treino em curso."""
+        if not self.enabled or self._training:
+            return
+        if self._model is not None and time.monotonic() - self._trained_at < self.refresh_seconds:
+            return
+        from app.crud import get_labeled_texts
+
+        self._training = True
+        try:
+            try:
+                async with session_factory() as s:
+                    rows = await get_labeled_texts(
+                        s,
+                        [Category.PRODUTIVO.value, Category.IMPRODUTIVO.value],
+                        self.max_samples,
+                        exclude_version_prefix=VERSION_PREFIX,
+                    )
+            except Exception as exc:
+                logger.warning("Local classifier could not load training rows: %s", exc)
+                rows = []
+            await asyncio.get_running_loop().run_in_executor(None, self.fit, rows)
+        except Exception as exc:
+            logger.warning("Local classifier training failed: %s", exc)
+            self._trained_at = time.monotonic()
+        finally:
+            self._training = False
+
+    def classify(self, text: str, username: str | None = None, reply_template: str | None = None) -> Dict[str, Any] | None:
+        if not self.enabled or not self.ready or not text:
+            return None
+        model = self._model
+        category, confidence, known = model.predict(text)
+        if category not in self.categories or confidence < self.threshold or known < self.MIN_KNOWN_FEATURES:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {
+            "category": category,
+            "confidence": round(confidence, 4),
+            "generated_response": render_reply(category, text, username, reply_template) if self.reply else "",
+            "prompt_version": model.version,
+            "source": "local",
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "version": self.version,
+            "samples": self._model.samples if self._model is not None else 0,
+            "threshold": self.threshold,
+            "categories": sorted(self.categories),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else None,
+        }
+
+
+local_classifier = LocalClassifier()
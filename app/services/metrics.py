@@ -0,0 +1,149 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from app.core.constants import CELERY_BROKER_URL, METRICS_ENABLED, METRICS_QUEUES
+
+logger = logging.getLogger(__name__)
+
+# Com PROMETHEUS_MULTIPROC_DIR definido (workers do Celery, uvicorn com vários
+# workers), cada processo grava as amostras em arquivos nesse diretório e a
+# coleta soma todos eles com o MultiProcessCollector.
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "autou_http_request_duration_seconds",
+    "Latência das requisições HTTP por rota",
+    ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+PIPELINE_STAGE_SECONDS = Histogram(
+    "autou_pipeline_stage_duration_seconds",
+    "Tempo gasto em cada etapa do pipeline de classificação",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS,
+)
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "autou_llm_first_token_seconds",
+    "Tempo até o primeiro chunk do stream do LLM",
+    buckets=_LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "autou_llm_tokens",
+    "Tokens reportados pelo LLM em usage_metadata",
+    ["kind"],
+)
+TASKS = Counter(
+    "autou_tasks",
+    "Resultados das tasks do pipeline por status e origem da classificação",
+    ["task", "status", "source"],
+)
+
+# Campos de usage_metadata do google-genai -> rótulo `kind`.
+_USAGE_FIELDS = {
+    "prompt_token_count": "prompt",
+    "candidates_token_count": "output",
+    "cached_content_token_count": "cached",
+    "thoughts_token_count": "thoughts",
+}
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Mede o bloco como a etapa `name` do pipeline (também em volta de `await`)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if METRICS_ENABLED:
+            PIPELINE_STAGE_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    if METRICS_ENABLED:
+        PIPELINE_STAGE_SECONDS.labels(name).observe(seconds)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    if METRICS_ENABLED:
+        HTTP_REQUEST_SECONDS.labels(method, route, str(status)).observe(seconds)
+
+
+def observe_llm_call(timings: Any) -> None:
+    if not METRICS_ENABLED:
+        return
+    PIPELINE_STAGE_SECONDS.labels("llm").observe(timings.total_ms / 1000)
+    if timings.first_token_ms is not None:
+        LLM_FIRST_TOKEN_SECONDS.observe(timings.first_token_ms / 1000)
+
+
+def record_llm_usage(usage: Any) -> None:
+    if not METRICS_ENABLED or usage is None:
+        return
+    for field, kind in _USAGE_FIELDS.items():
+        count = getattr(usage, field, None)
+        if isinstance(count, int) and count > 0:
+            LLM_TOKENS.labels(kind).inc(count)
+
+
+def task_finished(task: str, status: str, source: str | None = None) -> None:
+    if METRICS_ENABLED:
+        TASKS.labels(task, status, source or "none").inc()
+
+
+class QueueDepthCollector:
+    """Tamanho das filas do Celery no broker Redis, lido a cada coleta."""
+
+    def __init__(self, broker_url: str = CELERY_BROKER_URL, queues: list[str] = METRICS_QUEUES):
+        self.broker_url = broker_url
+        self.queues = queues
+        self._client = None
+
+    def collect(self):
+        gauge = GaugeMetricFamily("autou_celery_queue_depth", "Mensagens aguardando na fila do Celery", labels=["queue"])
+        if self.broker_url.startswith(("redis://", "rediss://")):
+            try:
+                if self._client is None:
+                    import redis
+
+                    self._client = redis.Redis.from_url(self.broker_url, socket_timeout=1)
+                for queue in self.queues:
+                    gauge.add_metric([queue], self._client.llen(queue))
+            except Exception as exc:
+                logger.warning("Could not read Celery queue depth: %s", exc)
+        yield gauge
+
+
+def build_registry(queue_depth: bool = True) -> CollectorRegistry:
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    if queue_depth:
+        registry.register(QueueDepthCollector())
+    return registry
+
+
+def render(registry: CollectorRegistry) -> tuple[bytes, str]:
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
@@ -1,8 +1,11 @@
 import os
 import asyncio
+import heapq
 from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
 from typing import Dict
 from app.core.constants import NLP_WORKERS
+from app.services.tokenizer import tokenize
 
 _nlp = None
 
@@ -11,27 +14,15 @@ def _preprocess_sync(text: str, top_n: int = 15) -> Dict:
         raise TypeError("text must be a str")
     
     try:
-        import string
-        
-        text_clean = text.translate(str.maketrans('', '', string.punctuation)).lower()
-        
-        tokens = text_clean.split()
-        
-        stopwords = {'e', 'o', 'a', 'de', 'do', 'da', 'em', 'um', 'uma', 'para', 'com', 'não', 'na', 'no', 'que', 'se', 'por', 'mais', 'as', 'os', 'é', 'são', 'foi', 'foram'}
-        filtered_tokens = [token for token in tokens if token not in stopwords and len(token) > 2]
-        
-        from collections import Counter
-        token_counts = Counter(filtered_tokens)
-        
-        cleaned_text = ' '.join(filtered_tokens)
-        
-        top_tokens = [{"token": token, "count": count} for token, count in token_counts.most_common(top_n)]
+        result = tokenize(text)
+
+        top_tokens = [{"token": token, "count": count} for token, count in heapq.nlargest(top_n, result.counts.items(), key=itemgetter(1))]
         
         return {
-            "cleaned_text": cleaned_text,
-            "tokens": filtered_tokens,
-            "unique_tokens": len(set(filtered_tokens)),
-            "total_tokens": len(filtered_tokens),
+            "cleaned_text": result.cleaned_text,
+            "tokens": result.tokens,
+            "unique_tokens": len(result.counts),
+            "total_tokens": len(result.tokens),
             "top_tokens": top_tokens,
             "original_len": len(text),
         }
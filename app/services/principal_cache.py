@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Dict
+
+from cachetools import TTLCache
+
+from app.core.constants import AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_REDIS_URL, AUTH_CACHE_TTL_SECONDS
+from app.schemas import CurrentUser
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "autou:auth:invalidate"
+
+
+class PrincipalCache:
+    """Cache em memória dos principais autenticados, por id de usuário.
+
+    O JWT continua sendo verificado a cada requisição; o cache só evita a
+    consulta que transforma o `sub` em `CurrentUser`. Alterações e remoções
+    de usuário invalidam a entrada localmente e, com `AUTH_CACHE_REDIS_URL`,
+    publicam o id num canal Redis para os demais nós da API. O TTL limita
+    por quanto tempo um nó que perdeu a mensagem serve um principal antigo.
+
+    Cada invalidação avança um relógio; quem leu o banco depois de um miss
+    passa o valor de `generation()` anterior à leitura para `set`, que
+    descarta o principal se o id foi invalidado nesse meio-tempo.
+    """
+
+    def __init__(self, ttl_seconds: int = AUTH_CACHE_TTL_SECONDS, max_entries: int = AUTH_CACHE_MAX_ENTRIES, redis_url: str = AUTH_CACHE_REDIS_URL):
+        self.enabled = ttl_seconds > 0 and max_entries > 0
+        self._data: TTLCache = TTLCache(maxsize=max(max_entries, 1), ttl=max(ttl_seconds, 1))
+        self._lock = threading.Lock()
+        # Relógio de invalidações e o valor dele no último evict de cada id (ou no último clear).
+        self._clock = 0
+        self._evicted_at: TTLCache = TTLCache(maxsize=max(max_entries, 1), ttl=max(ttl_seconds, 1))
+        self._cleared_at = 0
+        self.redis_url = redis_url
+        self._redis = None
+        self._listener: asyncio.Task | None = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: int) -> CurrentUser | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            user = self._data.get(user_id)
+            if user is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return user
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._clock
+
+    def set(self, user: CurrentUser, generation: int | None = None) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and max(self._evicted_at.get(user.id, 0), self._cleared_at) > generation:
+                # Invalidado durante a leitura: o principal lido pode estar desatualizado.
+                return
+            self._data[user.id] = user
+
+    def evict(self, user_id: int) -> None:
+        with self._lock:
+            self._clock += 1
+            self._evicted_at[user_id] = self._clock
+            if self._data.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clock += 1
+            self._cleared_at = self._clock
+            self._data.clear()
+
+    def _client(self):
+        if self._redis is None:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.Redis.from_url(self.redis_url)
+        return self._redis
+
+    async def invalidate(self, user_id: int) -> None:
+        self.evict(user_id)
+        if not self.redis_url:
+            return
+        try:
+            await self._client().publish(INVALIDATION_CHANNEL, str(user_id))
+        except Exception as exc:
+            logger.warning("Could not publish principal invalidation for user %s: %s", user_id, exc)
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self._client().pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        self.evict(int(message["data"]))
+                    except (TypeError, ValueError):
+                        continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                # Mensagens perdidas durante a queda: descarta tudo e reconecta.
+                logger.warning("Principal invalidation listener failed: %s", exc)
+                self.clear()
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    def start(self) -> None:
+        if self.redis_url and self.enabled and self._listener is None:
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except BaseException:
+                pass
+            self._listener = None
+        if self._redis is not None:
+            try:
+                await self._redis.aclose()
+            except Exception:
+                pass
+            self._redis = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses, size = self.hits, self.misses, len(self._data)
+        total = hits + misses
+        return {
+            "enabled": self.enabled,
+            "shared_invalidation": bool(self.redis_url),
+            "listening": self._listener is not None and not self._listener.done(),
+            "entries": size,
+            "hits": hits,
+            "misses": misses,
+            "invalidations": self.invalidations,
+            "hit_rate": (hits / total) if total else 0.0,
+        }
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,167 @@
+import hashlib
+from functools import cached_property
+
+
+EXAMPLES: list[dict[str, str]] = [
+    {
+        "email": "Prezada equipe,\n\nFinalizei o relatório trimestral de desempenho e já o disponibilizei na pasta compartilhada: \\\\Servidor\\Projetos\\Relatorios\\2025_Q1\\.\nAlém do relatório em PDF, incluí também uma planilha em Excel com os indicadores detalhados por área (financeiro, comercial e operacional).\r\n\r\nMarquei a reunião de revisão para quarta-feira, dia 15/10, às 14h, via Microsoft Teams. O link já está no calendário, mas segue aqui também: https://teams.microsoft.com/l/meetup-join/123.\n\nPeço que todos leiam os tópicos 3.2 e 4.1 do relatório antes da reunião, pois serão foco de discussão.\n\nAtenciosamente,\nCarlos",
+        "category": "PRODUTIVO",
+        "reason": "O email contém entrega de relatórios, anexos em formatos diferentes, local de armazenamento, link de reunião e instruções claras para preparação.",
+        "suggested_response": "Olá Carlos,\n\nObrigado pelo envio do relatório trimestral e da planilha detalhada. Já acessamos os arquivos na pasta compartilhada (\\\\Servidor\\Projetos\\Relatorios\\2025_Q1\\).\n\nVamos revisar especialmente os tópicos 3.2 e 4.1 antes da reunião de quarta-feira (15/10 às 14h).\n\nAté lá,\nEquipe"
+    },
+    {
+        "email": "Bom dia,\n\nEnviei a versão final do contrato com o cliente XYZ. O documento foi salvo em: C:\\Users\\Public\\Documentos\\Contratos\\XYZ_Final.pdf\n\nSolicito que a equipe jurídica faça a revisão até amanhã, 29/09, para que possamos enviar ao cliente ainda dentro do prazo.\r\n\r\nAlém disso, precisamos que o time de finanças valide os valores da cláusula 5.3 (ajustes de pagamento).\n\nAbraços,\nFernanda",
+        "category": "PRODUTIVO",
+        "reason": "O email trata de contrato, prazos de revisão e validação de cláusulas financeiras.",
+        "suggested_response": "Bom dia Fernanda,\n\nRecebemos o contrato salvo em C:\\Users\\Public\\Documentos\\Contratos\\XYZ_Final.pdf.\n\nA equipe jurídica vai revisar os pontos legais até amanhã (29/09) e o financeiro validará os valores da cláusula 5.3.\n\nTe daremos retorno antes do prazo.\n\nAbs,\nEquipe"
+    },
+    {
+        "email": "Prezados,\n\nO cronograma atualizado do projeto Ômega já está disponível em: /mnt/projetos/omega/cronograma_v2.xlsx\n\nAs principais mudanças:\n- Entrega do módulo de autenticação adiada para 20/10.\n- Inclusão de uma nova etapa de testes de integração entre 22/10 e 25/10.\r\n- Ajustes nas dependências do módulo de relatórios.\n\nPor favor, confirmem se todos os responsáveis estão de acordo com as novas datas.\n\nObrigado,\nMariana",
+        "category": "PRODUTIVO",
+        "reason": "O email comunica mudanças relevantes no cronograma e pede validação da equipe.",
+        "suggested_response": "Oi Mariana,\n\nObrigado pelo envio do cronograma atualizado em /mnt/projetos/omega/cronograma_v2.xlsx.\n\nJá verificamos as mudanças: entrega do módulo de autenticação (20/10), etapa de testes de integração (22/10-25/10) e ajustes no módulo de relatórios.\n\nNossa equipe confirma que está de acordo com as novas datas.\n\nAtenciosamente,\nEquipe"
+    },
+    {
+        "email": "Boa tarde,\n\nAnexei o documento Indicadores_Q2.pdf com os resultados de desempenho do segundo trimestre.\nPrincipais pontos a observar:\r\n1) Crescimento de 12% no setor comercial.\n2) Redução de custos operacionais em 8%.\n3) Atraso na entrega de dois projetos (detalhes no anexo).\n\nSolicito que cada gestor prepare comentários sobre os indicadores de sua área para a reunião de sexta-feira, às 11h.\n\nAbraços,\nBeatriz",
+        "category": "PRODUTIVO",
+        "reason": "O email contém indicadores de desempenho e solicita análise da equipe antes da reunião.",
+        "suggested_response": "Boa tarde Beatriz,\n\nObrigado pelo envio do documento Indicadores_Q2.pdf.\n\nJá notamos os principais pontos: crescimento comercial (12%), redução de custos operacionais (8%) e atrasos em dois projetos.\n\nCada gestor vai preparar os comentários de sua área antes da reunião de sexta-feira às 11h.\n\nAbs,\nEquipe"
+    },
+    {
+        "email": "Equipe,\n\nLembrando que o material para a apresentação do cliente XPTO deve ser finalizado até quinta-feira (02/10), às 18h.\nO conteúdo parcial está salvo no Google Drive: https://drive.google.com/projetoXPTO.\r\n\r\nAinda faltam os slides de resultados financeiros e o gráfico de tendências.\n\nPeço que cada responsável atualize sua parte até quarta-feira, para termos um dia de folga para revisão final.\n\n[]s,\nRafael",
+        "category": "PRODUTIVO",
+        "reason": "O email define prazos claros, aponta pendências e reforça a importância da entrega antecipada para revisão.",
+        "suggested_response": "Oi Rafael,\n\nObrigado pelo lembrete. Já acessamos o material no Google Drive (https://drive.google.com/projetoXPTO).\n\nCada responsável vai atualizar sua parte até quarta-feira, incluindo os slides de resultados financeiros e o gráfico de tendências.\n\nAssim teremos tempo de sobra para a revisão final na quinta.\n\n[]s,\nEquipe"
+    },
+    {
+        "email": "Oi pessoal,\n\nVocês acreditam que esqueci a marmita em casa hoje? kkkkk\nAlguém topa pedir hambúrguer comigo no almoço?\n\nValeu,\nJoão",
+        "category": "IMPRODUTIVO",
+        "reason": "Assunto pessoal, sem relação com o trabalho.",
+        "suggested_response": "Oi João,\nVamos combinar o almoço pessoalmente.\nNo email, seguimos focando nos temas de trabalho. :)"
+    },
+    {
+        "email": "Gente,\n\nOlhem esse vídeo hilário que encontrei:\nhttps://youtu.be/123xyz 😂😂😂\n\nNão consigo parar de rir kkkk\n\nAbraços,\nPedro",
+        "category": "IMPRODUTIVO",
+        "reason": "Compartilhamento de entretenimento sem relevância profissional.",
+        "suggested_response": "Oi Pedro,\nEsse tipo de conteúdo é melhor nos grupos informais.\nVamos manter o email apenas para trabalho."
+    },
+    {
+        "email": "Oi,\n\nVocês viram a nova temporada daquela série que todo mundo acompanha? Achei o final meio forçado rsrs\n\nPodemos comentar no café da tarde!\n\nBjs,\nLuiza",
+        "category": "IMPRODUTIVO",
+        "reason": "Discussão de série de TV não tem relação com tarefas ou entregas.",
+        "suggested_response": "Oi Luiza,\nCombinado, falamos da série no café.\nPor aqui seguimos só com os assuntos de trabalho. :)"
+    },
+    {
+        "email": "Fala galera,\n\nBora pedir pizza na sexta? Quais sabores vcs curtem mais? 🍕\n\nAbs,\nThiago",
+        "category": "IMPRODUTIVO",
+        "reason": "Assunto de refeição, informal e sem relação com demandas da equipe.",
+        "suggested_response": "Oi Thiago,\nMelhor alinharmos esse tipo de coisa pessoalmente.\nNo email seguimos só com trabalho."
+    },
+    {
+        "email": "Oi,\n\nAlguém sabe se segunda é feriado municipal mesmo? Não queria vir à toa kkkkk\n\nValeu,\nAndré",
+        "category": "IMPRODUTIVO",
+        "reason": "Informação facilmente obtida em calendário oficial, não precisa ser discutida por email corporativo.",
+        "suggested_response": "Oi André,\nConfirma no calendário oficial da empresa para ter certeza.\nAssim todos ficam alinhados."
+    }
+]
+
+INSTRUCTIONS = (
+    "INSTRUÇÕES (OBRIGATÓRIO): Você é um assistente que analisa e classifica e-mails em duas categorias: PRODUTIVO ou IMPRODUTIVO.\n"
+    "- PRODUTIVO: e-mails que requerem ação ou resposta específica.\n"
+    "- IMPRODUTIVO: e-mails que não necessitam de ação imediata (piadas, convites sociais, mensagens sem relação direta ao trabalho).\n\n"
+    "SAÍDA OBRIGATÓRIA:\n"
+    "1) PRIMEIRA LINHA: apenas a CATEGORIA em maiúsculas: PRODUTIVO ou IMPRODUTIVO.\n"
+    "2) SEGUNDA LINHA: 'CONFIDENCE: <valor>' entre 0 e 1.\n"
+    "3) TERCEIRA LINHA EM DIANTE: 'RESPOSTA_SUGERIDA:' seguido do texto da resposta.\n\n"
+    "REGRAS PARA RESPOSTA_SUGERIDA:\n"
+    "- É PROIBIDO repetir ou reescrever o conteúdo do e-mail recebido.\n"
+    "- Escreva como se fosse um colega respondendo ao remetente.\n"
+    "- A resposta deve ser curta, clara e acrescentar valor (ex.: agradecer, confirmar recebimento, indicar próxima ação).\n"
+    "- Use tom educado e profissional.\n"
+    "- Preserve/Crie formatação: quebras de linha (\\n, \\r), barras (\\\\), acentuação e caracteres especiais.\n\n"
+    "Exemplo negativo (NÃO FAZER):\n"
+    "Texto original: 'Finalizei o relatório e marquei reunião.'\n"
+    "Resposta incorreta: 'Você finalizou o relatório e marcou reunião.' (apenas reescreve o email)\n\n"
+    "Exemplo positivo (CORRETO):\n"
+    "Texto original: 'Finalizei o relatório e marquei reunião.'\n"
+    "Resposta correta: 'Obrigado pelo envio do relatório. Vou revisar e estarei presente na reunião.'\n"
+    "- Leia o email com atenção para descobrir quem é o remetente (se houver) e use o nome do usuário para assinar a resposta (Atenciosamente, <usuário>).\n"
+    "- Leia o texto do email cuidadosamente para entender o contexto e detalhes importantes.\n"
+    "- Utilize os exemplos abaixo para entender o estilo e formatação da resposta desejados.\n"
+)
+
+BATCH_INSTRUCTIONS = (
+    "MODO LOTE: você receberá vários e-mails numerados, cada um iniciado por '### EMAIL <n>'.\n"
+    "Analise cada e-mail de forma independente e responda a TODOS, na mesma ordem.\n"
+    "Para cada e-mail, abra um bloco com a linha '### RESULTADO <n>' (mesmo número do e-mail) e, em seguida,\n"
+    "escreva as três linhas da SAÍDA OBRIGATÓRIA (CATEGORIA, CONFIDENCE e RESPOSTA_SUGERIDA).\n"
+    "Não escreva nada fora dos blocos '### RESULTADO <n>'.\n"
+)
+
+
+
+class PromptTemplate:
+    """Template de prompt com prefixo estático pré-renderizado.
+
+    O prefixo (instruções + exemplos few-shot) é montado uma única vez por
+    processo; só o sufixo (usuário e e-mail) é renderizado a cada chamada.
+    `version` é o hash do conteúdo estático e identifica o template nos
+    registros e nas chaves de cache.
+    """
+
+    def __init__(self, name: str, instructions: str, examples: list[dict[str, str]], batch_instructions: str = ""):
+        self.name = name
+        self.instructions = instructions
+        self.examples = examples
+        self.batch_instructions = batch_instructions
+
+    @cached_property
+    def prefix(self) -> str:
+        ex_texts: list[str] = []
+        for ex in self.examples:
+            ex_lines = [
+                f"EMAIL: {ex.get('email','')}",
+                f"CATEGORIA: {ex.get('category','')}",
+                f"RAZAO: {ex.get('reason','')}",
+                f"RESPOSTA_SUGERIDA: {ex.get('suggested_response','')}",
+            ]
+            ex_texts.append("\n".join(ex_lines))
+        return "\n\n".join([p for p in [self.instructions, "\n\n".join(ex_texts)] if p])
+
+    @cached_property
+    def version(self) -> str:
+        material = "\x1f".join([self.name, self.prefix, self.batch_instructions])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()[:12]
+
+    @staticmethod
+    def _username_line(username: str | None) -> str:
+        return f"Nome do usuário: {username}\n" if username else ""
+
+    def render_suffix(self, text: str, username: str | None = None) -> str:
+        parts = [self._username_line(username), "\nANALISE O SEGUINTE EMAIL A PARTIR DAQUI:", "\nTEXTO:\n", text]
+        return "\n\n".join([p for p in parts if p])
+
+    def render(self, text: str, username: str | None = None) -> str:
+        return self.prefix + "\n\n" + self.render_suffix(text, username)
+
+    def render_batch_suffix(self, texts: list[str], username: str | None = None) -> str:
+        emails = "\n\n".join(f"### EMAIL {i}\n{t}" for i, t in enumerate(texts, start=1))
+        parts = [self._username_line(username), self.batch_instructions, "\nANALISE OS SEGUINTES EMAILS A PARTIR DAQUI:", emails]
+        return "\n\n".join([p for p in parts if p])
+
+    def render_batch(self, texts: list[str], username: str | None = None) -> str:
+        return self.prefix + "\n\n" + self.render_batch_suffix(texts, username)
+
+
+CLASSIFICATION_TEMPLATE = PromptTemplate(
+    name="classificacao-email",
+    instructions=INSTRUCTIONS,
+    examples=EXAMPLES,
+    batch_instructions=BATCH_INSTRUCTIONS,
+)
+
+TEMPLATES: dict[str, PromptTemplate] = {CLASSIFICATION_TEMPLATE.name: CLASSIFICATION_TEMPLATE}
+
+
+def get_template(name: str = CLASSIFICATION_TEMPLATE.name) -> PromptTemplate:
+    return TEMPLATES[name]
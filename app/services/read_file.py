@@ -1,17 +1,169 @@
 import os
+import multiprocessing
+import threading
 import pdfplumber
 import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
 
-def read_file_sync(path: str, encoding: str = "utf-8") -> str:
+from app.core.constants import PDF_BACKEND, PDF_MAX_CHARS, PDF_PAGES_PER_TASK, PDF_PARALLEL_MIN_PAGES, PDF_WORKERS
+
+try:
+    import pypdfium2 as pdfium
+except Exception:
+    pdfium = None
+
+# O PDFium não é thread-safe: chamadas de threads diferentes do mesmo processo
+# (read_file_async na API, pool de threads do Celery) passam por este lock. O
+# lock não fica preso entre as páginas geradas; os processos do pool de PDF
+# têm cada um o seu.
+_PDFIUM_LOCK = threading.Lock()
+
+
+def _resolve_backend(backend: str) -> str:
+    if backend == "pdfplumber" or pdfium is None:
+        return "pdfplumber"
+    return "pdfium" if backend in ("pdfium", "auto") else "pdfplumber"
+
+
+def _page_count(path: str, backend: str) -> int:
+    if backend == "pdfium":
+        with _PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(path)
+            try:
+                return len(pdf)
+            finally:
+                pdf.close()
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def _pdfium_page_text(pdf, i: int) -> str:
+    with _PDFIUM_LOCK:
+        page = pdf[i]
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range() or ""
+        finally:
+            textpage.close()
+            page.close()
+
+
+def _iter_pages_pdfium(path: str, start: int, end: int | None) -> Iterator[str]:
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(path)
+        total = len(pdf)
+    try:
+        stop = total if end is None else min(end, total)
+        for i in range(start, stop):
+            yield _pdfium_page_text(pdf, i)
+    finally:
+        with _PDFIUM_LOCK:
+            pdf.close()
+
+
+def _iter_pages_pdfplumber(path: str, start: int, end: int | None) -> Iterator[str]:
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages[start:end]:
+            yield page.extract_text() or ""
+            page.flush_cache()
+
+
+def iter_pdf_pages(path: str, backend: str = PDF_BACKEND, start: int = 0, end: int | None = None) -> Iterator[str]:
+    """Gera o texto de cada página, uma por vez, sem manter o documento inteiro em memória.
+
+    Com backend "auto", usa pypdfium2 e cai para pdfplumber se o documento não
+    puder ser lido antes da primeira página.
+    """
+    resolved = _resolve_backend(backend)
+    if resolved == "pdfium":
+        pages = _iter_pages_pdfium(path, start, end)
+        try:
+            first = next(pages)
+        except StopIteration:
+            return
+        except Exception:
+            if backend == "pdfium":
+                raise
+            yield from _iter_pages_pdfplumber(path, start, end)
+            return
+        yield first
+        yield from pages
+        return
+    yield from _iter_pages_pdfplumber(path, start, end)
+
+
+def _extract_range(path: str, start: int, end: int, backend: str) -> list[str]:
+    return list(iter_pdf_pages(path, backend=backend, start=start, end=end))
+
+
+_pdf_executor: ProcessPoolExecutor | None = None
+
+
+def _get_pdf_executor() -> ProcessPoolExecutor:
+    global _pdf_executor
+    if _pdf_executor is None:
+        # Sem fork: no worker do Celery o processo já tem threads (event loop, exporter de spans) e um
+        # fork herdaria locks presos por elas. O forkserver parte de um processo limpo.
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        _pdf_executor = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=context)
+    return _pdf_executor
+
+
+def _collect(pages: Iterator[str], max_chars: int | None) -> str:
+    parts: list[str] = []
+    total = 0
+    for text in pages:
+        parts.append(text)
+        total += len(text) + 1
+        if max_chars and total >= max_chars:
+            break
+    joined = "\n".join(parts)
+    return joined[:max_chars] if max_chars else joined
+
+
+def _iter_pages_parallel(path: str, page_count: int, backend: str, workers: int, pages_per_task: int) -> Iterator[str]:
+    # Submete faixas de páginas em ondas de `workers` para não extrair o
+    # documento inteiro quando o orçamento de caracteres acabar cedo.
+    executor = _get_pdf_executor()
+    ranges = [(s, min(s + pages_per_task, page_count)) for s in range(0, page_count, pages_per_task)]
+    for wave_start in range(0, len(ranges), workers):
+        wave = ranges[wave_start:wave_start + workers]
+        futures = [executor.submit(_extract_range, path, s, e, backend) for s, e in wave]
+        for future in futures:
+            yield from future.result()
+
+
+def extract_pdf_text(
+    path: str,
+    max_chars: int | None = PDF_MAX_CHARS,
+    backend: str = PDF_BACKEND,
+    workers: int = PDF_WORKERS,
+    parallel_min_pages: int = PDF_PARALLEL_MIN_PAGES,
+    pages_per_task: int = PDF_PAGES_PER_TASK,
+) -> str:
+    resolved = _resolve_backend(backend)
+    if workers > 1 and parallel_min_pages > 0:
+        try:
+            page_count = _page_count(path, resolved)
+        except Exception:
+            page_count = 0
+        if page_count >= parallel_min_pages:
+            try:
+                return _collect(_iter_pages_parallel(path, page_count, backend, workers, pages_per_task), max_chars)
+            except Exception:
+                # Ex.: processos daemon sem permissão para criar filhos; segue em série.
+                pass
+    return _collect(iter_pdf_pages(path, backend=backend), max_chars)
+
+
+def read_file_sync(path: str, encoding: str = "utf-8", max_chars: int | None = PDF_MAX_CHARS) -> str:
     if not os.path.exists(path):
         raise FileNotFoundError(path)
 
     if path.lower().endswith(".pdf"):
-        parts = []
-        with pdfplumber.open(path) as pdf:
-            for page in pdf.pages:
-                parts.append(page.extract_text() or "")
-        return "\n".join(parts)
+        return extract_pdf_text(path, max_chars=max_chars)
     else:
         with open(path, "r", encoding=encoding) as f:
             return f.read()
@@ -0,0 +1,95 @@
+import hashlib
+import re
+import string
+
+from app.core.constants import REPLY_MODE
+from app.models import Category
+
+# Placeholders aceitos nos templates: {saudacao}, {remetente} e {usuario}.
+PLACEHOLDERS: frozenset[str] = frozenset({"saudacao", "remetente", "usuario"})
+
+DEFAULT_TEMPLATES: dict[str, list[str]] = {
+    Category.IMPRODUTIVO.value: [
+        "{saudacao}\nMelhor alinharmos esse tipo de assunto pessoalmente.\nNo email seguimos só com os temas de trabalho.",
+        "{saudacao}\nEsse tipo de conteúdo é melhor nos grupos informais.\nVamos manter o email apenas para trabalho.",
+        "{saudacao}\nObrigado pela mensagem!\nPor aqui seguimos só com os assuntos de trabalho. :)",
+    ],
+    Category.PRODUTIVO.value: [
+        "{saudacao}\nRecebemos sua mensagem e vamos analisar os pontos levantados.\nRetornaremos em breve com os próximos passos.",
+    ],
+}
+
+_SIGN_OFF_RE = re.compile(
+    r"^\s*(?:abs|abraços?|att|atenciosamente|cordialmente|obrigad[oa]|valeu|vlw|bjs|beijos|\[\]s|até mais|grato|grata)[\s,.!]*$",
+    flags=re.IGNORECASE,
+)
+_NAME_RE = re.compile(r"^[A-ZÀ-Ý][a-zà-ÿ]+(?:\s+[A-ZÀ-Ý][a-zà-ÿ]+){0,2}$")
+
+
+class TemplateError(ValueError):
+    pass
+
+
+def extract_sender_name(text: str) -> str | None:
+    """Primeiro nome de quem assina o e-mail.
+
+    Procura a linha seguinte a uma despedida ("Abs,", "Valeu,", ...) nas
+    últimas linhas do texto e, sem despedida, uma última linha curta que
+    pareça um nome próprio.
+    """
+    if not text:
+        return None
+    lines = [l.strip() for l in text.splitlines() if l.strip()][-6:]
+    for i, line in enumerate(lines[:-1]):
+        if _SIGN_OFF_RE.match(line) and _NAME_RE.match(lines[i + 1]):
+            return lines[i + 1].split()[0]
+    if lines and _NAME_RE.match(lines[-1]):
+        return lines[-1].split()[0]
+    return None
+
+
+def validate_template(template: str) -> str:
+    try:
+        fields = {name for _, name, _, _ in string.Formatter().parse(template) if name is not None}
+    except ValueError as exc:
+        raise TemplateError(f"Template inválido: {exc}") from exc
+    unknown = fields - PLACEHOLDERS
+    if unknown:
+        raise TemplateError(f"Placeholders desconhecidos: {', '.join(sorted(unknown))}")
+    return template
+
+
+def _pick(templates: list[str], text: str) -> str:
+    # Escolha estável por texto: o mesmo e-mail recebe sempre a mesma variação.
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return templates[digest[0] % len(templates)]
+
+
+def uses_template(category: str | None, mode: str = REPLY_MODE) -> bool:
+    return mode == "template" and category == Category.IMPRODUTIVO.value
+
+
+def render_reply(category: str, text: str, username: str | None = None, override: str | None = None) -> str:
+    """Resposta por template para `category`, personalizada com remetente e assinatura.
+
+    `override` é o template do usuário (`User.reply_template`) e vale para
+    e-mails IMPRODUTIVO; sem ele, usa uma das variações padrão da categoria.
+    """
+    templates = DEFAULT_TEMPLATES.get(category)
+    if not templates:
+        return ""
+    template = override if override and category == Category.IMPRODUTIVO.value else _pick(templates, text)
+    sender = extract_sender_name(text)
+    values = {
+        "saudacao": f"Oi {sender}," if sender else "Olá,",
+        "remetente": sender or "",
+        "usuario": username or "",
+    }
+    try:
+        body = template.format_map(values)
+    except (KeyError, ValueError, IndexError):
+        template = _pick(templates, text)
+        body = template.format_map(values)
+    if username and "{usuario}" not in template:
+        body += f"\n\nAtenciosamente,\n{username}"
+    return body.strip()
@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict
+
+from sqlalchemy import bindparam, update
+
+from app.core.constants import (
+    RESULT_WRITER_ENABLED,
+    RESULT_WRITER_FLUSH_MS,
+    RESULT_WRITER_MAX_BATCH,
+    RESULT_WRITER_MAX_RETRIES,
+)
+from app.models import TextEntry
+from app.services import metrics
+from app.services.tracing import SpanContext, current as current_trace, tracer
+
+logger = logging.getLogger(__name__)
+
+
+class ResultWriteFailed(Exception):
+    pass
+
+
+class ResultWriter:
+    """Write-behind dos resultados do pipeline em TextEntry.
+
+    As tasks entregam `(id, campos)` e seguem; uma task do event loop do
+    worker junta as linhas pendentes e grava tudo num único `UPDATE` com
+    executemany (um commit por lote), a cada `RESULT_WRITER_FLUSH_MS` ou ao
+    juntar `RESULT_WRITER_MAX_BATCH` linhas. Atualizações do mesmo id são
+    mescladas. Um lote que falha volta para a fila com backoff e é descartado
+    (com log) após `RESULT_WRITER_MAX_RETRIES` tentativas. `close()` grava o
+    que restar no desligamento do worker.
+
+    `write` não espera o flush: devolve um future resolvido no commit do lote
+    que levou a linha (com `ResultWriteFailed` se ela for descartada). As
+    tasks retornam na hora e o loop do worker emite o `done` quando o future
+    resolve; assim, mesmo no pool prefork (uma task por vez em cada
+    processo), tasks seguidas do mesmo processo caem no mesmo lote. Linhas
+    ainda no buffer se perdem se o processo morrer sem passar por `close()`
+    (ex.: SIGKILL).
+
+    Fora do loop vinculado com `bind()` (ou desligado), `write` faz o
+    `UPDATE` na hora e devolve None.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = RESULT_WRITER_ENABLED,
+        flush_ms: int = RESULT_WRITER_FLUSH_MS,
+        max_batch: int = RESULT_WRITER_MAX_BATCH,
+        max_retries: int = RESULT_WRITER_MAX_RETRIES,
+    ):
+        self.enabled = enabled and max_batch > 1
+        self.flush_interval = max(flush_ms, 1) / 1000
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._attempts: Dict[int, int] = {}
+        # id -> (span da task, instante do write) para registrar o span db_write após o flush.
+        self._traces: Dict[int, tuple[SpanContext, int]] = {}
+        # id -> futures devolvidos por write(), resolvidos no commit da linha.
+        self._waiters: Dict[int, list[asyncio.Future]] = {}
+        self._wake: asyncio.Event | None = None
+        self._flusher: asyncio.Task | None = None
+        self._closing = False
+        self.flushes = 0
+        self.rows = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop | None) -> None:
+        self._loop = loop
+        self._pending.clear()
+        self._attempts.clear()
+        self._traces.clear()
+        self._waiters.clear()
+        self._wake = self._flusher = None
+        self._closing = False
+
+    def _buffering(self) -> bool:
+        if not self.enabled or self._closing or self._loop is None:
+            return False
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    async def write(self, text_entry_id: int, **fields) -> asyncio.Future | None:
+        if not fields:
+            return None
+        if not self._buffering():
+            from app.crud import update_text_entry_fields
+
+            with metrics.stage("db_write"), tracer.span("db_write", text_entry_id=text_entry_id, buffered=False):
+                await update_text_entry_fields(text_entry_id, **fields)
+            return None
+        self._pending[text_entry_id] = {**self._pending.get(text_entry_id, {}), **fields}
+        trace = current_trace()
+        if trace is not None and text_entry_id not in self._traces:
+            self._traces[text_entry_id] = (trace, time.time_ns())
+        committed = self._loop.create_future()
+        self._waiters.setdefault(text_entry_id, []).append(committed)
+        if self._flusher is None:
+            self._wake = asyncio.Event()
+            self._flusher = self._loop.create_task(self._run())
+        if len(self._pending) >= self.max_batch:
+            self._wake.set()
+        return committed
+
+    def _resolve(self, waiters: Dict[int, list[asyncio.Future]], exc: Exception | None = None) -> None:
+        for futures in waiters.values():
+            for future in futures:
+                if future.done():
+                    continue
+                if exc is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(exc)
+
+    async def _run(self) -> None:
+        delay = self.flush_interval
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if not self._pending:
+                delay = self.flush_interval
+                continue
+            ok = await self.flush()
+            # Com falha, espera mais antes de tentar de novo (até 30s).
+            delay = self.flush_interval if ok else min(delay * 2, 30.0)
+
+    @staticmethod
+    def _group(rows: Dict[int, Dict[str, Any]]) -> Dict[tuple, list[Dict[str, Any]]]:
+        # executemany exige os mesmos parâmetros em todas as linhas: agrupa por conjunto de colunas.
+        groups: Dict[tuple, list[Dict[str, Any]]] = {}
+        for entry_id, fields in rows.items():
+            values = {k: getattr(v, "value", v) for k, v in fields.items()}
+            groups.setdefault(tuple(sorted(values)), []).append({"b_id": entry_id, **values})
+        return groups
+
+    async def flush(self) -> bool:
+        if not self._pending:
+            return True
+        from app.db import async_session
+
+        batch = dict(list(self._pending.items())[: max(self.max_batch, 1)])
+        # Só quem esperava pelos campos deste lote: writes que chegarem durante o flush esperam o próximo.
+        waiters = {entry_id: self._waiters.pop(entry_id) for entry_id in batch if entry_id in self._waiters}
+        for entry_id in batch:
+            del self._pending[entry_id]
+        table = TextEntry.__table__
+        started = time.perf_counter()
+        try:
+            async with async_session() as session:
+                for params in self._group(batch).values():
+                    # Sem .values(): o SET sai das chaves dos parâmetros.
+                    await session.execute(update(table).where(table.c.id == bindparam("b_id")), params)
+                await session.commit()
+        except asyncio.CancelledError:
+            # Desligamento no meio do flush: o lote volta para ser gravado por close().
+            self._pending = {**batch, **self._pending}
+            self._restore_waiters(waiters)
+            raise
+        except Exception as exc:
+            self.failures += 1
+            self._requeue(batch, exc, waiters)
+            return False
+        for entry_id in batch:
+            self._attempts.pop(entry_id, None)
+        elapsed = time.perf_counter() - started
+        self._record_spans(batch, len(batch))
+        self._resolve(waiters)
+        self.flushes += 1
+        self.rows += len(batch)
+        metrics.observe_stage("db_write", elapsed)
+        logger.debug("Result writer flushed %d rows in %.1fms", len(batch), elapsed * 1000)
+        if len(self._pending) >= self.max_batch and self._wake is not None:
+            self._wake.set()
+        return True
+
+    def _record_spans(self, entry_ids, batch_rows: int) -> None:
+        # O span vai do write() da task até o commit do lote (espera no buffer incluída).
+        end_ns = time.time_ns()
+        for entry_id in entry_ids:
+            trace = self._traces.pop(entry_id, None)
+            if trace is not None:
+                tracer.record("db_write", trace[0], trace[1], end_ns, text_entry_id=entry_id, buffered=True, batch_rows=batch_rows)
+
+    def _restore_waiters(self, waiters: Dict[int, list[asyncio.Future]]) -> None:
+        for entry_id, futures in waiters.items():
+            self._waiters[entry_id] = futures + self._waiters.get(entry_id, [])
+
+    def _requeue(self, batch: Dict[int, Dict[str, Any]], exc: Exception, waiters: Dict[int, list[asyncio.Future]] | None = None) -> None:
+        waiters = waiters or {}
+        dropped = []
+        for entry_id, fields in batch.items():
+            attempts = self._attempts.get(entry_id, 0) + 1
+            if attempts > self.max_retries:
+                self._attempts.pop(entry_id, None)
+                self._traces.pop(entry_id, None)
+                self._resolve({entry_id: waiters.pop(entry_id, [])}, ResultWriteFailed(f"TextEntry {entry_id} not written: {exc}"))
+                dropped.append(entry_id)
+                continue
+            self._attempts[entry_id] = attempts
+            # Campos que chegaram depois da falha prevalecem sobre os do lote.
+            self._pending[entry_id] = {**fields, **self._pending.get(entry_id, {})}
+        self._restore_waiters(waiters)
+        self.dropped += len(dropped)
+        if dropped:
+            logger.error("Result writer dropped %d rows after %d attempts (%s): %s", len(dropped), self.max_retries, exc, dropped)
+        else:
+            logger.warning("Result writer flush failed, %d rows requeued: %s", len(batch), exc)
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Para o flush periódico e grava o que estiver pendente (com as mesmas tentativas)."""
+        self._closing = True
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except BaseException:
+                pass
+            self._flusher = None
+        deadline = time.monotonic() + timeout
+        delay = self.flush_interval
+        while self._pending and time.monotonic() < deadline:
+            if not await self.flush():
+                await asyncio.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+                delay = min(delay * 2, 5.0)
+        if self._pending:
+            self.dropped += len(self._pending)
+            logger.error("Result writer shut down with %d unwritten rows: %s", len(self._pending), list(self._pending))
+            self._pending.clear()
+            self._traces.clear()
+        self._resolve(self._waiters, ResultWriteFailed("Result writer closed before the row was written"))
+        self._waiters.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "pending": len(self._pending),
+            "waiting": sum(len(f) for f in self._waiters.values()),
+            "retrying": len(self._attempts),
+            "flushes": self.flushes,
+            "rows": self.rows,
+            "failures": self.failures,
+            "dropped": self.dropped,
+        }
+
+
+result_writer = ResultWriter()
@@ -1,94 +1,272 @@
 from app.services.celery import celery
-from app.services.read_file import read_file_sync
+from app.services.read_file import read_file_async
 from app.services import nlp as nlp_service
 from app.services import ia as ia_service
-from app.models import Category, Status, User
-from app.schemas import TextEntryCreateRequest
-from app.db import async_session
-from app.crud import create_text_entry, update_text_entry_by_id, get_user_by_id
+from app.services.cache import result_cache
+from app.services.condense import condense_for_llm
+from app.services.local_classifier import local_classifier
+from app.services.replies import render_reply, uses_template
+from app.services.events import TaskStream, task_events
+from app.core.constants import GENAI_MODEL, METRICS_WORKER_PORT, REPLY_MODE
+from app.models import Category, Status
+from app.schemas import CurrentUser, TextEntryCreateRequest
+from app.db import async_session, configure_engine, get_engine
+from app.services.worker_loop import worker_loop
+from app.services.result_writer import result_writer
+from app.services import metrics
+from app.services.tracing import extract, tracer
+from app.services.user_service import delete_account
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
+from app.crud import create_text_entry, get_user_identity
 from pathlib import Path
+import asyncio
 import os
+from typing import Any
 
 
-async def process_pipeline_async(file_path: str = None, text: str = None, user_id: int | None = None, username: str | None = None, top_n: int = 15):
+def _to_category(ia_cat) -> Category:
+    if isinstance(ia_cat, Category):
+        return ia_cat
+    if isinstance(ia_cat, str):
+        try:
+            return Category(ia_cat)
+        except Exception:
+            low = ia_cat.strip().lower()
+            if low.startswith("prod"):
+                return Category.PRODUTIVO
+            elif low.startswith("improd") or low.startswith("im"):
+                return Category.IMPRODUTIVO
+    return Category.SEM_CLASSIFICACAO
 
-    if not file_path and not text:
-        raise ValueError("file_path ou text obrigatório")
 
-    content_text = read_file_sync(file_path) if file_path else text
+async def _create_entry(user_id: int | None, content_text: str, file_name: str | None, file_meta: dict | None = None) -> int | None:
+    # Só para mensagens sem `text_entry_id`: a API cria a linha ao enfileirar.
+    if user_id is None:
+        return None
+    file_meta = file_meta or {}
+    try:
+        te_req = TextEntryCreateRequest(
+            user_id=user_id,
+            original_text=content_text,
+            file_name=file_meta.get("file_name") or file_name,
+            file_size=file_meta.get("file_size"),
+            file_content_type=file_meta.get("file_content_type"),
+            file_sha256=file_meta.get("file_sha256"),
+        )
+        return (await create_text_entry(te_req)).id
+    except Exception:
+        return None
+
 
-    created = None
-    if user_id is not None:
+async def _complete_entry(entry_id: int | None, category_enum: Category, final_generated: str, prompt_version: str | None = None, original_text: str | None = None) -> asyncio.Future | None:
+    """Entrega o resultado ao result_writer; devolve o future do commit (None se já gravado ou sem linha)."""
+    if entry_id is None:
+        return None
+    try:
+        db_update_kwargs = {"generated_response": final_generated, "status": Status.COMPLETED.value, "prompt_version": prompt_version}
+        if category_enum != Category.SEM_CLASSIFICACAO:
+            db_update_kwargs["category"] = category_enum.value
+        if original_text is not None:
+            db_update_kwargs["original_text"] = original_text
+        return await result_writer.write(entry_id, **db_update_kwargs)
+    except Exception:
+        return None
+
+
+async def _fail_entries(entry_ids: list[int | None], original_text: str | None = None) -> list[asyncio.Future | None]:
+    ids = [i for i in entry_ids if i is not None]
+    if not ids:
+        return []
+    fields = {"status": Status.FAILED.value}
+    if original_text is not None:
+        fields["original_text"] = original_text
+    commits = []
+    for entry_id in ids:
         try:
-            te_req = TextEntryCreateRequest(
-                user_id=user_id,
-                original_text=content_text,
-                file_name=os.path.basename(file_path) if file_path else None,
-            )
-            created = await create_text_entry(te_req)
+            commits.append(await result_writer.write(entry_id, **fields))
         except Exception:
-            created = None
+            pass
+    return commits
+
+
+# Eventos terminais aguardando o commit das linhas (referências fortes até terminarem).
+_stream_finishers: set[asyncio.Task] = set()
+
+
+async def _emit_after_commit(stream: TaskStream, commits: list[asyncio.Future], event: str, data: Any) -> None:
+    try:
+        outcomes = await asyncio.gather(*commits, return_exceptions=True)
+        failed = next((o for o in outcomes if isinstance(o, BaseException)), None)
+        if failed is not None and event == "done":
+            stream.emit("error", {"detail": f"Resultado não gravado: {failed}"})
+        else:
+            stream.emit(event, data)
+    finally:
+        await stream.aclose()
+
+
+async def _finish_stream(stream: TaskStream, commits: list[asyncio.Future | None], event: str, data: Any) -> None:
+    """Emite `done`/`error` só depois do commit das linhas da task, sem segurar a task.
+
+    Com o write-behind, a task retorna na hora (o processo prefork fica livre
+    para a próxima, que entra no mesmo lote) e o evento sai do loop do worker
+    quando o flush confirma; assim o `done` nunca chega antes de o resultado
+    estar visível em `GET /texts/{id}`.
+    """
+    pending = [c for c in commits if c is not None]
+    if not pending:
+        stream.emit(event, data)
+        await stream.aclose()
+        return
+    finisher = asyncio.get_running_loop().create_task(_emit_after_commit(stream, pending, event, data))
+    _stream_finishers.add(finisher)
+    finisher.add_done_callback(_stream_finishers.discard)
+
+
+async def drain_stream_finishers(timeout: float = 5.0) -> None:
+    if _stream_finishers:
+        await asyncio.wait(list(_stream_finishers), timeout=timeout)
+
+
+def _build_result(entry_id: int | None, user_id, content_text, file_name, category_enum: Category, final_generated, nlp_res, ia_res, cached: bool, condensed: dict | None = None) -> dict:
+    return {
+        "id": entry_id,
+        "user_id": user_id,
+        "original_text": content_text,
+        "category": category_enum.value,
+        "generated_response": final_generated,
+        "status": Status.COMPLETED.value,
+        "file_name": file_name,
+        "created_at": None,
+        "nlp": nlp_res if isinstance(nlp_res, dict) else None,
+        "condense": {k: v for k, v in condensed.items() if k != "text"} if condensed else None,
+        "cached": cached,
+        "source": "cache" if cached else ia_res.get("source", "llm"),
+        "prompt_version": ia_res.get("prompt_version"),
+        "latency": ia_res.get("latency"),
+    }
+
+
+def _cache_key(llm_text: str, username: str | None) -> str:
+    # No modo template o stream para após a categoria e o resultado vem sem resposta: não pode servir ao modo llm.
+    return result_cache.make_key(llm_text, GENAI_MODEL, ia_service.PROMPT_VERSION, username, REPLY_MODE)
+
+
+def _condense(content_text: str, nlp_res: dict, top_n: int) -> dict:
+    return condense_for_llm(content_text, nlp_res, lambda t: nlp_service.preprocess_sync(t, top_n=top_n))
+
+
+async def _cache_store(cache_key: str, ia_res: dict) -> None:
+    if ia_res.get("source") == "local":
+        return
+    if ia_res.get("category") != Category.SEM_CLASSIFICACAO.value:
+        await result_cache.aset(cache_key, {k: v for k, v in ia_res.items() if k not in ("latency", "batched")})
+
+
+def _final_generated(ia_res: dict) -> str:
+    return ia_res.get("generated_response") or ia_res.get("raw_response_clean") or ia_res.get("raw_response") or ""
+
+
+def _reply_for(ia_res: dict, content_text: str, username: str | None, reply_template: str | None) -> str:
+    # Respostas do classificador local já saem renderizadas pelo template.
+    if ia_res.get("source") != "local" and uses_template(ia_res.get("category"), REPLY_MODE):
+        return render_reply(ia_res["category"], content_text, username, reply_template)
+    return _final_generated(ia_res)
+
+
+async def _load_user(user_id: int | None) -> CurrentUser | None:
+    if user_id is None:
+        return None
+    try:
+        async with async_session() as s:
+            return await get_user_identity(s, user_id)
+    except Exception:
+        return None
+
+
+async def _user_context(user_id: int | None, username: str | None, reply_template: str | None) -> tuple[str | None, str | None]:
+    # A API envia username e reply_template do principal autenticado; só mensagens antigas, sem eles, consultam o banco.
+    if username is not None or user_id is None:
+        return username, reply_template
+    ux = await _load_user(user_id)
+    return getattr(ux, "username", None), getattr(ux, "reply_template", None)
+
+
+def _event_sink(stream: TaskStream):
+    """Repassa os eventos do LLM ao stream, descartando os tokens da resposta
+    quando a categoria terá resposta por template."""
+    templated = False
+
+    def on_event(event: str, data: dict) -> None:
+        nonlocal templated
+        if event == "category":
+            templated = uses_template(data.get("category"), REPLY_MODE)
+        elif event == "token" and templated:
+            return
+        stream.emit(event, data)
+
+    return on_event
+
+
+_DONE_EVENT_FIELDS = ("id", "category", "generated_response", "status", "source", "cached", "prompt_version")
+
+
+async def process_pipeline_async(file_path: str = None, text: str = None, user_id: int | None = None, username: str | None = None, top_n: int = 15, file_meta: dict | None = None, task_id: str | None = None, text_entry_id: int | None = None, reply_template: str | None = None):
+
+    if not file_path and not text:
+        raise ValueError("file_path ou text obrigatório")
+
+    stream = task_events.stream(task_id)
+    stream.emit("status", {"status": Status.PROCESSING.value})
+    entry_id = text_entry_id
+    # Linhas criadas no enqueue a partir de um arquivo ainda não têm o texto extraído.
+    extracted_text = None
+    # Depois de _finish_stream, o fechamento do stream fica com ele.
+    finished = False
 
     try:
-        nlp_res = nlp_service.preprocess_sync(content_text, top_n=top_n)
-        username = None
-        if user_id is not None:
-            try:
-                async with async_session() as s:
-                    ux = await get_user_by_id(s, user_id)
-                    username = getattr(ux, "username", None) if ux else None
-            except Exception:
-                username = None
-            ia_res = await ia_service.infer_async(nlp_res["cleaned_text"], username=username)
-
-        ia_cat = ia_res.get("category")
-        category_enum = None
-        if isinstance(ia_cat, Category):
-            category_enum = ia_cat
-        elif isinstance(ia_cat, str):
-            try:
-                category_enum = Category(ia_cat)
-            except Exception:
-                low = ia_cat.strip().lower()
-                if low.startswith("prod"):
-                    category_enum = Category.PRODUTIVO
-                elif low.startswith("improd") or low.startswith("im"):
-                    category_enum = Category.IMPRODUTIVO
-                else:
-                    category_enum = Category.SEM_CLASSIFICACAO
+        with metrics.stage("read_file"), tracer.span("read_file"):
+            # Em thread: a extração de PDF não pode travar o loop do worker (e o flush do result_writer).
+            content_text = await read_file_async(file_path) if file_path else text
+        file_name = os.path.basename(file_path) if file_path else None
+        if file_path and text_entry_id is not None:
+            extracted_text = content_text
+
+        if entry_id is None:
+            entry_id = await _create_entry(user_id, content_text, file_name, file_meta)
+
+        with metrics.stage("preprocess"), tracer.span("preprocess"):
+            nlp_res = nlp_service.preprocess_sync(content_text, top_n=top_n)
+        username, reply_template = await _user_context(user_id, username, reply_template)
+
+        condensed = _condense(content_text, nlp_res, top_n)
+        cache_key = _cache_key(condensed["text"], username)
+        ia_res = await result_cache.aget(cache_key)
+        cached = ia_res is not None
+        if not cached:
+            await local_classifier.refresh(async_session)
+            ia_res = local_classifier.classify(content_text, username, reply_template)
+        if ia_res is None:
+            on_event = _event_sink(stream) if stream.active else None
+            ia_res = await ia_service.infer_async(condensed["text"], username=username, templated_replies=REPLY_MODE == "template", on_event=on_event)
+            await _cache_store(cache_key, ia_res)
         else:
-            category_enum = Category.SEM_CLASSIFICACAO
-
-        final_generated = ia_res.get("generated_response") or ia_res.get("raw_response_clean") or ia_res.get("raw_response") or ""
-
-        result = {
-            "id": created.id if created else None,
-            "user_id": user_id,
-            "original_text": content_text,
-            "category": category_enum.value,
-            "generated_response": final_generated,
-            "status": Status.COMPLETED.value,
-            "file_name": os.path.basename(file_path) if file_path else None,
-            "created_at": None,
-            "nlp": nlp_res if isinstance(nlp_res, dict) else None,
-        }
-
-        if created is not None:
-            try:
-                db_update_kwargs = {"generated_response": final_generated, "status": Status.COMPLETED.value}
-                if category_enum != Category.SEM_CLASSIFICACAO:
-                    db_update_kwargs["category"] = category_enum.value
-                await update_text_entry_by_id(created.id, **db_update_kwargs)
-            except Exception:
-                pass
+            stream.emit("category", {"category": ia_res.get("category"), "confidence": ia_res.get("confidence")})
+
+        category_enum = _to_category(ia_res.get("category"))
+        final_generated = _reply_for(ia_res, content_text, username, reply_template)
+
+        result = _build_result(entry_id, user_id, content_text, file_name, category_enum, final_generated, nlp_res, ia_res, cached, condensed)
+        commit = await _complete_entry(entry_id, category_enum, final_generated, ia_res.get("prompt_version"), extracted_text)
+        metrics.task_finished("process_pipeline", "success", result["source"])
+        finished = True
+        await _finish_stream(stream, [commit], "done", {k: result.get(k) for k in _DONE_EVENT_FIELDS})
         return result
     except Exception as e:
-        if created is not None:
-            try:
-                async with async_session() as s:
-                    await update_text_entry_by_id(created.id, status=Status.FAILED.value)
-            except Exception:
-                pass
+        if not finished:
+            metrics.task_finished("process_pipeline", "failure")
+            finished = True
+            await _finish_stream(stream, await _fail_entries([entry_id], extracted_text), "error", {"detail": str(e)})
         raise e
     finally:
         try:
@@ -96,11 +274,153 @@ async def process_pipeline_async(file_path: str = None, text: str = None, user_i
                 Path(file_path).unlink()
         except Exception:
             pass
+        if not finished:
+            await stream.aclose()
+
+
+async def process_batch_async(texts: list[str], user_id: int | None = None, username: str | None = None, top_n: int = 15, task_id: str | None = None, text_entry_ids: list[int] | None = None, reply_template: str | None = None) -> list[dict]:
+    """Processa vários e-mails curtos empacotando os que não estão em cache em um único prompt."""
+    if not texts:
+        raise ValueError("texts obrigatório")
+
+    stream = task_events.stream(task_id)
+    stream.emit("status", {"status": Status.PROCESSING.value, "count": len(texts)})
+    if text_entry_ids is not None and len(text_entry_ids) == len(texts):
+        entries = list(text_entry_ids)
+    else:
+        entries = [await _create_entry(user_id, t, None) for t in texts]
+    finished = False
+
+    try:
+        username, reply_template = await _user_context(user_id, username, reply_template)
+        with metrics.stage("preprocess"), tracer.span("preprocess"):
+            nlp_results = [nlp_service.preprocess_sync(t, top_n=top_n) for t in texts]
+        condensed_results = [_condense(t, n, top_n) for t, n in zip(texts, nlp_results)]
+        cache_keys = [_cache_key(c["text"], username) for c in condensed_results]
+        ia_results = await result_cache.aget_many(cache_keys)
+        cached_flags = [r is not None for r in ia_results]
+
+        if any(r is None for r in ia_results):
+            await local_classifier.refresh(async_session)
+            for i, r in enumerate(ia_results):
+                if r is None:
+                    ia_results[i] = local_classifier.classify(texts[i], username, reply_template)
+
+        pending = [i for i, r in enumerate(ia_results) if r is None]
+        if pending:
+            fresh = await ia_service.infer_batch_async([condensed_results[i]["text"] for i in pending], username=username)
+            for i, ia_res in zip(pending, fresh):
+                ia_results[i] = ia_res
+                await _cache_store(cache_keys[i], ia_res)
+
+        results = []
+        completions = []
+        for entry_id, content_text, nlp_res, condensed, ia_res, cached in zip(entries, texts, nlp_results, condensed_results, ia_results, cached_flags):
+            category_enum = _to_category(ia_res.get("category"))
+            final_generated = _reply_for(ia_res, content_text, username, reply_template)
+            completions.append(_complete_entry(entry_id, category_enum, final_generated, ia_res.get("prompt_version")))
+            results.append(_build_result(entry_id, user_id, content_text, None, category_enum, final_generated, nlp_res, ia_res, cached, condensed))
+        commits = await asyncio.gather(*completions)
+        for r in results:
+            metrics.task_finished("process_batch", "success", r["source"])
+        finished = True
+        await _finish_stream(stream, commits, "done", {"results": [{k: r.get(k) for k in _DONE_EVENT_FIELDS} for r in results]})
+        return results
+    except Exception as e:
+        if not finished:
+            metrics.task_finished("process_batch", "failure")
+            finished = True
+            await _finish_stream(stream, await _fail_entries(entries), "error", {"detail": str(e)})
+        raise e
+    finally:
+        if not finished:
+            await stream.aclose()
+
+
+def _traceparent(request) -> str | None:
+    # Headers extras da mensagem viram atributos de `request`; alguns transportes os deixam em `headers`.
+    return getattr(request, "traceparent", None) or (getattr(request, "headers", None) or {}).get("traceparent")
+
+
+async def _traced(name: str, traceparent: str | None, coro, **attributes):
+    """Executa `coro` dentro do span raiz da task, filho do span da requisição que a enfileirou."""
+    with tracer.span(name, parent=extract(traceparent), **attributes):
+        return await coro
 
 
 @celery.task(bind=True, name="process_pipeline_task")
-def process_pipeline_task(self, file_path: str = None, text: str = None, user_id: int | None = None, username: str | None = None, top_n: int = 15):
+def process_pipeline_task(self, file_path: str = None, text: str = None, user_id: int | None = None, username: str | None = None, top_n: int = 15, file_meta: dict | None = None, text_entry_id: int | None = None, reply_template: str | None = None):
     if not file_path and not text:
         raise ValueError("file_path ou text obrigatório")
 
-    return __import__("asyncio").run(process_pipeline_async(file_path=file_path, text=text, user_id=user_id, username=username, top_n=top_n))
\ No newline at end of file
+    pipeline = process_pipeline_async(file_path=file_path, text=text, user_id=user_id, username=username, top_n=top_n, file_meta=file_meta, task_id=self.request.id, text_entry_id=text_entry_id, reply_template=reply_template)
+    return worker_loop.run(_traced("process_pipeline_task", _traceparent(self.request), pipeline, task_id=self.request.id, text_entry_id=text_entry_id))
+
+
+@celery.task(bind=True, name="process_batch_task")
+def process_batch_task(self, texts: list[str] = None, user_id: int | None = None, username: str | None = None, top_n: int = 15, text_entry_ids: list[int] | None = None, reply_template: str | None = None):
+    if not texts:
+        raise ValueError("texts obrigatório")
+
+    batch = process_batch_async(texts=texts, user_id=user_id, username=username, top_n=top_n, task_id=self.request.id, text_entry_ids=text_entry_ids, reply_template=reply_template)
+    return worker_loop.run(_traced("process_batch_task", _traceparent(self.request), batch, task_id=self.request.id, batch_size=len(texts)))
+
+
+async def delete_account_async(user_id: int, on_progress=None) -> dict:
+    async with async_session() as s:
+        result = await delete_account(s, user_id, on_progress=on_progress)
+    if result is None:
+        raise ValueError(f"Usuário {user_id} não encontrado")
+    return result
+
+
+@celery.task(bind=True, name="delete_user_task")
+def delete_user_task(self, user_id: int, total_texts: int | None = None):
+    # `self.request` é local da thread: no loop do worker o id seria None.
+    task_id = self.request.id
+
+    async def on_progress(deleted: int) -> None:
+        # Escrita bloqueante no result backend: fora do loop, mas aguardada para manter a ordem dos PROGRESS.
+        meta = {"user_id": user_id, "deleted_texts": deleted, "total_texts": total_texts}
+        await asyncio.to_thread(self.update_state, task_id=task_id, state="PROGRESS", meta=meta)
+
+    result = worker_loop.run(_traced("delete_user_task", _traceparent(self.request), delete_account_async(user_id, on_progress=on_progress), task_id=task_id))
+    return {**result, "total_texts": total_texts}
+
+
+@worker_init.connect
+def _start_metrics_server(**kwargs):
+    # Processo principal do worker: expõe as métricas somadas de todos os filhos (multiprocess).
+    if METRICS_WORKER_PORT > 0 and metrics.MULTIPROCESS:
+        from prometheus_client import start_http_server
+
+        start_http_server(METRICS_WORKER_PORT, registry=metrics.build_registry(queue_depth=False))
+
+
+@worker_process_init.connect
+def _start_worker_loop(**kwargs):
+    # Conexões herdadas do processo pai não podem ser usadas pelo filho: o
+    # engine é recriado com o perfil do worker.
+    configure_engine("worker")
+    result_writer.bind(worker_loop.start())
+
+
+@worker_process_shutdown.connect
+def _stop_worker_loop(**kwargs):
+    if worker_loop.running:
+        try:
+            worker_loop.run(result_writer.close(), timeout=15)
+        except Exception:
+            pass
+        try:
+            # close() resolveu os commits pendentes: os `done`/`error` que esperavam por eles saem agora.
+            worker_loop.run(drain_stream_finishers(), timeout=10)
+        except Exception:
+            pass
+        try:
+            worker_loop.run(get_engine().dispose(), timeout=10)
+        except Exception:
+            pass
+    worker_loop.stop()
+    tracer.shutdown()
+    metrics.mark_process_dead(os.getpid())
@@ -0,0 +1,68 @@
+import re
+import string
+import unicodedata
+from collections import Counter
+from typing import Iterable, NamedTuple
+
+from app.core.constants import NLP_FOLD_ACCENTS, NLP_STOPWORDS_FILE
+
+DEFAULT_STOPWORDS: frozenset[str] = frozenset({
+    'e', 'o', 'a', 'de', 'do', 'da', 'em', 'um', 'uma', 'para', 'com', 'não', 'na', 'no', 'que', 'se', 'por',
+    'mais', 'as', 'os', 'é', 'são', 'foi', 'foram',
+})
+
+MIN_TOKEN_LEN = 3
+
+# Regex compilada em vez de str.translate: para texto não-ASCII (português),
+# translate cai no caminho lento de busca por caractere no CPython.
+_PUNCT_RE = re.compile(f"[{re.escape(string.punctuation)}]+")
+_COMBINING_RE = re.compile(r"[\u0300-\u036f]+")
+
+
+def fold_accents(text: str) -> str:
+    return _COMBINING_RE.sub("", unicodedata.normalize("NFD", text))
+
+
+def load_stopwords(path: str | None = NLP_STOPWORDS_FILE) -> frozenset[str]:
+    if not path:
+        return DEFAULT_STOPWORDS
+    with open(path, "r", encoding="utf-8") as fh:
+        words = (line.split("#", 1)[0].strip().lower() for line in fh)
+        return frozenset(w for w in words if w)
+
+
+def _folded(words: Iterable[str]) -> frozenset[str]:
+    return frozenset(fold_accents(w) for w in words)
+
+
+STOPWORDS: frozenset[str] = load_stopwords()
+_FOLDED_STOPWORDS: frozenset[str] = _folded(STOPWORDS)
+
+
+class TokenizeResult(NamedTuple):
+    tokens: list[str]
+    counts: Counter
+    cleaned_text: str
+
+
+def tokenize(text: str, fold: bool = NLP_FOLD_ACCENTS, stopwords: frozenset[str] | None = None) -> TokenizeResult:
+    """Remove pontuação, normaliza caixa e filtra stopwords.
+
+    As palavras são contadas uma vez (em C, via Counter) e os filtros de
+    tamanho e stopwords são aplicados só às palavras distintas. Retorna os
+    tokens filtrados, a contagem por token (na ordem da primeira ocorrência)
+    e o texto limpo.
+    """
+    if stopwords is None:
+        stopwords = _FOLDED_STOPWORDS if fold else STOPWORDS
+    elif fold:
+        stopwords = _folded(stopwords)
+    if fold:
+        text = fold_accents(text)
+
+    words = _PUNCT_RE.sub("", text).lower().split()
+    counts = Counter(words)
+    for word in [w for w in counts if len(w) < MIN_TOKEN_LEN or w in stopwords]:
+        del counts[word]
+    tokens = list(filter(counts.__contains__, words))
+    return TokenizeResult(tokens, counts, " ".join(tokens))
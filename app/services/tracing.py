@@ -0,0 +1,327 @@
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, NamedTuple
+
+from app.core.constants import (
+    TRACING_EXPORTER,
+    TRACING_FILE,
+    TRACING_OTLP_ENDPOINT,
+    TRACING_SAMPLE_RATE,
+    TRACING_SERVICE_NAME,
+)
+
+logger = logging.getLogger(__name__)
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class SpanContext(NamedTuple):
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+_current: ContextVar[SpanContext | None] = ContextVar("autou_trace_context", default=None)
+
+
+def extract(traceparent: str | None) -> SpanContext | None:
+    """Lê um header W3C `traceparent`; valores inválidos são ignorados."""
+    match = _TRACEPARENT.match((traceparent or "").strip().lower())
+    if not match:
+        return None
+    trace_id, span_id, flags = match.groups()
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 1))
+
+
+def current() -> SpanContext | None:
+    return _current.get()
+
+
+def inject(headers: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """Acrescenta o `traceparent` do span atual a `headers` (para mensagens do Celery)."""
+    headers = dict(headers or {})
+    ctx = _current.get()
+    if ctx is not None:
+        headers["traceparent"] = ctx.traceparent()
+    return headers
+
+
+class Span:
+    __slots__ = ("name", "context", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, context: SpanContext, parent_id: str | None, attributes: Dict[str, Any]):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: str | None = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def record_error(self, exc: BaseException) -> None:
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": (self.end_ns - self.start_ns) / 1e6,
+            "attributes": {k: v for k, v in self.attributes.items() if v is not None},
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    __slots__ = ()
+    context = None
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def record_error(self, exc: BaseException) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _BackgroundExporter:
+    """Fila + thread própria que exporta os spans em lote, fora do event loop.
+
+    A thread nasce no primeiro span de cada processo (workers do Celery são
+    criados por fork). Spans acima de `max_queue` são descartados em vez de
+    segurar o pipeline. Subclasses implementam `_open()` (recurso usado pela
+    thread, ex.: cliente HTTP) e `_send(recurso, spans)`.
+    """
+
+    thread_name = "span-exporter"
+
+    def __init__(self, batch_size: int = 256, interval: float = 2.0, max_queue: int = 10000):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def export(self, span: Span) -> None:
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _open(self):
+        return nullcontext()
+
+    def _send(self, resource, spans: list[Span]) -> None:
+        raise NotImplementedError
+
+    def _run(self) -> None:
+        with self._open() as resource:
+            while True:
+                batch: list[Span] = []
+                deadline = time.monotonic() + self.interval
+                stop = False
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+                if batch:
+                    self._send(resource, batch)
+                if stop:
+                    return
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+class FileExporter(_BackgroundExporter):
+    """Um span por linha (JSON) num arquivo local, gravado pela thread do exporter."""
+
+    thread_name = "file-span-exporter"
+
+    def __init__(self, path: Path, interval: float = 0.5, **kwargs):
+        super().__init__(interval=interval, **kwargs)
+        self.path = path
+
+    def _send(self, resource, spans: list[Span]) -> None:
+        lines = "".join(json.dumps({"service": TRACING_SERVICE_NAME, **s.as_dict()}, ensure_ascii=False, default=str) + "\n" for s in spans)
+        try:
+            with self.path.open("a", encoding="utf-8") as fh:
+                fh.write(lines)
+        except Exception as exc:
+            logger.warning("Could not write %d spans to %s: %s", len(spans), self.path, exc)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpExporter(_BackgroundExporter):
+    """Envia spans em lote para um coletor OTLP/HTTP (JSON)."""
+
+    thread_name = "otlp-exporter"
+
+    def __init__(self, endpoint: str, **kwargs):
+        super().__init__(**kwargs)
+        self.endpoint = endpoint
+
+    def _open(self):
+        import httpx
+
+        return httpx.Client(timeout=5.0)
+
+    def _payload(self, spans: list[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACING_SERVICE_NAME}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "app.services.tracing"},
+                    "spans": [
+                        {
+                            "traceId": s.context.trace_id,
+                            "spanId": s.context.span_id,
+                            "parentSpanId": s.parent_id or "",
+                            "name": s.name,
+                            "kind": 1,
+                            "startTimeUnixNano": str(s.start_ns),
+                            "endTimeUnixNano": str(s.end_ns),
+                            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items() if v is not None],
+                            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+                        }
+                        for s in spans
+                    ],
+                }],
+            }]
+        }
+
+    def _send(self, client, spans: list[Span]) -> None:
+        try:
+            client.post(self.endpoint, json=self._payload(spans))
+        except Exception as exc:
+            logger.warning("Could not export %d spans to %s: %s", len(spans), self.endpoint, exc)
+
+
+def _build_exporter(name: str):
+    if name == "file":
+        from app.core.config import get_data_dir
+
+        return FileExporter(Path(TRACING_FILE) if TRACING_FILE else get_data_dir() / "traces.jsonl")
+    if name == "otlp":
+        return OtlpExporter(TRACING_OTLP_ENDPOINT)
+    return None
+
+
+class Tracer:
+    """Spans por etapa com contexto W3C (`traceparent`) e exportação plugável.
+
+    Com `TRACING_EXPORTER=none` (padrão), `span()` devolve um span vazio sem
+    gerar ids nem tocar no contexto. Traces novos são amostrados com
+    `TRACING_SAMPLE_RATE`; a decisão segue para os filhos e para as tasks do
+    Celery pelo flag do `traceparent`.
+    """
+
+    def __init__(self, exporter: str = TRACING_EXPORTER, sample_rate: float = TRACING_SAMPLE_RATE):
+        self.exporter = _build_exporter(exporter)
+        self.sample_rate = sample_rate
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def _child_context(self, parent: SpanContext | None) -> SpanContext:
+        if parent is None:
+            return SpanContext(f"{random.getrandbits(128):032x}", f"{random.getrandbits(64):016x}", random.random() < self.sample_rate)
+        return SpanContext(parent.trace_id, f"{random.getrandbits(64):016x}", parent.sampled)
+
+    @contextmanager
+    def span(self, name: str, parent: SpanContext | None = None, **attributes) -> Iterator[Span | _NoopSpan]:
+        """Abre um span filho do atual (ou de `parent`, vindo de outro processo)."""
+        if self.exporter is None:
+            yield NOOP_SPAN
+            return
+        parent = parent or _current.get()
+        ctx = self._child_context(parent)
+        token = _current.set(ctx)
+        if not ctx.sampled:
+            try:
+                yield NOOP_SPAN
+            finally:
+                _current.reset(token)
+            return
+        span = Span(name, ctx, parent.span_id if parent else None, attributes)
+        try:
+            yield span
+        except BaseException as exc:
+            span.record_error(exc)
+            raise
+        finally:
+            _current.reset(token)
+            span.end_ns = time.time_ns()
+            self._export(span)
+
+    def record(self, name: str, parent: SpanContext | None, start_ns: int, end_ns: int, **attributes) -> None:
+        """Registra um span já medido (ex.: escrita em lote feita depois, fora do contexto da task)."""
+        if self.exporter is None or parent is None or not parent.sampled:
+            return
+        span = Span(name, self._child_context(parent), parent.span_id, attributes)
+        span.start_ns, span.end_ns = start_ns, end_ns
+        self._export(span)
+
+    def _export(self, span: Span) -> None:
+        try:
+            self.exporter.export(span)
+        except Exception as exc:
+            logger.warning("Could not export span %s: %s", span.name, exc)
+
+    def shutdown(self) -> None:
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+
+tracer = Tracer()
@@ -0,0 +1,93 @@
+import hashlib
+import os
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict
+
+import anyio
+from fastapi import UploadFile
+
+from app.core.constants import MAX_UPLOAD_BYTES, UPLOAD_CHUNK_SIZE
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, limit: int):
+        super().__init__(f"Arquivo excede o limite de {limit} bytes")
+        self.limit = limit
+
+
+@dataclass
+class StoredUpload:
+    path: Path
+    file_name: str | None
+    file_size: int
+    file_content_type: str | None
+    file_sha256: str
+
+    def meta(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("path")
+        return data
+
+
+def upload_prefix(user_id: int | None) -> str:
+    return f"upload-{user_id}-" if user_id is not None else "upload-"
+
+
+def remove_user_uploads(dest_dir: Path, user_id: int) -> int:
+    """Remove os uploads ainda em disco de um usuário (arquivos de tasks que falharam antes da limpeza)."""
+    removed = 0
+    for path in dest_dir.glob(f"{upload_prefix(user_id)}*"):
+        try:
+            path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+async def save_upload(
+    file: UploadFile,
+    dest_dir: Path,
+    user_id: int | None = None,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> StoredUpload:
+    """Copia o upload para `dest_dir` em blocos, calculando o SHA-256 durante a cópia.
+
+    O uso de memória fica limitado a `chunk_size`; se o arquivo passar de
+    `max_bytes`, a cópia é interrompida, o arquivo parcial é removido e
+    `UploadTooLarge` é lançada.
+    """
+    suffix = os.path.splitext(file.filename or "")[1] or ""
+    path = dest_dir / f"{upload_prefix(user_id)}{uuid.uuid4().hex}{suffix}"
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        async with await anyio.open_file(path, "wb") as out:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                hasher.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        raise
+    finally:
+        await file.close()
+
+    return StoredUpload(
+        path=path,
+        file_name=file.filename,
+        file_size=size,
+        file_content_type=file.content_type,
+        file_sha256=hasher.hexdigest(),
+    )
@@ -1,12 +1,18 @@
 import asyncio
+import inspect
+from typing import Awaitable, Callable
+
 from fastapi import HTTPException
-from app.core.security import hash_password, verify_password
-from app.crud import create_user, get_user_by_email
+from app.core.config import get_data_dir
+from app.crud import create_user, delete_user_by_id, get_user_by_email
 from app.models import User
 from app.schemas import TokenResponse, UserCreateRequest, UserLoginRequest, UserResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.services.auth_service import create_access_token
+from app.services.hashing import password_hasher
+from app.services.uploads import remove_user_uploads
 
 
 async def register_user(session: AsyncSession, data: UserCreateRequest) -> User | None:
@@ -15,14 +21,19 @@ async def register_user(session: AsyncSession, data: UserCreateRequest) -> User
   if userExist:
     raise HTTPException(status_code=400, detail="Email already registered")
   
-  hash_pw = await asyncio.to_thread(hash_password, data.password)
+  hash_pw = await password_hasher.hash(data.password)
 
   db_user = User(
     username=data.username.strip(),
     email=data.email,
     hash_password=hash_pw,
   )
-  user = await create_user(session, db_user)
+  try:
+    user = await create_user(session, db_user)
+  except IntegrityError:
+    # Cadastro concorrente com o mesmo email: o índice único em user.email decide.
+    await session.rollback()
+    raise HTTPException(status_code=400, detail="Email already registered")
   return UserResponse(
     id=user.id,
     username=user.username,
@@ -36,9 +47,27 @@ async def authenticate_user(session: AsyncSession, data: UserLoginRequest) -> To
   if not user:
     return None
 
-  verified = verify_password(data.password, user.hash_password)
+  verified = await password_hasher.verify(data.password, user.hash_password)
   if not verified:
     return None
 
   token = create_access_token({"sub": str(user.id), "email": user.email})
-  return TokenResponse(access_token=token, user_id=user.id)
\ No newline at end of file
+  return TokenResponse(access_token=token, user_id=user.id)
+
+
+async def delete_account(session: AsyncSession, user_id: int, on_progress: Callable[[int], Awaitable[None] | None] | None = None) -> dict | None:
+  """Remove usuário, histórico e uploads pendentes em disco; None se o usuário não existe."""
+  deleted = 0
+
+  async def _progress(count: int) -> None:
+    nonlocal deleted
+    deleted = count
+    if on_progress is not None:
+      progress = on_progress(count)
+      if inspect.isawaitable(progress):
+        await progress
+
+  if not await delete_user_by_id(session, user_id, on_progress=_progress):
+    return None
+  removed_files = await asyncio.to_thread(remove_user_uploads, get_data_dir(), user_id)
+  return {"user_id": user_id, "deleted_texts": deleted, "removed_files": removed_files}
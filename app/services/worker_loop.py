@@ -0,0 +1,72 @@
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Optional
+
+
+class WorkerLoop:
+    """Event loop que vive durante todo o processo worker.
+
+    O loop roda em uma thread dedicada; as tasks do Celery submetem corrotinas
+    com `run()` e aguardam o resultado. Recursos presos ao loop (conexões do
+    engine assíncrono, cliente `client.aio`) são reaproveitados entre tasks.
+    Sem loop iniciado, `run()` cai para `asyncio.run`.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        return self._loop
+
+    @property
+    def running(self) -> bool:
+        return (
+            self._loop is not None
+            and self._pid == os.getpid()
+            and self._thread is not None
+            and self._thread.is_alive()
+        )
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self.running:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run() -> None:
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            thread = threading.Thread(target=_run, name="worker-event-loop", daemon=True)
+            thread.start()
+            ready.wait()
+            self._loop, self._thread, self._pid = loop, thread, os.getpid()
+            return loop
+
+    def run(self, coro: Awaitable[Any], timeout: float | None = None) -> Any:
+        if not self.running:
+            return asyncio.run(coro)
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        return future.result(timeout)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        with self._lock:
+            if not self.running:
+                self._loop = self._thread = self._pid = None
+                return
+            loop, thread = self._loop, self._thread
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            if not loop.is_running():
+                loop.close()
+            self._loop = self._thread = self._pid = None
+
+
+worker_loop = WorkerLoop()
@@ -0,0 +1,118 @@
+"""Benchmark do Argon2 usado no login (`app/core/security.py`).
+
+Parte 1: para uma grade de parâmetros (time_cost, memory_cost, parallelism),
+mede o tempo de uma verificação e quantas verificações por segundo um core
+sustenta. Ajuda a escolher `ARGON2_*` sabendo o custo por login.
+
+Parte 2: dispara logins concorrentes pelo `password_hasher` (pool de threads e
+de processos) e mede a vazão total e o atraso máximo do event loop — que
+seria o tempo inteiro do Argon2 se a verificação rodasse direto no loop.
+
+Uso:
+    python benchmarks/bench_argon2.py
+    python benchmarks/bench_argon2.py --logins 200 --workers 4
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+PASSWORD = "senha-forte-123"
+
+
+def bench_params(time_costs, memory_costs, parallelisms, repeat: int) -> None:
+    from passlib.context import CryptContext
+
+    print(f"{'t':>3} {'m (KiB)':>9} {'p':>3} {'ms/verify':>10} {'verify/s/core':>14}")
+    for t, m, p in itertools.product(time_costs, memory_costs, parallelisms):
+        ctx = CryptContext(schemes=["argon2"], argon2__time_cost=t, argon2__memory_cost=m, argon2__parallelism=p)
+        hashed = ctx.hash(PASSWORD)
+        ctx.verify(PASSWORD, hashed)
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            ctx.verify(PASSWORD, hashed)
+            samples.append(time.perf_counter() - started)
+        ms = statistics.median(samples) * 1000
+        print(f"{t:>3} {m:>9} {p:>3} {ms:10.1f} {1000 / ms:14.1f}")
+
+
+async def _loop_lag(stop: asyncio.Event) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.005)
+        worst = max(worst, time.perf_counter() - started - 0.005)
+    return worst
+
+
+async def bench_pool(kind: str, workers: int, logins: int) -> None:
+    from app.core.security import hash_password
+    from app.services.hashing import HashingBusy, PasswordHasher
+
+    hasher = PasswordHasher(kind=kind, workers=workers, max_pending=logins)
+    hashed = hash_password(PASSWORD)
+    await hasher.verify(PASSWORD, hashed)
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(_loop_lag(stop))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(hasher.verify(PASSWORD, hashed) for _ in range(logins)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    worst_lag = await lag
+    hasher.shutdown()
+
+    ok = sum(1 for r in results if r is True)
+    busy = sum(1 for r in results if isinstance(r, HashingBusy))
+    print(f"{kind:<8} {workers:>7} {logins:>7} {ok / elapsed:10.1f} {ok / elapsed / workers:12.1f} {worst_lag * 1000:12.1f} {busy:>6}")
+
+
+async def bench_inline(logins: int) -> None:
+    from app.core.security import hash_password, verify_password
+
+    hashed = hash_password(PASSWORD)
+    stop = asyncio.Event()
+    lag = asyncio.create_task(_loop_lag(stop))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    for _ in range(logins):
+        verify_password(PASSWORD, hashed)
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    worst_lag = await lag
+    print(f"{'inline':<8} {1:>7} {logins:>7} {logins / elapsed:10.1f} {logins / elapsed:12.1f} {worst_lag * 1000:12.1f} {0:>6}")
+
+
+async def main_async(args) -> None:
+    print(f"\nlogins concorrentes com os parâmetros atuais ({args.logins} verificações):")
+    print(f"{'executor':<8} {'workers':>7} {'logins':>7} {'verify/s':>10} {'/s/worker':>12} {'lag máx ms':>12} {'503':>6}")
+    await bench_inline(max(args.logins // 10, 5))
+    for kind in ("thread", "process"):
+        await bench_pool(kind, args.workers, args.logins)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--time-cost", type=int, nargs="+", default=[2, 3, 4])
+    parser.add_argument("--memory-cost", type=int, nargs="+", default=[19456, 65536])
+    parser.add_argument("--parallelism", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    # app.core.security importa app.db, que cria o engine da aplicação na importação.
+    os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+    bench_params(args.time_cost, args.memory_cost, args.parallelism, args.repeat)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
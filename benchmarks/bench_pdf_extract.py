@@ -0,0 +1,109 @@
+"""Benchmark da extração de texto de PDFs sintéticos com várias páginas.
+
+Gera PDFs com N páginas de texto (sem dependências extras) e compara:
+
+- pdfplumber em série, página a página (implementação anterior de `read_file_sync`);
+- o motor atual em série (pypdfium2), em paralelo por faixas de páginas e com
+  orçamento de caracteres (`PDF_MAX_CHARS`).
+
+Uso:
+    python benchmarks/bench_pdf_extract.py --pages 10 50 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pdfplumber
+
+from app.services.read_file import extract_pdf_text
+
+LINE = "Prezados, segue o relatorio trimestral com os indicadores de desempenho da area comercial."
+
+
+def write_synthetic_pdf(path: str, pages: int, lines_per_page: int = 40) -> None:
+    objects: list[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(b"")
+    pages_id = add(b"")
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    for p in range(pages):
+        text_ops = [b"BT /F1 9 Tf 11 TL 40 800 Td"]
+        for n in range(lines_per_page):
+            text_ops.append(f"({LINE} p{p + 1} l{n + 1}) Tj T*".encode("latin-1"))
+        text_ops.append(b"ET")
+        stream = b"\n".join(text_ops)
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, font_id, content_id)
+        ))
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog_id, xref)
+    with open(path, "wb") as fh:
+        fh.write(out)
+
+
+def legacy_pdfplumber(path: str) -> str:
+    parts = []
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages:
+            parts.append(page.extract_text() or "")
+    return "\n".join(parts)
+
+
+def timed(fn, *args, repeat: int = 3, **kwargs) -> tuple[float, int]:
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(fn(*args, **kwargs))
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--max-chars", type=int, default=8000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            path = os.path.join(tmp, f"synthetic-{pages}.pdf")
+            write_synthetic_pdf(path, pages)
+            rows = [
+                ("pdfplumber serial (antes)", timed(legacy_pdfplumber, path, repeat=args.repeat)),
+                ("pdfium serial", timed(extract_pdf_text, path, max_chars=0, backend="pdfium", workers=1, repeat=args.repeat)),
+                ("pdfium paralelo", timed(extract_pdf_text, path, max_chars=0, backend="pdfium", workers=args.workers, parallel_min_pages=1, repeat=args.repeat)),
+                (f"pdfium até {args.max_chars} chars", timed(extract_pdf_text, path, max_chars=args.max_chars, backend="pdfium", workers=1, repeat=args.repeat)),
+            ]
+            print(f"\n{pages} páginas")
+            for label, (ms, size) in rows:
+                print(f"  {label:<28} {ms:10.1f} ms  {size:>9} chars")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Micro-benchmark da montagem do prompt de classificação.
+
+Compara o custo de montar o prompt inteiro a cada chamada (como `build_prompt`
+fazia: lista de exemplos, instruções e join de ~6 KB por e-mail) com o template
+pré-compilado, que só renderiza o sufixo variável.
+
+Uso:
+    python benchmarks/bench_prompt.py --iterations 20000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.prompts import BATCH_INSTRUCTIONS, CLASSIFICATION_TEMPLATE, EXAMPLES, INSTRUCTIONS, PromptTemplate
+
+SAMPLE = "Bom dia, segue em anexo o relatório mensal. Podemos revisar amanhã às 10h? Abraços, Ana"
+
+
+def render_from_scratch() -> str:
+    template = PromptTemplate("classificacao-email", INSTRUCTIONS, [dict(ex) for ex in EXAMPLES], BATCH_INSTRUCTIONS)
+    return template.render(SAMPLE, "Equipe")
+
+
+def render_precompiled() -> str:
+    return CLASSIFICATION_TEMPLATE.render(SAMPLE, "Equipe")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    assert render_from_scratch() == render_precompiled()
+
+    before = timeit.timeit(render_from_scratch, number=args.iterations) / args.iterations * 1e6
+    after = timeit.timeit(render_precompiled, number=args.iterations) / args.iterations * 1e6
+    print(f"template version      : {CLASSIFICATION_TEMPLATE.version}")
+    print(f"prefixo estático      : {len(CLASSIFICATION_TEMPLATE.prefix)} caracteres")
+    print(f"montagem por chamada  : {before:8.2f} us/prompt")
+    print(f"template pré-compilado: {after:8.2f} us/prompt")
+    print(f"speedup               : {before / after:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# app.db cria o engine no import: os testes usam um SQLite descartável.
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='autou-tests-')}/test.db")
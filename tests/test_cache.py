@@ -0,0 +1,54 @@
+import asyncio
+import sys
+import types
+
+from app.services import cache
+from app.services.cache import MemoryCacheBackend, ResultCache
+
+
+def _key(**overrides):
+    args = {"cleaned_text": "pedido de reembolso", "model": "m1", "prompt_version": "v1", "username": "ana", "reply_mode": "llm"}
+    args.update(overrides)
+    return ResultCache.make_key(**args)
+
+
+def test_key_ignores_whitespace_differences():
+    assert _key(cleaned_text="pedido  de\nreembolso ") == _key()
+
+
+def test_key_changes_with_each_component():
+    base = _key()
+    for field, value in [("model", "m2"), ("prompt_version", "v2"), ("username", "bruno"), ("reply_mode", "template"), ("cleaned_text", "outro")]:
+        assert _key(**{field: value}) != base, field
+
+
+def test_template_results_are_not_served_in_llm_mode():
+    # Resultados do modo template vêm sem resposta gerada; não podem virar hit no modo llm.
+    result_cache = ResultCache(MemoryCacheBackend())
+    result_cache.set(_key(reply_mode="template"), {"category": "IMPRODUTIVO", "generated_response": ""})
+    assert result_cache.get(_key(reply_mode="llm")) is None
+
+
+def test_async_accessors_round_trip():
+    result_cache = ResultCache(MemoryCacheBackend())
+
+    async def run():
+        await result_cache.aset("k", {"category": "PRODUTIVO"})
+        return await result_cache.aget("k"), await result_cache.aget_many(["k", "missing"])
+
+    single, many = asyncio.run(run())
+    assert single == {"category": "PRODUTIVO"}
+    assert many == [{"category": "PRODUTIVO"}, None]
+
+
+def test_redis_backend_falls_back_to_memory_when_ping_fails(monkeypatch):
+    class _Client:
+        def ping(self):
+            raise ConnectionError("redis down")
+
+    fake_redis = types.ModuleType("redis")
+    fake_redis.Redis = types.SimpleNamespace(from_url=lambda url, **kwargs: _Client())
+    monkeypatch.setitem(sys.modules, "redis", fake_redis)
+
+    backend = cache._build_backend("redis")
+    assert isinstance(backend, MemoryCacheBackend)
@@ -0,0 +1,40 @@
+from app.services.condense import strip_noise
+
+
+def test_body_paragraph_mentioning_confidentiality_is_kept():
+    text = "Oi Ana,\n\nPrecisamos que voce assine o acordo de confidencialidade do cliente XYZ ate sexta.\n\nObrigado,\nCarlos"
+    stripped, removed = strip_noise(text)
+    assert "acordo de confidencialidade" in stripped
+    assert removed["disclaimer_chars"] == 0
+
+
+def test_trailing_disclaimer_is_removed():
+    text = (
+        "Oi Ana,\n\nSegue o relatório de vendas.\n\nObrigado,\nCarlos\n\n"
+        "Esta mensagem é confidencial e destinada exclusivamente ao destinatário indicado. "
+        "Se você a recebeu por engano, apague-a."
+    )
+    stripped, removed = strip_noise(text)
+    assert stripped == "Oi Ana,\n\nSegue o relatório de vendas.\n\nObrigado,\nCarlos"
+    assert removed["disclaimer_chars"] > 0
+
+
+def test_disclaimer_header_and_english_notice_are_removed():
+    text = (
+        "Hi team,\n\nPlease review the attached contract.\n\nThanks,\nCarlos\n\n"
+        "Aviso legal: o conteúdo deste e-mail é sigiloso.\n\n"
+        "This e-mail and any attachments are confidential and intended solely for the addressee."
+    )
+    stripped, removed = strip_noise(text)
+    assert stripped == "Hi team,\n\nPlease review the attached contract.\n\nThanks,\nCarlos"
+
+
+def test_disclaimer_wording_in_the_middle_of_the_body_is_kept():
+    text = (
+        "Oi Ana,\n\n"
+        "Este e-mail é confidencial e destinado ao jurídico: favor revisar a cláusula 4.\n\n"
+        "Obrigado,\nCarlos"
+    )
+    stripped, removed = strip_noise(text)
+    assert "cláusula 4" in stripped
+    assert removed["disclaimer_chars"] == 0
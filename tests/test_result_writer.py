@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from app import db
+from app.models import Status, TextEntry, User
+from app.services.result_writer import ResultWriteFailed, ResultWriter
+from app.services.worker_loop import WorkerLoop
+
+
+@pytest.fixture(scope="module")
+def loop():
+    # Como no worker: um loop persistente; as conexões do engine ficam presas a ele.
+    worker_loop = WorkerLoop()
+    worker_loop.start()
+    worker_loop.run(db.init_db())
+    yield worker_loop
+    worker_loop.stop()
+
+
+@pytest.fixture
+def entries(loop):
+    async def create(n):
+        async with db.async_session() as session:
+            user = User(username="ana", email=f"ana-{id(session)}@example.com", hash_password="x")
+            session.add(user)
+            await session.flush()
+            rows = [TextEntry(user_id=user.id, original_text=f"texto {i}") for i in range(n)]
+            session.add_all(rows)
+            await session.commit()
+            return [row.id for row in rows]
+
+    return lambda n: loop.run(create(n))
+
+
+def _read(loop, ids):
+    async def read():
+        async with db.async_session() as session:
+            rows = (await session.execute(select(TextEntry).where(TextEntry.id.in_(ids)))).scalars().all()
+            return {row.id: row for row in rows}
+
+    return loop.run(read())
+
+
+@pytest.fixture
+def make_writer(loop):
+    writers = []
+
+    def make(**kwargs):
+        writer = ResultWriter(enabled=True, **{"flush_ms": 200, "max_batch": 500, "max_retries": 3, **kwargs})
+        writer.bind(loop.loop)
+        writers.append(writer)
+        return writer
+
+    yield make
+    for writer in writers:
+        loop.run(writer.close())
+
+
+async def _committed(commits):
+    return await asyncio.gather(*commits)
+
+
+def test_sequential_tasks_share_one_flush(loop, entries, make_writer):
+    # Pool prefork: uma task por vez no processo; cada uma entrega a linha e retorna sem esperar o commit.
+    writer = make_writer(flush_ms=500)
+    ids = entries(4)
+    commits = [loop.run(writer.write(entry_id, status=Status.COMPLETED, generated_response=f"r{entry_id}")) for entry_id in ids]
+    assert all(isinstance(c, asyncio.Future) for c in commits)
+    loop.run(_committed(commits), timeout=5)
+    assert writer.flushes == 1
+    assert writer.rows == len(ids)
+    rows = _read(loop, ids)
+    assert all(rows[i].generated_response == f"r{i}" and rows[i].status == Status.COMPLETED.value for i in ids)
+
+
+def test_rows_with_different_columns_are_grouped(loop, entries, make_writer):
+    writer = make_writer()
+    first, second, third = entries(3)
+    rows = {first: {"status": Status.FAILED}, second: {"status": Status.COMPLETED, "category": "PRODUTIVO"}, third: {"status": Status.FAILED}}
+    assert sorted(len(group) for group in ResultWriter._group(rows).values()) == [1, 2]
+
+    async def write_all():
+        commits = [await writer.write(entry_id, **fields) for entry_id, fields in rows.items()]
+        await asyncio.gather(*commits)
+
+    loop.run(write_all(), timeout=5)
+    assert writer.flushes == 1
+    stored = _read(loop, [first, second, third])
+    assert stored[first].status == stored[third].status == Status.FAILED.value
+    assert stored[second].category == "PRODUTIVO"
+
+
+def test_future_resolves_after_commit(loop, entries, make_writer):
+    writer = make_writer()
+    (entry_id,) = entries(1)
+
+    async def write_then_read():
+        commit = await writer.write(entry_id, generated_response="pronto")
+        assert not commit.done()
+        await commit
+        async with db.async_session() as session:
+            return (await session.get(TextEntry, entry_id)).generated_response
+
+    assert loop.run(write_then_read(), timeout=5) == "pronto"
+
+
+def test_failed_flush_is_requeued(loop, entries, make_writer, monkeypatch):
+    writer = make_writer(flush_ms=20)
+    (entry_id,) = entries(1)
+    real_session = db.async_session
+    calls = []
+
+    def flaky_session():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError("banco indisponível")
+        return real_session()
+
+    monkeypatch.setattr(db, "async_session", flaky_session)
+
+    async def write():
+        await (await writer.write(entry_id, generated_response="depois da falha"))
+
+    loop.run(write(), timeout=5)
+    monkeypatch.undo()
+    assert writer.failures == 1 and writer.dropped == 0
+    assert _read(loop, [entry_id])[entry_id].generated_response == "depois da falha"
+
+
+def test_row_dropped_after_retries_fails_the_future(loop, entries, make_writer):
+    writer = make_writer(flush_ms=10, max_retries=1)
+    (entry_id,) = entries(1)
+
+    async def write():
+        await (await writer.write(entry_id, no_such_column="x"))
+
+    with pytest.raises(ResultWriteFailed):
+        loop.run(write(), timeout=5)
+    assert writer.failures == 2
+    assert writer.dropped == 1
+    assert writer.stats()["pending"] == 0
+
+
+def test_close_drains_pending_rows(loop, entries, make_writer):
+    writer = make_writer(flush_ms=60_000)
+    ids = entries(3)
+
+    async def write_and_close():
+        commits = [await writer.write(entry_id, status=Status.COMPLETED) for entry_id in ids]
+        assert not any(c.done() for c in commits)
+        await writer.close()
+        return commits
+
+    commits = loop.run(write_and_close(), timeout=5)
+    assert all(c.done() and c.exception() is None for c in commits)
+    assert writer.flushes == 1
+    assert all(row.status == Status.COMPLETED.value for row in _read(loop, ids).values())
+
+
+def test_writes_outside_the_bound_loop_go_straight_to_the_database(loop, entries, make_writer):
+    writer = make_writer()
+    (entry_id,) = entries(1)
+    writer.bind(None)
+    assert loop.run(writer.write(entry_id, generated_response="direto")) is None
+    assert writer.flushes == 0
+    assert _read(loop, [entry_id])[entry_id].generated_response == "direto"